@@ -1,7 +1,24 @@
+import json
+import os
+import time
+import uuid
+
 import streamlit as st
-import numpy as np
-import pandas as pd
-import plotly.express as px
+
+# plotly and xgboost are heavy to import; they are loaded on first use by the
+# pages that need them (see the chart builders below and loanease.model_store)
+from loanease import drift, global_explain, metrics, model_store, peers, speculate
+from loanease.amortization import create_amortization_summary
+from loanease.caching import memoize
+from loanease.charts import aggregate_bars, cached_chart, line_trace
+from loanease.explain import EDUCATION_LEVELS, applicant_features, explain_applicant, explanation_cache_stats
+from loanease.fixedpoint import paise_schedule, to_rupees
+from loanease.scoring import MAX_DTI, MIN_CREDIT_SCORE, eligibility_check, risk_score
+from loanease.segments import STEP_UP, balance_path, concat_events, event_schedule, make_events, periodic_events
+from loanease.sensitivity import sensitivity_surface
+from loanease.solvers import preapproved_limits
+from loanease.stress import HIGH_RISK_THRESHOLD, draw_scenarios, stress_test
+from loanease.tables import TABLE_COLUMNS, LedgerTable, iter_csv, write_excel
 
 # ====== THEME COLORS (PulseFit-Inspired Palette) ======
 PRIMARY = "#57C0BE"         # Dark gray for main content areas
@@ -26,9 +43,67 @@ if "eligibility_inputs" not in st.session_state:
         'income': 75000,
         'credit_score': 780
     }
+if "emi_inputs" not in st.session_state:
+    # Last submitted EMI form, so the results (and table pages) survive reruns
+    st.session_state.emi_inputs = None
+if "session_id" not in st.session_state:
+    # Identifies this session's background work (see SPECULATIVE PRECOMPUTE below)
+    st.session_state.session_id = uuid.uuid4().hex
 
 def go_to(page):
     st.session_state.page = page
+    if SPECULATE:
+        # Neighbours of the page being left are no longer worth computing
+        speculate.cancel(st.session_state.session_id)
+
+# ====== METRICS (OPT-IN) ======
+# LOANEASE_DEBUG=1 turns on timing of the calculators, model calls and page
+# renders, and shows the debug panel at the bottom. Metrics are process-wide and
+# the panel can reset them for everyone, so only the operator can switch this on,
+# never a URL parameter.
+DEBUG_PANEL = os.environ.get("LOANEASE_DEBUG") == "1"
+if DEBUG_PANEL:
+    metrics.enable()
+render_started = time.perf_counter()
+
+# ====== SPECULATIVE PRECOMPUTE (OPT-IN) ======
+# LOANEASE_SPECULATE=1: after a submit, background threads compute the page's
+# results for each slider moved one step either way, so a nudged resubmit is a
+# cache hit (see loanease.speculate). The threads are process-wide, so only the
+# operator can turn this on. Hit rate and CPU cost show up in the debug panel's gauges.
+SPECULATE = speculate.is_enabled()
+if SPECULATE:
+    # Background work waits while any session is rendering; a rerun cut short is replaced by the next one
+    render_token = speculate.begin_render(st.session_state.session_id)
+
+# Slider (min, max, step) per form field, matching the sliders below
+ELIGIBILITY_SLIDERS = {
+    'loan_amount': (100000, 4000000, 5000),
+    'interest_rate': (1.0, 20.0, 0.1),
+    'tenure': (1, 30, 1),
+    'income': (20000, 200000, 1000),
+    'credit_score': (300, 900, 1),
+}
+EMI_SLIDERS = {
+    'loan_amount': (100000, 10000000, 10000),
+    'interest_rate': (1.0, 25.0, 0.1),
+    'tenure_years': (1, 30, 1),
+}
+SHAP_SLIDERS = {
+    'age': (21, 70, 1),
+    'income': (20000, 200000, 1000),
+    'cc_spend': (0, 10000, 100),
+}
+
+# ====== MODEL LOADING ======
+# Loaded once per server process and shared by every session and rerun. The
+# warm-up runs on a background thread so it never blocks a rerun; pages that
+# need the model wait for it through model_store.load_model().
+@st.cache_resource(show_spinner=False)
+def start_model_warm_up():
+    return model_store.warm_up_in_background()
+
+start_model_warm_up()
 
 # ====== GLOBAL STYLING & POSITIONING ======
 def setup_page_styles():
@@ -174,139 +249,328 @@ def display_header_and_home_button():
     )
 
 
-# Function to calculate EMI
-def calculate_emi(principal, annual_rate, tenure_years):
-    # Monthly interest rate
-    r = annual_rate / (12 * 100)
-    # Total number of payments
-    n = tenure_years * 12
+# ====== CACHED PAGE COMPUTATIONS ======
+# Every widget change reruns this script for every session. The page results
+# below depend only on slider values, so they are memoised process-wide and
+# shared across sessions (see loanease.caching.memoize).
+@memoize("eligibility")
+def assess_eligibility(loan_amount, interest_rate, tenure, income, credit_score, other_emis=0):
+    result = eligibility_check(loan_amount, interest_rate, tenure, income, credit_score, other_emis)
+    return {key: value.item() for key, value in result.items()}
+
+@memoize("risk")
+def assess_risk(annual_income, existing_debt, credit_score, fixed_expenses, collateral):
+    result = risk_score(annual_income, existing_debt, credit_score, fixed_expenses, collateral)
+    return {key: value.item() for key, value in result.items()}
+
+@memoize("eligibility")
+def assess_limits(loan_amount, interest_rate, tenure, income, other_emis=0):
+    # Solved directly instead of by trial and error on the sliders (see loanease.solvers)
+    result = preapproved_limits(loan_amount, interest_rate, tenure, income, other_emis)
+    return {key: float(value) for key, value in result.items()}
+
+@memoize("eligibility")
+def similar_customers(age, monthly_income, cc_spend, education, k=peers.DEFAULT_K):
+    # Nearest past customers in the model's scaled feature space, from the memory-mapped KD-tree
+    features = applicant_features(age, monthly_income, cc_spend, education)
+    return float(peers.get_index().acceptance_rate(features, k)[0])
+
+@memoize("eligibility")
+def build_sensitivity_results(loan_amount, income, other_emis=0):
+    import plotly.graph_objects as go
+
+    # Every (rate, tenure) point on the sliders, rescaled from a cached ₹1 EMI surface
+    surface = sensitivity_surface(loan_amount, income, other_emis)
+
+    fig = go.Figure(go.Heatmap(
+        z=surface.dti,
+        x=surface.tenures,
+        y=surface.rates,
+        customdata=surface.emi,
+        zmin=0,
+        zmax=2 * MAX_DTI,
+        colorscale=[[0, '#6AA7A3'], [0.5, '#E8E6E1'], [1, '#B69B75']],
+        colorbar=dict(title='DTI (%)'),
+        hovertemplate="Rate %{y:.1f}% · %{x} yrs<br>EMI ₹%{customdata:,.0f}<br>DTI %{z:.1f}%<extra></extra>"
+    ))
+    # Outline the DTI limit so the eligible region stands out
+    fig.add_trace(go.Contour(
+        z=surface.dti,
+        x=surface.tenures,
+        y=surface.rates,
+        contours=dict(start=MAX_DTI, end=MAX_DTI, coloring='lines', showlabels=True),
+        line=dict(color='#F9F9F9', width=2),
+        showscale=False,
+        hoverinfo='skip'
+    ))
+
+    fig.update_layout(
+        title=f"DTI Across Interest Rate × Tenure (line = {MAX_DTI:.0f}% limit)",
+        xaxis_title="Loan Tenure (Years)",
+        yaxis_title="Interest Rate (%)",
+        plot_bgcolor='#1C1C1A', 
+        paper_bgcolor='#151E28',
+        font_color='#F9F9F9',
+        title_font_size=18
+    )
+    return surface, fig
+
+@memoize("risk")
+def stress_risk(annual_income, existing_debt, credit_score, fixed_expenses, collateral, n_scenarios=2000):
+    # Same seeded scenarios for everyone, so a profile's stress result is reproducible
+    result = stress_test(
+        {
+            'annual_income': [annual_income],
+            'existing_debt': [existing_debt],
+            'credit_score': [credit_score],
+            'fixed_expenses': [fixed_expenses],
+            'collateral': [collateral],
+        },
+        draw_scenarios(n_scenarios, seed=0),
+        percentiles=(50, 95),
+    )
+    return result.percentiles, float(result.borrower_high_risk_prob[0])
+
+@memoize("emi")
+def build_emi_ledger(loan_amount, interest_rate, tenure_years):
+    # The exact paise ledger (loanease.fixedpoint) behind the EMI page's totals, chart, table and exports
+    return paise_schedule(loan_amount, interest_rate, tenure_years)
+
+@memoize("emi")
+def build_emi_results(loan_amount, interest_rate, tenure_years):
+    # 1. Calculate EMI (exact, in paise)
+    ledger = build_emi_ledger(loan_amount, interest_rate, tenure_years)
+    emi = float(to_rupees(ledger.emi[0]))
+    
+    # 2. Create Amortization Summary & get totals
+    df_summary, total_interest, total_payable = create_amortization_summary(
+        loan_amount, interest_rate, emi, tenure_years, exact=True, ledger=ledger
+    )
 
-    if r == 0:
-        emi = principal / n if n > 0 else 0
-    else:
-        try:
-            emi = (principal * r * (1 + r)**n) / ((1 + r)**n - 1)
-        except ZeroDivisionError:
-            emi = principal / n
-            
-    return emi if emi > 0 else 0
+    return emi, df_summary, total_interest, total_payable
 
-# Function to create a simplified amortization schedule (for visualization)
-def create_amortization_summary(principal, annual_rate, emi, tenure_years):
-    monthly_rate = annual_rate / (12 * 100)
-    num_months = tenure_years * 12
-    
-    if num_months == 0 or emi == 0:
-        return None, 0, 0
-    
-    outstanding_balance = principal
-    total_interest = 0
-    
-    # Simplified summary for visualization (quarterly breakdown)
-    summary_data = []
-    
-    for month in range(1, num_months + 1):
-        interest_paid = outstanding_balance * monthly_rate
-        
-        principal_paid = emi - interest_paid
-        if outstanding_balance < principal_paid:
-            principal_paid = outstanding_balance
-            interest_paid = emi - principal_paid # Recalculate interest if we pay off early
-            
-        outstanding_balance -= principal_paid
-        total_interest += interest_paid
-        
-        # Add data for summary (quarterly)
-        if month % 3 == 0 or month == num_months: # Log every quarter or the final month
-            summary_data.append({
-                'Month': month,
-                'Year': (month - 1) // 12 + 1,
-                'Principal Component': principal_paid,
-                'Interest Component': interest_paid,
-                'Remaining Balance': outstanding_balance
-            })
-        
-    return pd.DataFrame(summary_data), total_interest, principal + total_interest
+# ====== CHARTS ======
+# Figures are built from the full monthly schedule, reduced to a point budget
+# server-side and cached on their inputs (see loanease.charts)
+EMI_BAR_BUDGET = 120
 
-# Function for SHAP simulation
-def simulate_shap_explanation(credit_score, monthly_income, desired_loan_amount, loan_tenure_years, annual_rate):
-    """Simulates SHAP values based on common lending model logic."""
-    
-    # 1. Calculate EMI to find the Debt-to-Income (DTI) ratio
-    emi = calculate_emi(desired_loan_amount, annual_rate, loan_tenure_years)
-    dti_ratio = (emi / monthly_income) * 100 if monthly_income > 0 else 100
+def emi_chart(loan_amount, interest_rate, tenure_years):
+    def build():
+        import plotly.graph_objects as go
+
+        ledger = build_emi_ledger(loan_amount, interest_rate, tenure_years)
+        x, bars, period = aggregate_bars(ledger.months, {
+            'Principal': to_rupees(ledger.principal[0]),
+            'Interest': to_rupees(ledger.interest[0])
+        }, EMI_BAR_BUDGET)
+
+        fig = go.Figure([
+            go.Bar(x=x, y=bars['Principal'], name='Principal', marker_color='#6AA7A3'),
+            go.Bar(x=x, y=bars['Interest'], name='Interest', marker_color='#B69B75')
+        ])
+        title = 'EMI Components Over Repayment Period'
+        fig.update_layout(
+            title=title + (' (Monthly)' if period == 'Month' else f' (Average per {period})'),
+            barmode='stack',
+            legend_title_text='Payment Type',
+            xaxis_title="Month of Repayment",
+            yaxis_title="Amount (₹)",
+            plot_bgcolor='#1C1C1A', 
+            paper_bgcolor='#151E28', 
+            font_color='#F9F9F9',   
+            title_font_size=18
+        )
+        return fig
+
+    return cached_chart("emi", (loan_amount, interest_rate, tenure_years), build)
+
+def events_chart(key, paths):
+    def build():
+        import plotly.graph_objects as go
+
+        fig = go.Figure()
+        for (months, balance), name, color in zip(paths, ('Original Schedule', 'With Prepayments & Resets'),
+                                                  ('#B69B75', '#6AA7A3')):
+            fig.add_trace(line_trace(months, balance, name=name, line=dict(color=color)))
+
+        fig.update_layout(
+            title='Outstanding Balance: Original vs With Events',
+            xaxis_title="Month of Repayment",
+            yaxis_title="Remaining Balance (₹)",
+            plot_bgcolor='#1C1C1A', 
+            paper_bgcolor='#151E28', 
+            font_color='#F9F9F9',   
+            title_font_size=18
+        )
+        return fig
+
+    return cached_chart("emi_events", key, build)
+
+def chart_caption(stats):
+    source = "cached" if stats.cached else f"built in {stats.build_seconds * 1000:,.1f} ms"
+    st.caption(f"{stats.points:,} points · {stats.payload_bytes / 1024:,.0f} KB · {source}")
+
+@memoize("emi")
+def build_event_results(loan_amount, interest_rate, tenure_years, prepay_amount, prepay_year,
+                        step_up_pct, reset_rate, reset_year):
+    # Loan 0 carries the events, loan 1 is the same loan without them (one batched call)
+    events = [make_events(prepayments=[(0, prepay_year * 12, prepay_amount)] if prepay_amount > 0 else [],
+                          rate_resets=[(0, reset_year * 12, reset_rate)] if reset_rate is not None else [])]
+    if step_up_pct > 0:
+        events.append(periodic_events(STEP_UP, [0], 12, 12, [step_up_pct / 100] * tenure_years))
+    result = event_schedule([loan_amount] * 2, interest_rate, tenure_years, concat_events(*events))
+
+    summary = {
+        'interest_saved': float(result.interest_saved[0]),
+        'tenure_reduction': int(result.tenure_reduction[0]),
+        'num_months': int(result.num_months[0]),
+        'paid_off': bool(result.paid_off[0]),
+    }
+    return summary, (balance_path(result, 1), balance_path(result, 0))
+
+@memoize("emi")
+def export_schedule(loan_amount, interest_rate, tenure_years, file_format):
+    # Written chunk by chunk (see loanease.tables); one loan is at most 360 rows
+    table = LedgerTable(build_emi_ledger(loan_amount, interest_rate, tenure_years))
+    if file_format == "csv":
+        return "".join(iter_csv(table, columns=TABLE_COLUMNS[1:])).encode()
+    import io
+
+    buffer = io.BytesIO()
+    write_excel(table, buffer, columns=TABLE_COLUMNS[1:])
+    return buffer.getvalue()
+
+@memoize("shap")
+def build_shap_results(age, monthly_income, cc_spend, education):
+    base_prob, final_prob, df_shap = explain_applicant(
+        age=age,
+        monthly_income=monthly_income,
+        cc_spend=cc_spend,
+        education=education
+    )
+
+    import plotly.express as px
+
+    # Create the Horizontal Bar Chart (SHAP Force Plot style)
+    fig = px.bar(
+        df_shap.sort_values(by='SHAP_Value', ascending=True), # Sort for visual clarity
+        x='SHAP_Value',
+        y='Feature',
+        color='Group', # Use the Group (Positive/Negative) for color
+        orientation='h',
+        title="How Each Factor Pushed the Approval Probability",
+        color_discrete_map={'Positive': '#6AA7A3', 'Negative': '#B69B75'}
+    )
+
+    fig.update_layout(
+        xaxis_title="Contribution to Prediction (Percentage Points)",
+        yaxis_title="Financial Feature",
+        plot_bgcolor='#1C1C1A', 
+        paper_bgcolor='#151E28',
+        font_color='#F9F9F9',
+        title_font_size=18
+    )
+
+    # Add a vertical line at x=0 for visual reference
+    fig.add_vline(x=0, line_width=1, line_dash="dash", line_color="#F9F9F9")
+
+    return base_prob, final_prob, df_shap, fig
+
+# Axis labels for the model features in the global view
+GLOBAL_FEATURE_LABELS = {
+    'Age': "Age (Years)",
+    'Income': "Monthly Income (₹ thousands)",
+    'CCAvg': "Credit Card Spend (₹ thousands/mo)",
+    'Education': "Education Level",
+}
+
+@memoize("shap")
+def build_global_results():
+    # Everything comes from the precomputed artifact: a small JSON summary and a few memory-mapped rows
+    store = global_explain.get_store()
+    summary = store.summary
+
+    import pandas as pd
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    layout = dict(plot_bgcolor='#1C1C1A', paper_bgcolor='#151E28', font_color='#F9F9F9', title_font_size=18)
+    features = summary['features']
+
+    # 1. Global importance: mean |SHAP| per feature
+    ranked = sorted(features, key=lambda f: summary['importance'][f]['mean_abs'])
+    fig_importance = go.Figure(go.Bar(
+        x=[summary['importance'][f]['mean_abs'] for f in ranked],
+        y=[GLOBAL_FEATURE_LABELS[f] for f in ranked],
+        orientation='h',
+        marker_color='#6AA7A3',
+        text=[f"{summary['importance'][f]['share']*100:.0f}%" for f in ranked],
+        textposition='auto'
+    ))
+    fig_importance.update_layout(title="Global Feature Importance (Mean |SHAP|)",
+                                 xaxis_title="Mean |Contribution| (Log-Odds)", **layout)
+
+    # 2. Dependence: sampled customers plus the binned mean over everyone
+    fig_dependence = make_subplots(rows=2, cols=2, subplot_titles=[GLOBAL_FEATURE_LABELS[f] for f in features])
+    for i, feature in enumerate(features):
+        row, col = i // 2 + 1, i % 2 + 1
+        values, contributions = store.dependence_sample(feature)
+        curve = summary['dependence'][feature]
+        fig_dependence.add_trace(go.Scattergl(x=values, y=contributions, mode='markers', showlegend=False,
+                                              marker=dict(size=4, color='#6AA7A3', opacity=0.35)), row=row, col=col)
+        fig_dependence.add_trace(go.Scatter(x=curve['value'], y=curve['mean_shap'], mode='lines', showlegend=False,
+                                            line=dict(color='#B69B75', width=3)), row=row, col=col)
+    fig_dependence.update_layout(title="SHAP Dependence (Log-Odds; line = average over all customers)",
+                                 height=650, **layout)
+
+    # 3. Segments: average contribution of each feature per Education level and Family size
+    segment_names = list(summary['segments'])
+    fig_segments = make_subplots(rows=1, cols=len(segment_names), subplot_titles=segment_names, shared_yaxes=True)
+    colors = ['#6AA7A3', '#B69B75', '#6669C1', '#57C0BE']
+    segment_rows = []
+    for col, name in enumerate(segment_names, start=1):
+        levels = summary['segments'][name]
+        labels = [EDUCATION_LEVELS.get(level['value'], level['value']) if name == 'Education'
+                  else f"{level['value']} member(s)" for level in levels]
+        for feature, color in zip(features, colors):
+            fig_segments.add_trace(go.Bar(x=labels, y=[level['mean_shap'][feature] for level in levels],
+                                          name=GLOBAL_FEATURE_LABELS[feature], marker_color=color,
+                                          legendgroup=feature, showlegend=col == 1), row=1, col=col)
+        for label, level in zip(labels, levels):
+            segment_rows.append({
+                'Segment': name,
+                'Group': str(label),
+                'Customers': level['count'],
+                'Took a Loan (%)': level['acceptance_rate'] * 100,
+                'Mean Predicted (%)': level['mean_probability'] * 100,
+            })
+    fig_segments.update_layout(title="Average Contribution by Segment (Log-Odds)", barmode='group', **layout)
+
+    return summary, fig_importance, fig_dependence, fig_segments, pd.DataFrame(segment_rows)
+
+# What each page's submit computes, as (memoized function, slider values -> arguments);
+# the arguments must match the calls below exactly for the precomputed results to be hits
+SPECULATION_PLANS = {
+    'eligibility': (ELIGIBILITY_SLIDERS, [
+        (assess_eligibility, lambda v: (v['loan_amount'], v['interest_rate'], v['tenure'], v['income'], v['credit_score'], 0)),
+        (assess_limits, lambda v: (v['loan_amount'], v['interest_rate'], v['tenure'], v['income'], 0)),
+        (similar_customers, lambda v: (v['age'], v['income'], v['cc_spend'], v['education'])),
+        (build_sensitivity_results, lambda v: (v['loan_amount'], v['income'], 0)),
+    ]),
+    'emi': (EMI_SLIDERS, [
+        (build_emi_results, lambda v: (v['loan_amount'], v['interest_rate'], v['tenure_years'])),
+    ]),
+    'shap': (SHAP_SLIDERS, [
+        (build_shap_results, lambda v: (v['age'], v['income'], v['cc_spend'], v['education'])),
+    ]),
+}
+
+# Function to queue a page's results for the neighbouring slider settings
+def speculate_neighbours(page, values):
+    if SPECULATE:
+        sliders, tasks = SPECULATION_PLANS[page]
+        speculate.speculate(st.session_state.session_id, values, sliders, tasks)
 
-    # 2. Initialize SHAP base value (baseline approval probability)
-    base_value = 0.50 
-    
-    # List to store SHAP contributions (Feature, Value, Color, Description)
-    contributions = []
-    
-    # --- Credit Score Contribution ---
-    score_shap = 0
-    score_desc = ""
-    if credit_score >= 750:
-        score_shap = 0.20 # +20 percentage points
-        score_desc = "Excellent score, significantly boosting approval probability."
-    elif credit_score >= 650:
-        score_shap = 0.05 # +5 percentage points
-        score_desc = "Good score, slight positive impact."
-    else:
-        score_shap = -0.15 # -15 percentage points
-        score_desc = "Low score, significantly lowering approval probability."
-    contributions.append({
-        'Feature': f"Credit Score ({credit_score})", 
-        'SHAP_Value': score_shap, 
-        'Group': 'Positive' if score_shap > 0 else 'Negative',
-        'Description': score_desc
-    })
-
-    # --- DTI Ratio Contribution ---
-    dti_shap = 0
-    dti_desc = ""
-    if dti_ratio <= 30:
-        dti_shap = 0.15
-        dti_desc = f"Low DTI ({dti_ratio:,.1f}%), strong factor for approval (manageable debt)."
-    elif dti_ratio <= 45:
-        dti_shap = -0.05
-        dti_desc = f"Moderate DTI ({dti_ratio:,.1f}%), slight negative impact."
-    else:
-        dti_shap = -0.25
-        dti_desc = f"High DTI ({dti_ratio:,.1f}%), major factor against approval (high risk of default)."
-    contributions.append({
-        'Feature': f"Debt-to-Income (DTI)", 
-        'SHAP_Value': dti_shap, 
-        'Group': 'Positive' if dti_shap > 0 else 'Negative',
-        'Description': dti_desc
-    })
-
-    # --- Monthly Income Contribution ---
-    income_shap = 0
-    income_desc = ""
-    if monthly_income >= 100000:
-        income_shap = 0.10
-        income_desc = f"High income (₹{monthly_income:,.0f}/mo) provides strong repayment capacity."
-    elif monthly_income >= 50000:
-        income_shap = 0.03
-        income_desc = f"Moderate income (₹{monthly_income:,.0f}/mo), slight positive support."
-    else:
-        income_shap = -0.05
-        income_desc = f"Lower income (₹{monthly_income:,.0f}/mo) is a mild risk factor."
-    contributions.append({
-        'Feature': f"Monthly Income", 
-        'SHAP_Value': income_shap, 
-        'Group': 'Positive' if income_shap > 0 else 'Negative',
-        'Description': income_desc
-    })
-    
-    # Calculate final probability
-    final_prob = base_value + sum(c['SHAP_Value'] for c in contributions)
-    final_prob = np.clip(final_prob, 0.01, 0.99) # Clip between 1% and 99%
-    
-    # Convert to DataFrame for easier plotting
-    df_shap = pd.DataFrame(contributions)
-    
-    return base_value, final_prob, df_shap
 
 # ====== MAIN CONTENT ======
 
@@ -379,20 +643,21 @@ elif st.session_state.page == "eligibility":
 
     if submit_button:
         # Save the current inputs to session state
-        st.session_state.eligibility_inputs = {
+        # (update, not replace: age, card spend and education set on the SHAP page are kept)
+        st.session_state.eligibility_inputs.update({
             'loan_amount': loan_amount,
             'interest_rate': interest_rate,
             'tenure': tenure,
             'income': income,
             'credit_score': credit_score
-        }
+        })
         
         if interest_rate > 0 and tenure > 0 and loan_amount > 0 and income > 0:
             
             other_emis = 0 
-            emi = calculate_emi(loan_amount, interest_rate, tenure)
-            total_emi = emi + other_emis
-            dti_ratio = (total_emi / income) * 100
+            result = assess_eligibility(loan_amount, interest_rate, tenure, income, credit_score, other_emis)
+            emi = result['emi']
+            dti_ratio = result['dti_ratio']
             
 
             st.markdown("---")
@@ -404,11 +669,11 @@ elif st.session_state.page == "eligibility":
             col_res2.metric("Debt-to-Income (DTI) Ratio", f"{dti_ratio:,.1f}%")
             
             st.markdown("---")
-            max_dti = 40.0
+            max_dti = MAX_DTI
             
             # --- Logic to combine/clarify rejection reasons ---
-            is_dti_ok = dti_ratio <= max_dti
-            is_credit_ok = credit_score >= 650
+            is_dti_ok = result['is_dti_ok']
+            is_credit_ok = result['is_credit_ok']
             
             if is_dti_ok and is_credit_ok:
                 st.success(f"✅ **You are Eligible!** DTI: {dti_ratio:,.1f}% | Credit Score: {credit_score}")
@@ -417,7 +682,7 @@ elif st.session_state.page == "eligibility":
                 if not is_dti_ok:
                     reasons.append(f"High DTI ({dti_ratio:,.1f}%) — exceeds {max_dti}% limit")
                 if not is_credit_ok:
-                    reasons.append(f"Low Credit Score ({credit_score}) — minimum required is 650")
+                    reasons.append(f"Low Credit Score ({credit_score}) — minimum required is {MIN_CREDIT_SCORE}")
                 
                 # Display single combined error or targeted warning
                 if len(reasons) == 2:
@@ -428,6 +693,38 @@ elif st.session_state.page == "eligibility":
                     st.error(f"❌ **Not Eligible.** Primary Blocker: {reasons[0]}.")
             # --- END Logic ---
 
+            # --- Limits: how far each input can move before DTI crosses the limit ---
+            limits = assess_limits(loan_amount, interest_rate, tenure, income, other_emis)
+            st.markdown(f"**Your limits at a {MAX_DTI:.0f}% DTI** (EMI budget ₹{limits['emi_budget']:,.0f}/month)")
+            col_lim1, col_lim2, col_lim3 = st.columns(3)
+            col_lim1.metric(f"Max Loan at {interest_rate}% for {tenure} yrs", f"₹{limits['max_loan_amount']:,.0f}")
+
+            min_years = limits['min_tenure']
+            if min_years <= 30:
+                tenure_text = f"{min_years:.0f} yrs"
+            elif min_years < float('inf'):
+                tenure_text = "Over 30 yrs"
+            else:
+                tenure_text = "Not reachable"
+            col_lim2.metric("Shortest Tenure for this Loan", tenure_text)
+
+            max_rate = limits['max_interest_rate']
+            if max_rate != max_rate:  # NaN: over budget even at 0%
+                rate_text = "Not reachable"
+            elif max_rate == float('inf'):
+                rate_text = "Any rate"
+            else:
+                rate_text = f"{max_rate:.2f}%"
+            col_lim3.metric("Highest Rate that Qualifies", rate_text)
+
+            # --- Peers: how the most similar past customers fared ---
+            inputs = st.session_state.eligibility_inputs
+            peer_age, peer_cc_spend, peer_education = inputs.get('age', 35), inputs.get('cc_spend', 1500), inputs.get('education', 2)
+            acceptance = similar_customers(peer_age, income, peer_cc_spend, peer_education)
+            st.info(f"👥 **{acceptance*100:.0f}%** of the {peers.DEFAULT_K} most similar past customers took a Personal Loan "
+                    f"(age {peer_age}, ₹{income:,.0f}/month income, ₹{peer_cc_spend:,.0f}/month card spend, "
+                    f"{EDUCATION_LEVELS[peer_education]} — age, card spend and education come from the Explainability page).")
+
             # --- FIX: Removed the conflicting 'kwargs' and 'type' arguments ---
             st.markdown("<br>", unsafe_allow_html=True)
             st.button("🧠 Explain the Decision (SHAP)", 
@@ -437,6 +734,19 @@ elif st.session_state.page == "eligibility":
                      help="Go to the Explainability tab with current inputs pre-filled.")
             # --- END FIX ---
 
+            # --- Sensitivity: the same loan at every rate and tenure on the sliders ---
+            with st.expander("📈 Rate × Tenure Sensitivity (EMI & DTI)"):
+                start = time.perf_counter()
+                surface, fig_surface = build_sensitivity_results(loan_amount, income, other_emis)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                st.plotly_chart(fig_surface, use_container_width=True)
+                st.caption(f"{surface.dti.size:,} rate × tenure points · surface built in "
+                           f"{surface.seconds*1000:.2f} ms · served in {elapsed_ms:.2f} ms")
+
+            speculate_neighbours('eligibility', dict(
+                loan_amount=loan_amount, interest_rate=interest_rate, tenure=tenure, income=income,
+                credit_score=credit_score, age=peer_age, cc_spend=peer_cc_spend, education=peer_education))
+
         else:
             st.error("Please fill valid positive values for all fields.")
 
@@ -472,22 +782,11 @@ elif st.session_state.page == "risk":
         submit_risk_button = st.form_submit_button(label="📈 Calculate Risk Score")
 
     if submit_risk_button:
-        # Convert annual to monthly for calculations
-        monthly_income = annual_income / 12
-        
-        # 1. Debt-to-Income Ratio (DTI) 
-        dti = (existing_debt / monthly_income) if monthly_income > 0 else 100 
-        
-        # 2. Expense-to-Income Ratio (ETI) - Ratio of all mandatory payments (debt + expenses)
-        eti = ((existing_debt + fixed_expenses) / monthly_income) if monthly_income > 0 else 100
-
         # --- Simple Risk Score Logic (0 = Low Risk, 100 = High Risk) ---
-        base_risk = (dti * 50) + (eti * 20)
-        credit_modifier = ((credit_score_risk - 600) / 300) * 30 
-        collateral_reduction = 20 if collateral_presence == 'Yes' else 0
-        
-        adjusted_risk = base_risk - credit_modifier - collateral_reduction
-        final_risk_score = np.clip(adjusted_risk, 0, 100) 
+        result = assess_risk(annual_income, existing_debt, credit_score_risk, fixed_expenses, collateral_presence)
+        dti = result['dti']
+        eti = result['eti']
+        final_risk_score = result['risk_score']
 
         # --- Display Results ---
         st.markdown("---")
@@ -511,6 +810,15 @@ elif st.session_state.page == "risk":
         else:
             st.error("🔴 **HIGH RISK:** Significant portion of your income is consumed by debt and expenses, and/or your credit score is low.")
 
+        # --- Stress Test: the same score under rate, income and expense shocks ---
+        stressed, high_risk_prob = stress_risk(annual_income, existing_debt, credit_score_risk, fixed_expenses, collateral_presence)
+        st.markdown("<h3 style='color:#FFFFFF;'>Stress Test</h3>", unsafe_allow_html=True)
+        st.write("How the score moves across 2,000 simulated scenarios of interest rate rises, income drops and expense inflation.")
+        col_stress1, col_stress2, col_stress3 = st.columns(3)
+        col_stress1.metric("Median Stressed Score", f"{stressed[50]:,.0f}/100")
+        col_stress2.metric("Bad-Case Score (95th Percentile)", f"{stressed[95]:,.0f}/100")
+        col_stress3.metric(f"Chance of High Risk (≥ {HIGH_RISK_THRESHOLD:.0f})", f"{high_risk_prob*100:,.0f}%")
+
 # ====== EMI CALCULATOR SECTION (NEW) ======
 elif st.session_state.page == "emi":
     st.markdown("---")
@@ -527,18 +835,37 @@ elif st.session_state.page == "emi":
             tenure_years = st.slider("Loan Tenure (Years)", min_value=1, max_value=30, step=1, value=15)
             st.markdown("<div style='height: 38px;'></div>", unsafe_allow_html=True)
             
+        with st.expander("⚙️ Prepayments, EMI Step-ups & Rate Resets (Optional)"):
+            col_ev1, col_ev2, col_ev3 = st.columns(3)
+            with col_ev1:
+                prepay_amount = st.number_input("Lump-sum Prepayment (₹)", min_value=0, max_value=10000000, step=50000, value=0)
+                prepay_year = st.slider("Prepay After Year", min_value=1, max_value=30, step=1, value=5)
+            with col_ev2:
+                step_up_pct = st.slider("Yearly EMI Step-up (%)", min_value=0.0, max_value=20.0, step=0.5, value=0.0)
+            with col_ev3:
+                apply_reset = st.checkbox("Apply a Rate Reset", value=False)
+                reset_rate = st.slider("Reset Interest Rate To (%)", min_value=1.0, max_value=25.0, step=0.1, value=10.5)
+                reset_year = st.slider("Rate Reset After Year", min_value=1, max_value=30, step=1, value=3)
+
 
         calculate_emi_button = st.form_submit_button(label="💵 Calculate Full Repayment")
 
     if calculate_emi_button:
+        # No reset unless the user asked for one (the slider alone always holds a rate)
+        reset_rate = reset_rate if apply_reset else None
+        st.session_state.emi_inputs = (loan_amount, interest_rate, tenure_years, prepay_amount, prepay_year,
+                                       step_up_pct, reset_rate, reset_year)
+        speculate_neighbours('emi', dict(loan_amount=loan_amount, interest_rate=interest_rate,
+                                         tenure_years=tenure_years))
+
+    if st.session_state.emi_inputs is not None:
+        (loan_amount, interest_rate, tenure_years, prepay_amount, prepay_year,
+         step_up_pct, reset_rate, reset_year) = st.session_state.emi_inputs
         if loan_amount > 0 and interest_rate >= 0 and tenure_years > 0:
             
-            # 1. Calculate EMI
-            emi = calculate_emi(loan_amount, interest_rate, tenure_years)
-            
-            # 2. Create Amortization Summary & get totals
-            df_summary, total_interest, total_payable = create_amortization_summary(
-                loan_amount, interest_rate, emi, tenure_years
+            # 1-2. EMI, amortization summary and totals (cached per input tuple)
+            emi, df_summary, total_interest, total_payable = build_emi_results(
+                loan_amount, interest_rate, tenure_years
             )
 
             st.markdown("---")
@@ -557,50 +884,52 @@ elif st.session_state.page == "emi":
             st.markdown("<h3 style='color:#FFFFFF;'>Repayment Breakdown Over Time</h3>", unsafe_allow_html=True)
 
             if df_summary is not None and not df_summary.empty:
-                df_plot = df_summary.rename(columns={
-                    'Principal Component': 'Principal',
-                    'Interest Component': 'Interest'
-                })
-                
-                # Melt the DataFrame for Plotly stacked bar chart
-                df_melted = df_plot.melt(
-                    id_vars=['Year', 'Month', 'Remaining Balance'],
-                    value_vars=['Principal', 'Interest'],
-                    var_name='Payment Type',
-                    value_name='Amount'
-                )
-                
-                # Generate Plotly chart
-                fig = px.bar(
-                    df_melted, 
-                    x='Month', 
-                    y='Amount', 
-                    color='Payment Type',
-                    title='EMI Components Over Repayment Period (Quarterly Snapshot)',
-                    color_discrete_map={'Principal': '#6AA7A3', 'Interest': '#B69B75'}
-                )
-                
-                fig.update_layout(
-                    xaxis_title="Month of Repayment",
-                    yaxis_title="Amount (₹)",
-                    plot_bgcolor='#1C1C1A', 
-                    paper_bgcolor='#151E28', 
-                    font_color='#F9F9F9',   
-                    title_font_size=18
-                )
-                
+                fig, fig_stats = emi_chart(loan_amount, interest_rate, tenure_years)
                 st.plotly_chart(fig, use_container_width=True)
+                chart_caption(fig_stats)
 
                 
-                if st.checkbox('Show Full Amortization Data Table (Quarterly View)'):
-                    df_display = df_summary.copy()
-                    df_display['Principal Component'] = df_display['Principal Component'].apply(lambda x: f"₹{x:,.0f}")
-                    df_display['Interest Component'] = df_display['Interest Component'].apply(lambda x: f"₹{x:,.0f}")
-                    df_display['Remaining Balance'] = df_display['Remaining Balance'].apply(lambda x: f"₹{x:,.0f}")
-                    st.dataframe(df_display.set_index('Month'))
+                if st.checkbox('Show Full Amortization Data Table (Monthly View)'):
+                    # Only the visible page is computed and formatted
+                    table = LedgerTable(build_emi_ledger(loan_amount, interest_rate, tenure_years))
+                    col_pg1, col_pg2, col_pg3, col_pg4 = st.columns([1, 1, 1, 1])
+                    page_size = col_pg1.selectbox("Rows per Page", [12, 60, 120], index=1)
+                    n_pages = table.n_pages(page_size)
+                    page_number = col_pg2.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1, step=1)
+                    df_page = table.page(int(page_number) - 1, page_size, columns=TABLE_COLUMNS[1:])
+                    st.dataframe(df_page.set_index('Month'), use_container_width=True)
+
+                    file_stem = f"amortization_{loan_amount}_{interest_rate}_{tenure_years}y"
+                    col_pg3.download_button("⬇️ CSV", export_schedule(loan_amount, interest_rate, tenure_years, "csv"),
+                                            file_name=f"{file_stem}.csv", mime="text/csv", use_container_width=True)
+                    col_pg4.download_button("⬇️ Excel", export_schedule(loan_amount, interest_rate, tenure_years, "xlsx"),
+                                            file_name=f"{file_stem}.xlsx", use_container_width=True,
+                                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
                 else:
                     st.info("Notice how the **Interest** component of the payment is largest at the beginning and the **Principal** component grows over time.")
-            
+
+            # 4. Prepayments, step-ups and rate resets (closed form per constant-rate segment)
+            if prepay_amount > 0 or step_up_pct > 0 or reset_rate is not None:
+                event_inputs = (loan_amount, interest_rate, tenure_years, prepay_amount, prepay_year,
+                                step_up_pct, reset_rate, reset_year)
+                events_summary, balance_paths = build_event_results(*event_inputs)
+                events_fig, events_fig_stats = events_chart(event_inputs, balance_paths)
+
+                st.markdown("---")
+                st.markdown("<h3 style='color:#FFFFFF;'>With Prepayments, Step-ups & Rate Resets</h3>", unsafe_allow_html=True)
+                col_ev1, col_ev2, col_ev3 = st.columns(3)
+                col_ev1.metric("Interest Saved", f"₹{events_summary['interest_saved']:,.0f}", delta_color="off")
+                months_saved = events_summary['tenure_reduction']
+                col_ev2.metric("Tenure Reduction", f"{months_saved // 12} yrs {months_saved % 12} mo" if months_saved >= 0
+                               else f"+{-months_saved // 12} yrs {-months_saved % 12} mo", delta_color="off")
+                if events_summary['paid_off']:
+                    col_ev3.metric("Loan Closes After", f"{events_summary['num_months'] // 12} yrs {events_summary['num_months'] % 12} mo")
+                else:
+                    col_ev3.metric("Loan Closes After", "Never")
+                    st.warning("After the rate reset the EMI no longer covers the monthly interest, so the balance keeps growing.")
+                st.plotly_chart(events_fig, use_container_width=True)
+                chart_caption(events_fig_stats)
+
         else:
             st.error("Please enter valid positive loan details.")
 
@@ -621,37 +950,43 @@ elif st.session_state.page == "shap":
         # Pre-fill inputs from the last successful eligibility check
         inputs = st.session_state.eligibility_inputs
         
+        # The model was trained on Age, Income, Credit Card spend and Education
         with col1:
-            shap_loan_amount = st.slider("Loan Amount (₹) for Explanation", min_value=100000, max_value=4000000, step=5000, 
-                                         value=inputs['loan_amount'])
-            shap_interest_rate = st.slider("Interest Rate (%) for Explanation", min_value=5.0, max_value=20.0, step=0.1, 
-                                            value=inputs['interest_rate'])
-            shap_tenure = st.slider("Loan Tenure (Years) for Explanation", min_value=1, max_value=30, step=1, 
-                                     value=inputs['tenure'])
-
-        with col2:
+            shap_age = st.slider("Age (Years) for Explanation", min_value=21, max_value=70, step=1, 
+                                 value=inputs.get('age', 35))
             shap_income = st.slider("Monthly Income (₹) for Explanation", min_value=20000,max_value=200000,     step=1000, 
                                      value=inputs['income'])
-            shap_credit_score = st.slider("Credit Score (CIBIL) for Explanation", min_value=300, max_value=900, 
-                                             value=inputs['credit_score'])
-            st.markdown("<div style='height: 38px;'></div>", unsafe_allow_html=True)
+
+        with col2:
+            shap_cc_spend = st.slider("Avg. Monthly Credit Card Spend (₹) for Explanation", min_value=0, max_value=10000, step=100, 
+                                      value=inputs.get('cc_spend', 1500))
+            shap_education = st.selectbox("Education Level for Explanation", options=list(EDUCATION_LEVELS), 
+                                          format_func=EDUCATION_LEVELS.get, 
+                                          index=inputs.get('education', 2) - 1)
 
         analyze_shap_button = st.form_submit_button(label="💡 Re-Analyze Explanation")
 
-    # Run the simulation immediately if the page loads or the user clicks Re-Analyze
+    # Run the explanation immediately if the page loads or the user clicks Re-Analyze
     if 'shap_last_run' not in st.session_state:
         st.session_state.shap_last_run = False
 
     if analyze_shap_button or not st.session_state.shap_last_run:
         
-        base_prob, final_prob, df_shap = simulate_shap_explanation(
-            credit_score=shap_credit_score,
-            monthly_income=shap_income,
-            desired_loan_amount=shap_loan_amount,
-            loan_tenure_years=shap_tenure,
-            annual_rate=shap_interest_rate
+        base_prob, final_prob, df_shap, fig = build_shap_results(
+            shap_age, shap_income, shap_cc_spend, shap_education
         )
         st.session_state.shap_last_run = True # Mark as run
+        if analyze_shap_button:
+            # Remember the profile for the Eligibility page's similar-customer lookup
+            st.session_state.eligibility_inputs.update({
+                'age': shap_age,
+                'cc_spend': shap_cc_spend,
+                'education': shap_education
+            })
+            # Count the submitted applicant against the training distribution (see loanease.drift)
+            drift.record(applicant_features(shap_age, shap_income, shap_cc_spend, shap_education))
+            speculate_neighbours('shap', dict(age=shap_age, income=shap_income, cc_spend=shap_cc_spend,
+                                              education=shap_education))
 
         st.markdown("---")
         
@@ -668,30 +1003,7 @@ elif st.session_state.page == "shap":
         
         st.markdown("---")
         
-        st.markdown("<h3 style='color:#FFFFFF;'>Feature Contribution Plot (Simulated)</h3>", unsafe_allow_html=True)
-
-        # Create the Horizontal Bar Chart (SHAP Force Plot style)
-        fig = px.bar(
-            df_shap.sort_values(by='SHAP_Value', ascending=True), # Sort for visual clarity
-            x='SHAP_Value',
-            y='Feature',
-            color='Group', # Use the Group (Positive/Negative) for color
-            orientation='h',
-            title="How Each Factor Pushed the Approval Probability",
-            color_discrete_map={'Positive': '#6AA7A3', 'Negative': '#B69B75'}
-        )
-
-        fig.update_layout(
-            xaxis_title="Contribution to Prediction (Percentage Points)",
-            yaxis_title="Financial Feature",
-            plot_bgcolor='#1C1C1A', 
-            paper_bgcolor='#151E28',
-            font_color='#F9F9F9',
-            title_font_size=18
-        )
-        
-        # Add a vertical line at x=0 for visual reference
-        fig.add_vline(x=0, line_width=1, line_dash="dash", line_color="#F9F9F9")
+        st.markdown("<h3 style='color:#FFFFFF;'>Feature Contribution Plot (TreeSHAP)</h3>", unsafe_allow_html=True)
 
         st.plotly_chart(fig, use_container_width=True)
         
@@ -700,7 +1012,68 @@ elif st.session_state.page == "shap":
         st.subheader("Detailed Feature Descriptions:")
         for index, row in df_shap.iterrows():
             icon = "⬆️" if row['Group'] == 'Positive' else "⬇️"
-            st.markdown(f"**{icon} {row['Feature']} ({row['SHAP_Value']*100:+.0f} pp):** {row['Description']}", unsafe_allow_html=True)
+            st.markdown(f"**{icon} {row['Feature']} ({row['SHAP_Value']*100:+.1f} pp):** {row['Description']}", unsafe_allow_html=True)
+
+        cache_stats = explanation_cache_stats()
+        st.caption(f"Explanation cache: {cache_stats['hit_rate']*100:.0f}% hit rate "
+                   f"({cache_stats['entries']} cached profiles, {cache_stats['bytes']/1024:.1f} KB)")
+
+    # --- Global view: TreeSHAP for every past customer, precomputed offline (see loanease.global_explain) ---
+    with st.expander("🌐 Global Explanations (All Past Customers)"):
+        try:
+            global_results = build_global_results()
+        except FileNotFoundError:
+            # The app only loads the artifact; building it is an offline job
+            global_results = None
+            st.info("Global explanations have not been computed for the current data and model yet. "
+                    "Run `python -m loanease.global_explain` (or `python train_save_model.py`) to build them.")
+        if global_results is not None:
+            summary, fig_importance, fig_dependence, fig_segments, df_segments = global_results
+            st.plotly_chart(fig_importance, use_container_width=True)
+            st.plotly_chart(fig_dependence, use_container_width=True)
+            st.plotly_chart(fig_segments, use_container_width=True)
+            st.dataframe(df_segments.style.format({'Took a Loan (%)': '{:.1f}', 'Mean Predicted (%)': '{:.1f}'}),
+                         hide_index=True, use_container_width=True)
+            st.caption(f"{summary['rows']:,} customers · baseline approval probability "
+                       f"{summary['base_probability']*100:.0f}% · precomputed in {summary['seconds']:.1f} s "
+                       f"(`python -m loanease.global_explain`)")
+
+# ====== DEBUG PANEL (OPT-IN) ======
+if DEBUG_PANEL:
+    with st.expander("🛠️ Performance Metrics (Debug)"):
+        import pandas as pd
+
+        snapshot = metrics.snapshot()
+        st.caption("Rolling latency over the last 1,024 calls of each timer (this render is recorded once it finishes).")
+        if snapshot['timers']:
+            df_timers = pd.DataFrame(snapshot['timers']).T
+            df_timers[['mean_s', 'p50_s', 'p95_s', 'p99_s', 'max_s']] *= 1000
+            df_timers.columns = ['Calls', 'Mean (ms)', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)', 'Max (ms)']
+            df_timers['Calls'] = df_timers['Calls'].astype(int)
+            st.dataframe(df_timers.sort_values('Calls', ascending=False).style.format(precision=3), use_container_width=True)
+
+        if snapshot['counters']:
+            df_counters = pd.Series(snapshot['counters'], name='Total').rename_axis('Counter').to_frame()
+            st.dataframe(df_counters.sort_index(), use_container_width=True)
+
+        df_gauges = pd.DataFrame([
+            {'Source': source, 'Field': field, 'Value': value}
+            for source, values in snapshot['gauges'].items() for field, value in values.items()
+        ])
+        if not df_gauges.empty:
+            st.dataframe(df_gauges.pivot(index='Source', columns='Field', values='Value'), use_container_width=True)
+
+        col_dbg1, col_dbg2, col_dbg3 = st.columns(3)
+        col_dbg1.download_button("⬇️ Prometheus Text", metrics.prometheus_text(), file_name="loanease_metrics.prom",
+                                 mime="text/plain", use_container_width=True)
+        col_dbg2.download_button("⬇️ JSON Lines", json.dumps(snapshot) + "\n", file_name="loanease_metrics.jsonl",
+                                 mime="application/jsonl", use_container_width=True)
+        if col_dbg3.button("Reset Metrics", use_container_width=True):
+            metrics.reset()
+
+metrics.observe("page_render", time.perf_counter() - render_started, page=st.session_state.page)
+if SPECULATE:
+    speculate.end_render(render_token)
 
 # ====== FOOTER ======
 st.markdown("<div class='footer'> LoanEase | Simplifying finance, one click at a time💸</div>", unsafe_allow_html=True)
@@ -0,0 +1,331 @@
+# app_loadtest.py
+# Concurrent-session load test for app.py, driven headlessly with Streamlit's AppTest.
+#
+# Every simulated session is its own AppTest (its own session state) running on
+# its own thread in this process, the same way a Streamlit server runs each
+# browser session's reruns on a thread of one process. A session walks the
+# whole app: home -> Eligibility form -> home -> Risk form -> home -> EMI form
+# -> home -> SHAP form, navigating with the go_to buttons and submitting each
+# form with random slider values. Every rerun is timed.
+#
+# For each session count N the harness reports rerun latency percentiles
+# (overall and per page), rerun throughput, and resident memory per session.
+# With --nudges, every form submit is followed by resubmits that move one
+# slider by one step, the way users fine-tune; --speculate turns on the app's
+# background precompute of those neighbours and reports its hit rate and CPU.
+#
+# Usage:
+#   python app_loadtest.py --sessions 1 4 16 --journeys 3
+#   python app_loadtest.py --sessions 8 --distinct-inputs 5 --output loadtest.json   # mostly cache hits
+#   python app_loadtest.py --sessions 4 --nudges 3 --think-ms 300 --speculate
+import argparse
+import gc
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+# app.py imports the loanease package from its own directory, which AppTest does not put on sys.path
+if os.path.dirname(APP_PATH) not in sys.path:
+    sys.path.insert(0, os.path.dirname(APP_PATH))
+
+# Slider ranges (min, max, step) of each form, taken from app.py
+FORMS = {
+    'eligibility': {
+        "Desired Loan Amount (₹)": (100000, 4000000, 5000),
+        "Interest Rate (%)": (1.0, 20.0, 0.1),
+        "Loan Tenure (Years)": (1, 30, 1),
+        "Monthly Income (₹)": (20000, 200000, 1000),
+        "Credit Score (Simulated)": (300, 900, 1),
+    },
+    'risk': {
+        "Annual Income (₹)": (240000, 24000000, 10000),
+        "Existing Monthly Debt (EMIs / Credit Cards) (₹)": (0, 500000, 5000),
+        "Credit Score (CIBIL)": (300, 900, 1),
+        "Monthly Fixed Expenses (Rent, Utilities, etc.) (₹)": (0, 200000, 1000),
+    },
+    'emi': {
+        "Loan Principal (₹)": (100000, 10000000, 10000),
+        "Annual Interest Rate (%)": (1.0, 25.0, 0.1),
+        "Loan Tenure (Years)": (1, 30, 1),
+    },
+    'shap': {
+        "Age (Years) for Explanation": (21, 70, 1),
+        "Monthly Income (₹) for Explanation": (20000, 200000, 1000),
+        "Avg. Monthly Credit Card Spend (₹) for Explanation": (0, 10000, 100),
+    },
+}
+PAGE_BUTTONS = {
+    'eligibility': "eligibility-feature-card-btn",
+    'risk': "risk-feature-card-btn",
+    'emi': "emi-feature-card-btn",
+    'shap': "shap-feature-card-btn",
+}
+HOME_BUTTON = "fixed_home_button"
+
+
+def rss_bytes():
+    """Current resident set size of this process (Linux /proc; peak RSS elsewhere, NaN on Windows)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return float('nan')
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _share_runtime():
+    """Lets several AppTests run at once in this process.
+
+    AppTest installs a mock Runtime as the process-wide singleton at the start
+    of every run and clears it at the end, so one session finishing would pull
+    the runtime out from under the others. Fall back to one shared mock
+    whenever no run has installed its own. Each AppTest also compiles the
+    script with its own ScriptCache, and concurrent compiles of the same AST
+    are not thread-safe in CPython 3.11; share one cache, like the server.
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import local_script_runner
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+    if getattr(Runtime, '_loadtest_shared', None) is not None:
+        return
+    shared = MagicMock(spec=Runtime)
+    shared.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._loadtest_shared = shared
+    Runtime.instance = classmethod(lambda cls: cls._instance or cls._loadtest_shared)
+    Runtime.exists = classmethod(lambda cls: True)
+    script_cache = ScriptCache()
+    local_script_runner.ScriptCache = lambda: script_cache
+    # AppTest also patches this option per run and restores it on exit; keep it on throughout
+    config.set_option("global.appTest", True)
+
+
+def _input_pool(rng, distinct_inputs):
+    """`distinct_inputs` random value sets per form; small pools mean more shared-cache hits."""
+    pool = {}
+    for page, sliders in FORMS.items():
+        pool[page] = []
+        for _ in range(distinct_inputs):
+            values = {}
+            for label, (low, high, step) in sliders.items():
+                n_steps = int(round((high - low) / step))
+                value = low + step * int(rng.integers(0, n_steps + 1))
+                values[label] = round(value, 1) if isinstance(step, float) else int(value)
+            pool[page].append(values)
+    return pool
+
+
+class Session:
+    """One simulated user: an AppTest instance plus its timed reruns."""
+
+    def __init__(self, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.timings = []   # (page, action, seconds)
+        self.errors = 0
+
+    def _rerun(self, page, action):
+        start = time.perf_counter()
+        self.app.run()
+        self.timings.append((page, action, time.perf_counter() - start))
+        if self.app.exception:
+            self.errors += 1
+
+    def open(self):
+        self._rerun('home', 'load')
+
+    def go_to(self, page):
+        self.app.button(key=PAGE_BUTTONS[page]).click()
+        self._rerun(page, 'navigate')
+
+    def go_home(self):
+        self.app.button(key=HOME_BUTTON).click()
+        self._rerun('home', 'navigate')
+
+    def submit(self, page, values, action='submit'):
+        for slider in self.app.slider:
+            if slider.label in values:
+                slider.set_value(values[slider.label])
+        for button in self.app.button:
+            if button.proto.is_form_submitter:
+                button.click()
+                break
+        self._rerun(page, action)
+
+    def journey(self, rng, pool, nudges=0, think=0.0):
+        for page in ('eligibility', 'risk', 'emi', 'shap'):
+            self.go_to(page)
+            values = pool[page][int(rng.integers(0, len(pool[page])))]
+            self.submit(page, values)
+            for _ in range(nudges):
+                time.sleep(think)
+                values = _nudge(rng, page, values)
+                self.submit(page, values, 'nudge')
+            self.go_home()
+
+
+def _nudge(rng, page, values):
+    # One slider, one step up or down, kept inside the slider's range
+    label = list(FORMS[page])[int(rng.integers(0, len(FORMS[page])))]
+    low, high, step = FORMS[page][label]
+    value = values[label] + step * (1 if rng.random() < 0.5 else -1)
+    if not low <= value <= high:
+        value = values[label] - (value - values[label])
+    value = round(value, 1) if isinstance(step, float) else int(value)
+    return dict(values, **{label: value})
+
+
+def _percentiles_ms(seconds):
+    ms = np.asarray(seconds) * 1000
+    if not len(ms):
+        return {}
+    return {'p50_ms': float(np.percentile(ms, 50)), 'p95_ms': float(np.percentile(ms, 95)),
+            'p99_ms': float(np.percentile(ms, 99)), 'max_ms': float(ms.max()), 'reruns': int(len(ms))}
+
+
+# Function to run N concurrent sessions and summarize them
+def run_sessions(n_sessions, journeys=2, distinct_inputs=50, seed=0, timeout=120, nudges=0, think_ms=0.0):
+    from loanease import speculate
+
+    _share_runtime()
+    gc.collect()
+    rss_before = rss_bytes()
+    speculation_before = speculate.stats()
+    cpu_before = time.process_time()
+    pool = _input_pool(np.random.default_rng(seed), distinct_inputs)
+    sessions = [Session(timeout) for _ in range(n_sessions)]
+    ready = threading.Barrier(n_sessions)
+    failures = []
+
+    def drive(i, session):
+        rng = np.random.default_rng([seed, i])
+        try:
+            ready.wait()
+            session.open()
+            for _ in range(journeys):
+                session.journey(rng, pool, nudges, think_ms / 1000)
+        except Exception as e:  # report, don't hang the other sessions
+            failures.append(repr(e))
+
+    threads = [threading.Thread(target=drive, args=(i, s), name=f"session-{i}") for i, s in enumerate(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    # Sessions are still alive here, so their state counts towards RSS
+    rss_after = rss_bytes()
+    cpu_seconds = time.process_time() - cpu_before
+    speculation = speculate.stats()
+    if speculation:
+        # This run's share of the process-wide counters
+        speculation = {key: value - speculation_before.get(key, 0) for key, value in speculation.items()
+                       if key not in ('hit_rate', 'cpu_ms_per_hit', 'queued', 'cache_entries', 'cache_bytes')}
+        speculation['hit_rate'] = speculation['hits'] / speculation['completed'] if speculation['completed'] else 0.0
+        speculation['cpu_share'] = speculation['cpu_seconds'] / cpu_seconds if cpu_seconds else 0.0
+    timings = [t for s in sessions for t in s.timings]
+    by_page = defaultdict(list)
+    by_action = defaultdict(list)
+    for page, action, seconds in timings:
+        by_page[page].append(seconds)
+        by_action[action].append(seconds)
+
+    return {
+        'sessions': n_sessions,
+        'seconds': elapsed,
+        'reruns': len(timings),
+        'throughput_reruns_per_s': len(timings) / elapsed if elapsed else 0.0,
+        'latency': _percentiles_ms([t[2] for t in timings]),
+        'latency_by_page': {page: _percentiles_ms(v) for page, v in sorted(by_page.items())},
+        'latency_by_action': {action: _percentiles_ms(v) for action, v in sorted(by_action.items())},
+        'rss_mb': rss_after / 2**20,
+        'rss_per_session_mb': max(rss_after - rss_before, 0) / 2**20 / n_sessions,
+        'cpu_seconds': cpu_seconds,
+        'speculation': speculation,
+        'app_exceptions': sum(s.errors for s in sessions),
+        'failures': failures,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent Streamlit sessions of app.py.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16], help="session counts to run")
+    parser.add_argument("--journeys", type=int, default=2, help="full four-page journeys per session")
+    parser.add_argument("--distinct-inputs", type=int, default=50,
+                        help="distinct slider settings per form shared by all sessions")
+    parser.add_argument("--no-warmup", action="store_true",
+                        help="skip the untimed first session (it pays for importing plotly/xgboost)")
+    parser.add_argument("--nudges", type=int, default=0,
+                        help="resubmits after each form submit, each moving one slider by one step")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause before each nudged resubmit")
+    parser.add_argument("--speculate", action="store_true",
+                        help="precompute neighbouring slider settings in the background (LOANEASE_SPECULATE=1)")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    # Bare-mode warnings from the main thread would drown the table
+    from streamlit import logger
+    logger.set_log_level("error")
+    if args.speculate:
+        from loanease import speculate
+        speculate.enable()
+
+    if not args.no_warmup:
+        run_sessions(1, journeys=1, distinct_inputs=1, seed=args.seed)
+
+    results = []
+    print(f"{'sessions':>8} {'reruns':>7} {'reruns/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'RSS MB':>8} {'MB/session':>11}")
+    for n in args.sessions:
+        result = run_sessions(n, args.journeys, args.distinct_inputs, args.seed,
+                              nudges=args.nudges, think_ms=args.think_ms)
+        results.append(result)
+        lat = result['latency']
+        print(f"{n:>8} {result['reruns']:>7} {result['throughput_reruns_per_s']:>9.1f} {lat['p50_ms']:>8.1f} "
+              f"{lat['p95_ms']:>8.1f} {lat['p99_ms']:>8.1f} {result['rss_mb']:>8.0f} "
+              f"{result['rss_per_session_mb']:>11.2f}")
+        if result['app_exceptions'] or result['failures']:
+            print(f"         {result['app_exceptions']} app exception(s), failures: {result['failures'][:3]}")
+        spec = result['speculation']
+        if spec:
+            print(f"         speculation: {spec['completed']} computed, {spec['hits']} hits ({spec['hit_rate']:.0%}), "
+                  f"{spec['cancelled']} cancelled, {spec['dropped']} dropped, {spec['cpu_seconds']:.2f} s CPU "
+                  f"({spec['cpu_share']:.0%} of the process)")
+
+    last = results[-1]
+    print(f"\nPer page at {last['sessions']} sessions (p50 / p95 ms):")
+    for page, lat in last['latency_by_page'].items():
+        print(f"  {page:<12} {lat['p50_ms']:8.1f} / {lat['p95_ms']:8.1f}  ({lat['reruns']} reruns)")
+    if 'nudge' in last['latency_by_action']:
+        lat = last['latency_by_action']['nudge']
+        print(f"  {'nudges':<12} {lat['p50_ms']:8.1f} / {lat['p95_ms']:8.1f}  ({lat['reruns']} reruns)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
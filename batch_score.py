@@ -0,0 +1,261 @@
+# batch_score.py
+# Headless batch scorer for loan-application portfolios.
+#
+# Streams a CSV or Parquet file in fixed-size chunks, applies the Eligibility Check
+# and Financial Risk Calculator rules to each chunk with vectorized NumPy code and
+# appends the results to the output file as it goes, so memory use depends on the
+# chunk size rather than on the size of the input. With --limits, eligibility rows
+# also get their pre-approved limits (largest loan, shortest tenure, highest rate).
+# With --drift-state, rows carrying the model features (Age, Income, CCAvg,
+# Education) are counted by the drift monitor, whose counts persist across runs;
+# with --peers they get the acceptance rate of their nearest past customers.
+#
+# Usage:
+#   python batch_score.py applications.parquet scored.parquet --chunk-size 200000
+#   python batch_score.py customers.parquet limits.parquet --limits
+#   python batch_score.py applications.parquet scored.parquet --drift-state drift_state.npz
+#   python batch_score.py applications.parquet scored.parquet --peers
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+from loanease import drift, peers
+from loanease.model_store import FEATURES
+from loanease.scoring import eligibility_check, risk_score
+from loanease.solvers import preapproved_limits
+
+# Input columns needed for each scorer
+ELIGIBILITY_COLUMNS = ['loan_amount', 'interest_rate', 'tenure', 'income', 'credit_score']
+RISK_COLUMNS = ['annual_income', 'existing_debt', 'credit_score', 'fixed_expenses', 'collateral']
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+# Arrow types of the columns score_chunk adds, so every Parquet chunk is written with the same schema
+OUTPUT_TYPES = {
+    'peer_acceptance_rate': 'float64',
+    'emi': 'float64', 'dti_ratio': 'float64', 'eligibility': 'string',
+    'max_loan_amount': 'float64', 'min_tenure': 'float64', 'max_interest_rate': 'float64',
+    'risk_dti': 'float64', 'risk_eti': 'float64', 'risk_score': 'float64', 'risk_band': 'string',
+}
+
+
+def _file_format(path, explicit=None):
+    if explicit:
+        return explicit
+    return 'parquet' if os.path.splitext(path)[1].lower() in ('.parquet', '.pq') else 'csv'
+
+
+# Function to yield the input file as DataFrame chunks
+def iter_chunks(path, chunk_size, fmt=None):
+    if _file_format(path, fmt) == 'parquet':
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def read_schema(path, fmt=None):
+    """Arrow schema of a Parquet input (None for CSV, whose types pandas infers per chunk)."""
+    if _file_format(path, fmt) != 'parquet':
+        return None
+    import pyarrow.parquet as pq
+
+    return pq.read_schema(path)
+
+
+# Function to score one chunk of applications
+def score_chunk(df, limits=False, peer_index=None):
+    """Adds eligibility and/or risk columns to a chunk, depending on which inputs it carries."""
+    out = df.copy()
+    scored = False
+
+    if peer_index is not None and all(col in df.columns for col in FEATURES):
+        # One batched k-NN query for the whole chunk
+        out['peer_acceptance_rate'] = peer_index.acceptance_rate(df[FEATURES].to_numpy(dtype='float64'))
+
+    if all(col in df.columns for col in ELIGIBILITY_COLUMNS):
+        other_emis = df['other_emis'].to_numpy() if 'other_emis' in df.columns else 0
+        result = eligibility_check(
+            df['loan_amount'].to_numpy(),
+            df['interest_rate'].to_numpy(),
+            df['tenure'].to_numpy(),
+            df['income'].to_numpy(),
+            df['credit_score'].to_numpy(),
+            other_emis,
+        )
+        out['emi'] = result['emi']
+        out['dti_ratio'] = result['dti_ratio']
+        out['eligibility'] = result['eligibility']
+        if limits:
+            result = preapproved_limits(
+                df['loan_amount'].to_numpy(),
+                df['interest_rate'].to_numpy(),
+                df['tenure'].to_numpy(),
+                df['income'].to_numpy(),
+                other_emis,
+            )
+            out['max_loan_amount'] = result['max_loan_amount']
+            out['min_tenure'] = result['min_tenure']
+            out['max_interest_rate'] = result['max_interest_rate']
+        scored = True
+
+    if all(col in df.columns for col in RISK_COLUMNS):
+        result = risk_score(
+            df['annual_income'].to_numpy(),
+            df['existing_debt'].to_numpy(),
+            df['credit_score'].to_numpy(),
+            df['fixed_expenses'].to_numpy(),
+            df['collateral'].to_numpy(),
+        )
+        out['risk_dti'] = result['dti']
+        out['risk_eti'] = result['eti']
+        out['risk_score'] = result['risk_score']
+        out['risk_band'] = result['risk_band']
+        scored = True
+
+    if not scored:
+        raise ValueError(
+            "Input has neither the eligibility columns "
+            f"{ELIGIBILITY_COLUMNS} nor the risk columns {RISK_COLUMNS}"
+        )
+    return out
+
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV or Parquet file without holding earlier chunks.
+
+    A Parquet file gets one schema, fixed at the first chunk: input columns keep
+    `input_schema`'s types when given (Parquet input), scored columns get
+    OUTPUT_TYPES, and anything else keeps the first chunk's inferred type, with
+    columns that are entirely missing there written as strings. Without an
+    input schema (CSV input) integer columns are written as float64: a later
+    chunk may hold a gap or a fractional value there. Later chunks are
+    converted to the schema, since pandas may infer a chunk differently (an
+    int column with gaps as float, an empty text column as float).
+    """
+
+    def __init__(self, path, fmt=None, input_schema=None):
+        self.path = path
+        self.fmt = _file_format(path, fmt)
+        self.input_schema = input_schema
+        self._parquet_writer = None
+        self._parquet_schema = None
+        self._wrote_header = False
+
+    def _schema_for(self, table):
+        import pyarrow as pa
+
+        fields = []
+        for field in table.schema:
+            if field.name in OUTPUT_TYPES:
+                field = field.with_type(pa.type_for_alias(OUTPUT_TYPES[field.name]))
+            elif self.input_schema is not None and field.name in self.input_schema.names:
+                field = field.with_type(self.input_schema.field(field.name).type)
+            elif table.column(field.name).null_count == len(table):
+                field = field.with_type(pa.string())
+            elif self.input_schema is None and pa.types.is_integer(field.type):
+                field = field.with_type(pa.float64())
+            fields.append(field)
+        return pa.schema(fields, metadata=table.schema.metadata)
+
+    def write(self, df):
+        if self.fmt == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._parquet_writer is None:
+                self._parquet_schema = self._schema_for(pa.Table.from_pandas(df, preserve_index=False))
+                self._parquet_writer = pq.ParquetWriter(self.path, self._parquet_schema)
+            for field in self._parquet_schema:
+                values = df[field.name]
+                if pa.types.is_string(field.type) and values.dtype != object:
+                    df = df.assign(**{field.name: values.astype(object).where(values.isna(), values.astype(str))})
+            table = pa.Table.from_pandas(df, schema=self._parquet_schema, preserve_index=False)
+            self._parquet_writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='a' if self._wrote_header else 'w',
+                      header=not self._wrote_header, index=False)
+            self._wrote_header = True
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Function to score a whole file chunk by chunk
+def score_file(input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE,
+               input_format=None, output_format=None, log=sys.stderr, limits=False, monitor=None,
+               peer_index=None):
+    """Scores `input_path` into `output_path` and returns (rows, seconds)."""
+    total_rows = 0
+    start = time.perf_counter()
+    with ChunkWriter(output_path, output_format, read_schema(input_path, input_format)) as writer:
+        for i, chunk in enumerate(iter_chunks(input_path, chunk_size, input_format), start=1):
+            writer.write(score_chunk(chunk, limits, peer_index))
+            if monitor is not None and all(col in chunk.columns for col in FEATURES):
+                monitor.update(chunk[FEATURES].to_numpy(dtype='float64'))
+            total_rows += len(chunk)
+            if log is not None:
+                elapsed = time.perf_counter() - start
+                rate = total_rows / elapsed if elapsed > 0 else float('inf')
+                print(f"chunk {i}: {total_rows:,} rows scored ({rate:,.0f} rows/sec)", file=log)
+    return total_rows, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score loan applications in streaming chunks.")
+    parser.add_argument("input", help="CSV or Parquet file of applications")
+    parser.add_argument("output", help="CSV or Parquet file to write scored rows to")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"rows per chunk (default: {DEFAULT_CHUNK_SIZE:,})")
+    parser.add_argument("--input-format", choices=['csv', 'parquet'], help="override format detection")
+    parser.add_argument("--output-format", choices=['csv', 'parquet'], help="override format detection")
+    parser.add_argument("--limits", action="store_true",
+                        help="add pre-approved limits (max loan, min tenure, max rate) to eligibility rows")
+    parser.add_argument("--drift-state",
+                        help="count model-feature rows in the drift monitor, continuing from this .npz file")
+    parser.add_argument("--peers", action="store_true",
+                        help="add the acceptance rate of each model-feature row's nearest past customers")
+    parser.add_argument("--quiet", action="store_true", help="only print the final summary")
+    args = parser.parse_args(argv)
+
+    if args.chunk_size <= 0:
+        parser.error("--chunk-size must be positive")
+
+    monitor = None
+    if args.drift_state:
+        monitor = drift.get_monitor()
+        if os.path.exists(args.drift_state):
+            monitor.load_state(args.drift_state)
+
+    rows, seconds = score_file(
+        args.input, args.output, args.chunk_size,
+        args.input_format, args.output_format,
+        log=None if args.quiet else sys.stderr,
+        limits=args.limits,
+        monitor=monitor,
+        peer_index=peers.get_index() if args.peers else None,
+    )
+    rate = rows / seconds if seconds > 0 else float('inf')
+    print(f"Scored {rows:,} rows in {seconds:.2f}s ({rate:,.0f} rows/sec) -> {args.output}")
+
+    if monitor is not None:
+        monitor.save(args.drift_state)
+        print(drift.format_report(monitor.report()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# benchmarks.py
+# Benchmark suite for the app's hot paths and the model.
+#
+# Times the EMI and amortization engine, explanations, the risk-score formula,
+# model loading and predict_proba over input sizes from 1 loan up to 1M loans,
+# writes the results as JSON and optionally compares them with a stored
+# baseline, exiting non-zero when any benchmark regresses past the threshold.
+#
+# Usage:
+#   python benchmarks.py --save-baseline bench_baseline.json     # record a baseline
+#   python benchmarks.py --compare bench_baseline.json            # fail on >20% slowdowns
+#   python benchmarks.py --quick --filter emi                     # small sizes, matching names only
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+SIZES = [1, 1_000, 100_000, 1_000_000]
+QUICK_SIZES = [1, 1_000, 10_000]
+# Full monthly schedules are (loans x 360) arrays, so they stop well below 1M loans
+SCHEDULE_SIZES = [1, 1_000, 10_000]
+
+DEFAULT_OUTPUT = "bench_results.json"
+DEFAULT_THRESHOLD = 0.20
+
+
+def time_call(func, min_time=0.2, max_repeats=1000):
+    """Median and best wall time of `func()` over enough repeats to fill `min_time`."""
+    times = []
+    start = time.perf_counter()
+    while len(times) < max_repeats and (len(times) < 3 or time.perf_counter() - start < min_time):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times)), float(np.min(times)), len(times)
+
+
+def _loan_book(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        'principal': rng.integers(20, 2000, n) * 5000.0,
+        'rate': rng.integers(10, 250, n) / 10,
+        'tenure': rng.integers(1, 31, n),
+        'income': rng.integers(20, 200, n) * 1000.0,
+        'credit_score': rng.integers(300, 901, n),
+        'annual_income': rng.integers(24, 2400, n) * 10000.0,
+        'existing_debt': rng.integers(0, 100, n) * 5000.0,
+        'fixed_expenses': rng.integers(0, 200, n) * 1000.0,
+        'collateral': rng.random(n) < 0.5,
+    }
+
+
+def _model_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.integers(23, 68, n),
+        rng.integers(8, 225, n),
+        rng.uniform(0, 10, n).round(1),
+        rng.integers(1, 4, n),
+    ]).astype(np.float64)
+
+
+# ====== BENCHMARK DEFINITIONS ======
+# Each entry yields (name, n_items, callable) for the sizes it supports
+def _calculator_benchmarks(sizes):
+    from loanease.amortization import amortization_schedule, calculate_emi, create_amortization_summary
+    from loanease.fixedpoint import paise_schedule
+    from loanease.scoring import eligibility_check, risk_score
+    from loanease.solvers import preapproved_limits
+
+    for n in sizes:
+        book = _loan_book(n)
+        if n == 1:
+            yield "calculate_emi[scalar]", 1, lambda: calculate_emi(2500000, 10.5, 15)
+            yield "create_amortization_summary[30y]", 1, \
+                lambda: create_amortization_summary(2500000, 10.5, calculate_emi(2500000, 10.5, 30), 30)
+        yield f"calculate_emi[n={n}]", n, lambda b=book: calculate_emi(b['principal'], b['rate'], b['tenure'])
+        yield f"eligibility_check[n={n}]", n, lambda b=book: eligibility_check(
+            b['principal'], b['rate'], b['tenure'], b['income'], b['credit_score'])
+        yield f"risk_score[n={n}]", n, lambda b=book: risk_score(
+            b['annual_income'], b['existing_debt'], b['credit_score'], b['fixed_expenses'], b['collateral'])
+        yield f"preapproved_limits[n={n}]", n, lambda b=book: preapproved_limits(
+            b['principal'], b['rate'], b['tenure'], b['income'])
+
+    for n in SCHEDULE_SIZES:
+        if n > max(sizes):
+            continue
+        book = _loan_book(n)
+        yield f"amortization_schedule[n={n}]", n, \
+            lambda b=book: amortization_schedule(b['principal'], b['rate'], b['tenure'])
+        yield f"paise_schedule[n={n}]", n, \
+            lambda b=book: paise_schedule(b['principal'], b['rate'], b['tenure'])
+
+
+def _model_benchmarks(sizes):
+    from loanease import compiled_model, explain, model_store
+
+    def cold_load():
+        model_store.clear_cache()
+        model_store.load_model()
+
+    yield "model_load[cold]", 1, cold_load
+    yield "model_load[warm]", 1, model_store.load_model
+
+    model = model_store.load_model()
+    forest = compiled_model.compile_booster(model.booster, model.mean, model.scale)
+    for n in sizes:
+        rows = _model_rows(n)
+        yield f"predict_proba[n={n}]", n, lambda r=rows: model.predict_proba(r)
+        yield f"compiled_predict[n={n}]", n, lambda r=rows: compiled_model.predict_approval(forest, r)
+        if n <= 10_000:  # TreeSHAP costs ~0.3 ms per row
+            yield f"model_contributions[n={n}]", n, lambda r=rows: explain.model_contributions(r, model)
+
+    def explain_uncached():
+        explain.EXPLANATION_CACHE.clear()
+        explain.explain_applicant(35, 75000, 1500, 2)
+
+    yield "explain_applicant[uncached]", 1, explain_uncached
+    yield "explain_applicant[cached]", 1, lambda: explain.explain_applicant(35, 75000, 1500, 2)
+
+
+BENCHMARK_GROUPS = [_calculator_benchmarks, _model_benchmarks]
+
+
+def run_benchmarks(sizes=SIZES, name_filter=None, min_time=0.2, log=print):
+    results = {}
+    for group in BENCHMARK_GROUPS:
+        for name, n_items, func in group(sizes):
+            if name_filter and name_filter not in name:
+                continue
+            median, best, repeats = time_call(func, min_time=min_time)
+            results[name] = {
+                'n': n_items,
+                'median_s': median,
+                'min_s': best,
+                'repeats': repeats,
+                'per_item_ns': median / n_items * 1e9,
+            }
+            log(f"{name:<40} {median * 1e3:>12.3f} ms  ({results[name]['per_item_ns']:,.1f} ns/item)")
+    return results
+
+
+# Function to compare results with a baseline run
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Returns a list of (name, baseline_s, current_s, ratio) for regressions beyond `threshold`."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        ratio = current['median_s'] / previous['median_s'] if previous['median_s'] > 0 else float('inf')
+        if ratio > 1 + threshold:
+            regressions.append((name, previous['median_s'], current['median_s'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the app's calculators and model.")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help=f"results JSON (default: {DEFAULT_OUTPUT})")
+    parser.add_argument("--save-baseline", metavar="PATH", help="also write the results as a baseline")
+    parser.add_argument("--compare", metavar="PATH", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown before failing, as a fraction (default: 0.20)")
+    parser.add_argument("--quick", action="store_true", help=f"use sizes {QUICK_SIZES} instead of {SIZES}")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds to spend per benchmark")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(QUICK_SIZES if args.quick else SIZES, args.filter, args.min_time)
+    document = {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        'results': results,
+    }
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w") as f:
+            json.dump(document, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for name, before, after, ratio in regressions:
+                print(f"  {name}: {before * 1e3:.3f} ms -> {after * 1e3:.3f} ms ({ratio:.2f}x)")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
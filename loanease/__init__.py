@@ -0,0 +1,33 @@
+# loanease/__init__.py
+# Core financial logic behind the LoanEase app, importable without Streamlit.
+#
+# Importing the package only pulls in NumPy. pandas, xgboost and plotly are
+# imported inside the functions that need them, and the model-backed modules
+# (loanease.model_store, loanease.explain) are loaded on first attribute access.
+import importlib
+
+from .amortization import amortization_schedule, calculate_emi, create_amortization_summary
+from .caching import LRUCache, memoize, page_cache_stats
+from .scoring import MAX_DTI, MIN_CREDIT_SCORE, eligibility_check, risk_score
+
+_LAZY_SUBMODULES = ('explain', 'model_store')
+
+__all__ = [
+    'amortization_schedule',
+    'calculate_emi',
+    'create_amortization_summary',
+    'eligibility_check',
+    'risk_score',
+    'MAX_DTI',
+    'MIN_CREDIT_SCORE',
+    'LRUCache',
+    'memoize',
+    'page_cache_stats',
+    *_LAZY_SUBMODULES,
+]
+
+
+def __getattr__(name):
+    if name in _LAZY_SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,172 @@
+# loanease/amortization.py
+# Vectorized EMI and amortization engine.
+#
+# Every function here broadcasts over NumPy arrays, so a single call can price
+# one loan or a whole book of loans. Month-by-month figures are derived from the
+# closed-form outstanding balance
+#
+#     B_k = P * (1 + r)^k - EMI * ((1 + r)^k - 1) / r
+#
+# instead of walking the schedule in a Python loop.
+from collections import namedtuple
+
+import numpy as np
+
+from .metrics import increment, timed
+
+# Columns produced by create_amortization_summary (used by the EMI page)
+SUMMARY_COLUMNS = ['Month', 'Year', 'Principal Component', 'Interest Component', 'Remaining Balance']
+
+# Result of amortization_schedule. Month-level arrays have shape (n_loans, max_months);
+# months beyond a loan's own tenure are zero-filled and flagged False in `active`.
+AmortizationSchedule = namedtuple(
+    'AmortizationSchedule',
+    ['emi', 'num_months', 'months', 'interest', 'principal', 'balance', 'active',
+     'total_interest', 'total_payable']
+)
+
+
+def _as_scalar_if_0d(value):
+    # Hand plain floats back to scalar callers so f-string formatting keeps working
+    value = np.asarray(value)
+    return value.item() if value.ndim == 0 else value
+
+
+# Function to calculate EMI (broadcasts like a NumPy ufunc)
+@timed("calculate_emi")
+def calculate_emi(principal, annual_rate, tenure_years):
+    """Monthly EMI for any broadcastable mix of scalars and arrays."""
+    principal = np.asarray(principal, dtype=np.float64)
+    # Monthly interest rate
+    r = np.asarray(annual_rate, dtype=np.float64) / (12 * 100)
+    # Total number of payments
+    n = np.asarray(tenure_years, dtype=np.float64) * 12
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        growth = (1 + r) ** n
+        amortizing = (principal * r * growth) / (growth - 1)
+        flat = np.where(n > 0, principal / n, 0.0)
+        emi = np.where(r == 0, flat, amortizing)
+        # Degenerate denominators fall back to straight-line repayment
+        emi = np.where(np.isfinite(emi), emi, flat)
+
+    emi = np.where(emi > 0, emi, 0.0)
+    increment("emi_loans", emi.size)
+    return _as_scalar_if_0d(emi)
+
+
+# Function to build full monthly schedules for one or many loans
+@timed("amortization_schedule")
+def amortization_schedule(principal, annual_rate, tenure_years, emi=None):
+    """Month-by-month interest, principal and balance for a batch of loans.
+
+    `principal`, `annual_rate` and `tenure_years` (and `emi`, if given) are
+    broadcast against each other into a 1-D batch of loans. When `emi` is None
+    the standard EMI from calculate_emi is used.
+    """
+    principal, annual_rate, tenure_years = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(principal, dtype=np.float64)),
+        np.atleast_1d(np.asarray(annual_rate, dtype=np.float64)),
+        np.atleast_1d(np.asarray(tenure_years)),
+    )
+    principal = principal.ravel()
+    annual_rate = annual_rate.ravel()
+    num_months = (tenure_years.ravel() * 12).astype(np.int64)
+    num_months = np.maximum(num_months, 0)
+
+    if emi is None:
+        emi = calculate_emi(principal, annual_rate, tenure_years.ravel())
+    emi = np.broadcast_to(np.asarray(emi, dtype=np.float64), principal.shape).astype(np.float64)
+
+    monthly_rate = (annual_rate / (12 * 100))[:, None]
+    max_months = int(num_months.max()) if num_months.size else 0
+    months = np.arange(1, max_months + 1)
+    k = np.arange(0, max_months + 1)[None, :]
+
+    P = principal[:, None]
+    E = emi[:, None]
+    with np.errstate(over='ignore', invalid='ignore'):
+        growth = (1 + monthly_rate) ** k
+        # Closed-form balance after k payments (annuity identity); r == 0 is a straight line
+        safe_rate = np.where(monthly_rate == 0, 1.0, monthly_rate)
+        balance_all = np.where(
+            monthly_rate == 0,
+            P - E * k,
+            P * growth - E * (growth - 1) / safe_rate,
+        )
+    # Once a loan is paid off it stays paid off
+    balance_all = np.maximum(balance_all, 0.0)
+
+    opening = balance_all[:, :-1]
+    interest = opening * monthly_rate
+    principal_paid = E - interest
+    # Final instalment: cap principal at what is still owed (same rule as the original loop)
+    overpay = opening < principal_paid
+    principal_paid = np.where(overpay, opening, principal_paid)
+    interest = np.where(overpay, E - principal_paid, interest)
+    closing = opening - principal_paid
+
+    active = months[None, :] <= num_months[:, None]
+    zero_rows = (emi == 0)[:, None]
+    active = active & ~zero_rows
+    interest = np.where(active, interest, 0.0)
+    principal_paid = np.where(active, principal_paid, 0.0)
+    closing = np.where(active, closing, 0.0)
+
+    total_interest = interest.sum(axis=1)
+    total_payable = principal + total_interest
+
+    return AmortizationSchedule(
+        emi=emi,
+        num_months=num_months,
+        months=months,
+        interest=interest,
+        principal=principal_paid,
+        balance=closing,
+        active=active,
+        total_interest=total_interest,
+        total_payable=total_payable,
+    )
+
+
+# Function to create a simplified amortization schedule (for visualization)
+@timed("create_amortization_summary")
+def create_amortization_summary(principal, annual_rate, emi, tenure_years, exact=False, ledger=None):
+    """Quarterly summary table plus total interest and total payable.
+
+    With `exact`, the figures come from the integer-paise ledger in
+    loanease.fixedpoint, so the totals reconcile to the paisa; pass `ledger`
+    (a PaiseSchedule for this loan) to reuse one already built.
+    """
+    num_months = int(tenure_years * 12)
+
+    if num_months == 0 or emi == 0:
+        return None, 0, 0
+
+    import pandas as pd
+
+    if exact:
+        from .fixedpoint import paise_schedule, to_rupees
+
+        if ledger is None:
+            ledger = paise_schedule(principal, annual_rate, tenure_years, emi=emi)
+        schedule = ledger._replace(interest=to_rupees(ledger.interest), principal=to_rupees(ledger.principal),
+                                   balance=to_rupees(ledger.balance), total_interest=to_rupees(ledger.total_interest))
+    else:
+        schedule = amortization_schedule(principal, annual_rate, tenure_years, emi=emi)
+
+    # Simplified summary for visualization (quarterly breakdown + final month)
+    months = schedule.months[:num_months]
+    keep = (months % 3 == 0) | (months == num_months)
+    month_idx = months[keep]
+
+    df_summary = pd.DataFrame({
+        'Month': month_idx,
+        'Year': (month_idx - 1) // 12 + 1,
+        'Principal Component': schedule.principal[0, :num_months][keep],
+        'Interest Component': schedule.interest[0, :num_months][keep],
+        'Remaining Balance': schedule.balance[0, :num_months][keep],
+    }, columns=SUMMARY_COLUMNS)
+
+    total_interest = float(schedule.total_interest[0])
+    return df_summary, total_interest, principal + total_interest
@@ -0,0 +1,207 @@
+# loanease/caching.py
+# Small thread-safe LRU cache with hit/miss accounting.
+#
+# Slider inputs in the app snap to fixed steps, so the same handful of input
+# tuples come back again and again; caching their results avoids recomputing them.
+import functools
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+
+from .metrics import register_gauges
+
+
+def estimate_size(value):
+    """Rough size in bytes of a cached value (NumPy/pandas/plotly aware)."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if hasattr(value, "to_plotly_json"):
+        # A figure object is a thin wrapper; its traces hold the data
+        return estimate_size(value.to_plotly_json())
+    if hasattr(value, "memory_usage"):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """Least-recently-used cache bounded by entry count, total estimated bytes and entry age."""
+
+    def __init__(self, max_entries=1024, max_bytes=None, ttl=None, sizeof=estimate_size, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.current_bytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, size, expires_at = entry
+                if expires_at is not None and expires_at <= self.clock():
+                    del self._data[key]
+                    self.current_bytes -= size
+                    self.expirations += 1
+                else:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        expires_at = self.clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._data:
+                self.current_bytes -= self._data.pop(key)[1]
+            self._data[key] = (value, size, expires_at)
+            self.current_bytes += size
+            self._evict()
+
+    def pop(self, key, default=None):
+        """Removes and returns the value for `key` (counted like get)."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                value, size, expires_at = entry
+                self.current_bytes -= size
+                if expires_at is None or expires_at > self.clock():
+                    self.hits += 1
+                    return value
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached value for `key`, calling `compute()` on a miss."""
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def _evict(self):
+        while self._data and (
+            len(self._data) > self.max_entries
+            or (self.max_bytes is not None and self.current_bytes > self.max_bytes)
+        ):
+            _, (_, size, _) = self._data.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._data),
+                'bytes': self.current_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': self.hit_rate,
+            }
+
+
+# ====== SHARED RESULT CACHE ======
+# One process-wide cache for the calculator pages. Streamlit runs every session
+# in the same process, so a result computed for one user is reused by the next
+# user who submits the same inputs.
+RESULT_CACHE = LRUCache(max_entries=2048, ttl=60 * 60)
+
+# Results computed ahead of a request for inputs nobody has submitted yet (see
+# loanease.speculate). Kept apart from RESULT_CACHE, under its own memory cap, so
+# speculation can never evict a real result; a hit moves the entry across.
+SPECULATIVE_CACHE = LRUCache(max_entries=1024, max_bytes=64 * 2**20, ttl=10 * 60)
+
+_page_counters = defaultdict(lambda: {'hits': 0, 'misses': 0, 'speculative_hits': 0})
+_counter_lock = threading.Lock()
+
+
+def _memo_key(func, args, kwargs):
+    return (func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())))
+
+
+def memoize(page, cache=RESULT_CACHE):
+    """Decorator caching a function's result on its (hashable) arguments.
+
+    Hits and misses are tallied per `page` so the cache can be sized from
+    real traffic (see page_cache_stats).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = _memo_key(func, args, kwargs)
+            sentinel = object()
+            value = cache.get(key, sentinel)
+            hit = value is not sentinel
+            speculative = False
+            if not hit:
+                value = SPECULATIVE_CACHE.pop(key, sentinel)
+                hit = speculative = value is not sentinel
+                if not hit:
+                    value = func(*args, **kwargs)
+                cache.put(key, value)
+            with _counter_lock:
+                _page_counters[page]['hits' if hit else 'misses'] += 1
+                if speculative:
+                    _page_counters[page]['speculative_hits'] += 1
+            return value
+
+        wrapper.uncached = func
+        wrapper.cache = cache
+        wrapper.cache_key = lambda *args, **kwargs: _memo_key(func, args, kwargs)
+        return wrapper
+
+    return decorator
+
+
+def page_cache_stats():
+    """Hit/miss counts and hit rate for each page using memoize."""
+    with _counter_lock:
+        stats = {}
+        for page, counts in _page_counters.items():
+            total = counts['hits'] + counts['misses']
+            stats[page] = dict(counts, hit_rate=counts['hits'] / total if total else 0.0)
+        return stats
+
+
+
+def _flat_page_stats():
+    return {f"{page}_{field}": value for page, stats in page_cache_stats().items() for field, value in stats.items()}
+
+
+register_gauges("result_cache", RESULT_CACHE.stats)
+register_gauges("page_cache", _flat_page_stats)
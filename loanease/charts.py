@@ -0,0 +1,212 @@
+# loanease/charts.py
+# Chart pipeline: point budgets, WebGL traces and a figure cache with size/time stats.
+#
+# Long schedules (360 monthly instalments, or many loans at once) are reduced
+# server-side before they become Plotly traces: bar series are averaged into
+# wider periods and line series keep the min and max of each bucket, so no
+# trace exceeds POINT_BUDGET points. Line traces above WEBGL_THRESHOLD points
+# use Scattergl. Built figures are cached on their inputs together with their
+# JSON payload size and build time.
+#
+# Usage:
+#   python -m loanease.charts     # payload size and build time, naive vs pipeline
+import argparse
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from .caching import LRUCache
+from .metrics import register_gauges
+
+# Maximum points per trace sent to the browser
+POINT_BUDGET = 2000
+# Line traces with more points than this are drawn with WebGL (Scattergl)
+WEBGL_THRESHOLD = 1000
+# Bar widths tried when aggregating a monthly series, in months
+BAR_PERIODS = [(1, 'Month'), (3, 'Quarter'), (6, 'Half-Year'), (12, 'Year'), (60, '5 Years')]
+
+ChartStats = namedtuple('ChartStats', ['name', 'points', 'traces', 'payload_bytes', 'build_seconds', 'cached'])
+
+# Figures are small once reduced; a few hundred cover the distinct slider states in use
+FIGURE_CACHE = LRUCache(max_entries=256, max_bytes=64 * 1024 * 1024, ttl=60 * 60,
+                        sizeof=lambda entry: entry[1].payload_bytes)
+
+_last_stats = {}
+_stats_lock = threading.Lock()
+
+
+# Function to average a monthly series into at most `budget` bars
+def aggregate_bars(months, columns, budget=POINT_BUDGET):
+    """Returns (x, {name: values}, period label), using the narrowest period that fits the budget."""
+    months = np.asarray(months)
+    for period, label in BAR_PERIODS:
+        if -(-len(months) // period) <= budget:
+            break
+    if period == 1:
+        return months, {name: np.asarray(values) for name, values in columns.items()}, label
+
+    bucket = (months - months[0]) // period
+    counts = np.bincount(bucket)
+    x = months[0] + np.arange(len(counts)) * period + period - 1
+    averaged = {name: np.bincount(bucket, weights=values) / counts for name, values in columns.items()}
+    return np.minimum(x, months[-1]), averaged, label
+
+
+# Function to downsample a line series, keeping each bucket's extremes
+def downsample_minmax(x, y, budget=POINT_BUDGET):
+    """Keeps the first, last, min and max point of each bucket (at most `budget` points, in x order)."""
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n <= budget:
+        return x, y
+    n_buckets = max((budget - 2) // 2, 1)
+    edges = np.linspace(1, n - 1, n_buckets + 1).astype(np.int64)
+    bucket = np.repeat(np.arange(n_buckets), np.diff(edges))
+    inner = y[1:n - 1]
+    # Position of the min and max of every bucket via one sort on (bucket, value)
+    order = np.lexsort((inner, bucket)) + 1
+    starts = edges[:-1] - 1
+    stops = edges[1:] - 2
+    keep = np.unique(np.concatenate([[0, n - 1], order[starts], order[stops]]))
+    return x[keep], y[keep]
+
+
+def line_trace(x, y, budget=POINT_BUDGET, **kwargs):
+    """A Scatter (or Scattergl when large) trace of (x, y) reduced to the point budget."""
+    import plotly.graph_objects as go
+
+    n = len(x)
+    x, y = downsample_minmax(x, y, budget)
+    trace_type = go.Scattergl if n > WEBGL_THRESHOLD else go.Scatter
+    return trace_type(x=x, y=y, **kwargs)
+
+
+def _count_points(fig):
+    total = 0
+    for trace in fig.data:
+        for axis in ('x', 'y', 'z'):
+            values = getattr(trace, axis, None)
+            if values is not None:
+                total += int(np.size(values))
+                break
+    return total
+
+
+def measure(name, fig, build_seconds, cached=False):
+    return ChartStats(
+        name=name,
+        points=_count_points(fig),
+        traces=len(fig.data),
+        payload_bytes=len(fig.to_json().encode()),
+        build_seconds=build_seconds,
+        cached=cached,
+    )
+
+
+# Function to get a figure from the cache, building it on a miss
+def cached_chart(name, key, build):
+    """Returns (figure, ChartStats) for `build()`, cached on (name, key).
+
+    Streamlit serializes the figure again on every rerun, so reduced figures
+    keep that cheap; the cache saves the build and records its cost once.
+    """
+    entry = FIGURE_CACHE.get((name, key))
+    if entry is None:
+        start = time.perf_counter()
+        fig = build()
+        stats = measure(name, fig, time.perf_counter() - start)
+        FIGURE_CACHE.put((name, key), (fig, stats))
+    else:
+        fig, stats = entry
+        stats = stats._replace(cached=True)
+    with _stats_lock:
+        _last_stats[name] = stats
+    return fig, stats
+
+
+def chart_stats():
+    """Most recent ChartStats per chart name."""
+    with _stats_lock:
+        return dict(_last_stats)
+
+
+register_gauges("figure_cache", FIGURE_CACHE.stats)
+
+
+def _naive_emi_chart(schedule):
+    # What the EMI page used to do: melt every row into a long frame and px.bar it
+    import pandas as pd
+    import plotly.express as px
+
+    df = pd.DataFrame({
+        'Month': schedule.months,
+        'Principal': schedule.principal[0],
+        'Interest': schedule.interest[0],
+    }).melt(id_vars=['Month'], var_name='Payment Type', value_name='Amount')
+    return px.bar(df, x='Month', y='Amount', color='Payment Type')
+
+
+def _pipeline_emi_chart(schedule, budget):
+    import plotly.graph_objects as go
+
+    x, bars, _ = aggregate_bars(schedule.months, {'Principal': schedule.principal[0],
+                                                   'Interest': schedule.interest[0]}, budget)
+    fig = go.Figure([go.Bar(x=x, y=values, name=name) for name, values in bars.items()])
+    fig.update_layout(barmode='stack')
+    return fig
+
+
+def _naive_book_chart(schedule):
+    import plotly.graph_objects as go
+
+    return go.Figure([go.Scatter(x=schedule.months, y=row) for row in schedule.balance])
+
+
+def _pipeline_book_chart(schedule, budget):
+    import plotly.graph_objects as go
+
+    # Many loans at once: percentile bands of the balance per month instead of a trace per loan
+    bands = np.percentile(schedule.balance, [10, 50, 90], axis=0)
+    return go.Figure([line_trace(schedule.months, band, budget, name=f"p{q}")
+                      for q, band in zip((10, 50, 90), bands)])
+
+
+def main(argv=None):
+    from .amortization import amortization_schedule
+
+    parser = argparse.ArgumentParser(description="Compare chart payload size and build time, naive vs reduced.")
+    parser.add_argument("--loans", type=int, default=1000, help="loans in the book chart")
+    parser.add_argument("--budget", type=int, default=120, help="bars in the EMI chart")
+    args = parser.parse_args(argv)
+
+    # Import plotly up front so the first build is not charged for it
+    import plotly.express  # noqa: F401
+
+    single = amortization_schedule(2500000, 10.5, 30)
+    rng = np.random.default_rng(0)
+    book = amortization_schedule(rng.integers(20, 2000, args.loans) * 5000.0,
+                                 rng.integers(70, 140, args.loans) / 10, 30)
+
+    charts = [
+        ("emi[360 months] naive px.bar", lambda: _naive_emi_chart(single)),
+        ("emi[360 months] pipeline", lambda: _pipeline_emi_chart(single, args.budget)),
+        (f"balances[{args.loans} loans] naive", lambda: _naive_book_chart(book)),
+        (f"balances[{args.loans} loans] pipeline", lambda: _pipeline_book_chart(book, POINT_BUDGET)),
+    ]
+    print(f"{'chart':40} {'traces':>7} {'points':>10} {'payload':>11} {'build':>10} {'to_json':>10}")
+    for name, build in charts:
+        start = time.perf_counter()
+        fig = build()
+        build_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        stats = measure(name, fig, build_seconds)
+        json_seconds = time.perf_counter() - start
+        print(f"{name:40} {stats.traces:>7,} {stats.points:>10,} {stats.payload_bytes / 1024:>8,.0f} KB "
+              f"{stats.build_seconds * 1000:>7.1f} ms {json_seconds * 1000:>7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+# loanease/compiled_model.py
+# The trained booster compiled into flat NumPy arrays, with the scaler folded in.
+#
+# Every tree is padded to the same node count and stored as parallel arrays
+# (feature index, threshold, child index, leaf value). The StandardScaler
+# is folded into the thresholds - (x - mean) / scale < t  <=>  x < t * scale + mean -
+# so raw applicant features go straight in. XGBoost compares the scaled value
+# after rounding it to float32, so each raw threshold is the exact smallest
+# float64 that lands on the right of the split, boundary values included. Prediction walks all trees at once,
+# one vectorized step per tree level, without DMatrix construction or the
+# sklearn wrapper.
+#
+# Usage:
+#   python -m loanease.compiled_model     # compile, verify against XGBoost and compare latency
+import argparse
+import json
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from . import model_store
+
+COMPILED_FILE = "xgb_model_compiled.npz"
+
+# Maximum allowed |p_compiled - p_xgboost| when verifying
+TOLERANCE = 1e-5
+
+# Rows scored per step; keeps the (rows x trees) working set in cache
+CHUNK_ROWS = 256
+
+CompiledForest = namedtuple('CompiledForest', [
+    'feature',       # (n_trees * max_nodes,) int32, split feature per node
+    'threshold',     # float64, split threshold in raw feature units (+inf for leaves)
+    'left',          # int32, global index of the left child; the right child is left + 1
+    'default_left',  # bool, branch for missing values (True for leaves, so they stay put)
+    'value',         # float64, leaf margin contribution (0 for splits)
+    'roots',         # (n_trees,) int32, global index of each tree's root
+    'base_margin',   # float, logit of the model's base_score
+    'depth',         # int, number of steps needed to reach any leaf
+])
+
+
+def _breadth_first(left, right):
+    """Renumbers a tree breadth-first so that every right child directly follows its left sibling."""
+    order = [0]
+    for node in order:
+        if left[node] != -1:
+            order += [left[node], right[node]]
+    position = np.empty(len(left), dtype=np.int64)
+    position[order] = np.arange(len(order))
+    return np.asarray(order), position
+
+
+def _ordered(x):
+    # float64 -> int64 keys in the same order as the floats (-0.0 and 0.0 share a key)
+    bits = np.asarray(x, dtype=np.float64).view(np.int64)
+    return np.where(bits < 0, -(bits & np.int64(0x7FFFFFFFFFFFFFFF)), bits)
+
+
+def _from_ordered(keys):
+    bits = np.where(keys < 0, (-keys) | np.int64(-0x8000000000000000), keys)
+    return bits.view(np.float64)
+
+
+# Function to fold the scaler into split thresholds exactly as XGBoost sees the scaled input
+def _raw_thresholds(cond, mean, scale):
+    """Smallest raw x with float32((x - mean) / scale) >= cond, elementwise.
+
+    So raw x < threshold exactly when XGBoost sends the scaled value left.
+    Found by bisection over the ordered float64 values (64 steps, vectorized).
+    """
+    cond = np.asarray(cond, dtype=np.float32)
+
+    def goes_right(x):
+        with np.errstate(over='ignore', invalid='ignore'):
+            return ((x - mean) / scale).astype(np.float32) >= cond
+
+    lo = np.broadcast_to(_ordered(-np.inf), cond.shape).copy()
+    hi = np.broadcast_to(_ordered(np.inf), cond.shape).copy()
+    for _ in range(64):
+        # Floor of (lo + hi) / 2 without int64 overflow
+        mid = (lo >> 1) + (hi >> 1) + (lo & hi & 1)
+        right = goes_right(_from_ordered(mid))
+        hi = np.where(right, mid, hi)
+        lo = np.where(right, lo, mid)
+    return _from_ordered(hi)
+
+
+def _tree_depth(left, right):
+    depth = np.zeros(len(left), dtype=np.int64)
+    for node in range(len(left)):
+        if left[node] != -1:
+            depth[left[node]] = depth[node] + 1
+            depth[right[node]] = depth[node] + 1
+    return int(depth.max())
+
+
+# Function to compile a booster (and scaler statistics) into flat arrays
+def compile_booster(booster, mean, scale):
+    """Returns a CompiledForest equivalent to `booster` applied to (X - mean) / scale."""
+    model = json.loads(booster.save_raw(raw_format='json'))
+    learner = model['learner']
+    objective = learner['objective']['name']
+    if objective != 'binary:logistic':
+        raise ValueError(f"only binary:logistic boosters can be compiled, got {objective}")
+    trees = learner['gradient_booster']['model']['trees']
+    if any(any(t['split_type']) for t in trees):
+        raise ValueError("categorical splits are not supported")
+
+    base_score = float(learner['learner_model_param']['base_score'].strip('[]'))
+    mean = np.asarray(mean, dtype=np.float64)
+    scale = np.asarray(scale, dtype=np.float64)
+
+    n_trees = len(trees)
+    max_nodes = max(len(t['left_children']) for t in trees)
+    size = n_trees * max_nodes
+    feature = np.zeros(size, dtype=np.int32)
+    threshold = np.full(size, np.inf)
+    left = np.arange(size, dtype=np.int32)
+    default_left = np.ones(size, dtype=bool)
+    value = np.zeros(size, dtype=np.float64)
+    depth = 0
+
+    for i, tree in enumerate(trees):
+        lc = np.asarray(tree['left_children'])
+        rc = np.asarray(tree['right_children'])
+        order, position = _breadth_first(lc, rc)
+        lc, rc = lc[order], rc[order]
+        split_idx = np.asarray(tree['split_indices'])[order]
+        cond = np.asarray(tree['split_conditions'], dtype=np.float64)[order]
+        is_leaf = lc == -1
+        offset = i * max_nodes
+        nodes = slice(offset, offset + len(lc))
+
+        feature[nodes] = np.where(is_leaf, 0, split_idx)
+        # Fold the scaler into the split: float32(scaled) < t  <=>  raw < threshold
+        threshold[nodes] = np.where(is_leaf, np.inf, _raw_thresholds(cond, mean[split_idx], scale[split_idx]))
+        # Leaves point to themselves: x < inf keeps them on the "left" branch
+        left[nodes] = np.where(is_leaf, np.arange(len(lc)), position[np.maximum(lc, 0)]) + offset
+        default_left[nodes] = np.where(is_leaf, True, np.asarray(tree['default_left'], dtype=bool)[order])
+        # For leaves XGBoost stores the leaf value in split_conditions
+        value[nodes] = np.where(is_leaf, cond, 0.0)
+        depth = max(depth, _tree_depth(lc, np.where(is_leaf, -1, position[np.maximum(rc, 0)])))
+
+    return CompiledForest(
+        feature, threshold, left, default_left, value,
+        roots=np.arange(n_trees, dtype=np.int32) * max_nodes,
+        base_margin=float(np.log(base_score / (1 - base_score))),
+        depth=depth,
+    )
+
+
+def _margin_chunk(forest, X, has_nan):
+    n_rows, n_features = X.shape
+    flat = X.ravel()
+    row_offset = (np.arange(n_rows, dtype=np.int32) * n_features)[:, None]
+    node = np.broadcast_to(forest.roots, (n_rows, len(forest.roots))).copy()
+
+    # One step per level for every (row, tree) pair
+    for _ in range(forest.depth):
+        x = flat.take(row_offset + forest.feature.take(node))
+        go_right = ~(x < forest.threshold.take(node))
+        if has_nan:
+            go_right &= ~(np.isnan(x) & forest.default_left.take(node))
+        node = forest.left.take(node) + go_right
+
+    return forest.value.take(node).sum(axis=1)
+
+
+# Function to score raw feature rows with the compiled forest
+def predict_margin(forest, X):
+    X = np.ascontiguousarray(np.atleast_2d(np.asarray(X, dtype=np.float64)))
+    has_nan = bool(np.isnan(X).any())
+    if len(X) <= CHUNK_ROWS:
+        return forest.base_margin + _margin_chunk(forest, X, has_nan)
+    margin = np.empty(len(X))
+    for start in range(0, len(X), CHUNK_ROWS):
+        margin[start:start + CHUNK_ROWS] = _margin_chunk(forest, X[start:start + CHUNK_ROWS], has_nan)
+    return forest.base_margin + margin
+
+
+def predict_approval(forest, X):
+    """Probability of the positive class for each raw [Age, Income, CCAvg, Education] row."""
+    return 1 / (1 + np.exp(-predict_margin(forest, X)))
+
+
+def save_compiled(forest, directory=model_store.ARTIFACT_DIR):
+    np.savez(os.path.join(directory, COMPILED_FILE), **forest._asdict())
+
+
+def load_compiled(directory=model_store.ARTIFACT_DIR):
+    with np.load(os.path.join(directory, COMPILED_FILE)) as arrays:
+        return CompiledForest(
+            **{name: arrays[name] for name in CompiledForest._fields if name not in ('base_margin', 'depth')},
+            base_margin=float(arrays['base_margin']),
+            depth=int(arrays['depth']),
+        )
+
+
+def export_compiled(directory=model_store.ARTIFACT_DIR):
+    """Compiles the stored model (see model_store) and writes xgb_model_compiled.npz."""
+    model = model_store.load_model(directory)
+    forest = compile_booster(model.booster, model.mean, model.scale)
+    save_compiled(forest, directory)
+    return forest
+
+
+def _time_per_call(func, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats
+
+
+def main(argv=None):
+    import joblib
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Compile the booster to NumPy arrays and compare it with XGBoost.")
+    parser.add_argument("--data", default=os.path.join(model_store.ARTIFACT_DIR, "bank_personal_loan_data.csv"))
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    forest = export_compiled()
+    print(f"Wrote {COMPILED_FILE}: {len(forest.roots)} trees x {len(forest.feature) // len(forest.roots)} nodes, depth {forest.depth}")
+
+    model = model_store.load_model()
+    X = pd.read_csv(args.data, usecols=model_store.FEATURES)[model_store.FEATURES].to_numpy(dtype=np.float64)
+    diff = np.abs(predict_approval(forest, X) - model.predict_approval(X))
+    print(f"Max |compiled - xgboost| over {len(X):,} rows: {diff.max():.2e} (tolerance {TOLERANCE:.0e})")
+    if diff.max() > TOLERANCE:
+        raise SystemExit("compiled model does not match XGBoost")
+
+    stock = joblib.load(os.path.join(model_store.ARTIFACT_DIR, model_store.LEGACY_MODEL_FILE))
+    scaler = joblib.load(os.path.join(model_store.ARTIFACT_DIR, model_store.LEGACY_SCALER_FILE))
+    row = X[:1]
+    batch = X[np.random.default_rng(0).integers(0, len(X), args.batch_size)]
+    # The pickled scaler was fitted on a DataFrame; give it named columns as the app did
+    row_frame = pd.DataFrame(row, columns=model_store.FEATURES)
+    batch_frame = pd.DataFrame(batch, columns=model_store.FEATURES)
+
+    timings = {
+        "XGBClassifier.predict_proba + scaler": (
+            _time_per_call(lambda: stock.predict_proba(scaler.transform(row_frame)), 200),
+            _time_per_call(lambda: stock.predict_proba(scaler.transform(batch_frame)), 3),
+        ),
+        "model_store inplace_predict": (
+            _time_per_call(lambda: model.predict_approval(row), 500),
+            _time_per_call(lambda: model.predict_approval(batch), 3),
+        ),
+        "compiled NumPy forest": (
+            _time_per_call(lambda: predict_approval(forest, row), 2000),
+            _time_per_call(lambda: predict_approval(forest, batch), 3),
+        ),
+    }
+    print(f"\n{'':40} {'single row':>12} {'batch throughput':>20}")
+    for name, (single, batched) in timings.items():
+        print(f"{name:40} {single * 1e6:>9.1f} µs {len(batch) / batched:>14,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
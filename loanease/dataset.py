@@ -0,0 +1,199 @@
+# loanease/dataset.py
+# Columnar, dtype-compacted cache of the loan dataset CSV.
+#
+# The CSV is parsed once into one memory-mappable .npy file per column, using
+# the narrowest dtype that holds each column (most are 0/1 flags or small
+# categories). Later reads memory-map only the requested columns. The cache is
+# keyed on a BLAKE2 fingerprint of the CSV bytes, so editing or replacing the
+# CSV rebuilds it automatically.
+#
+# Usage:
+#   python -m loanease.dataset bank_personal_loan_data.csv   # build the cache and compare with pd.read_csv
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+CACHE_DIRNAME = ".dataset_cache"
+MANIFEST = "manifest.json"
+CHUNK_ROWS = 250_000
+
+# Narrow dtypes for the columns of bank_personal_loan_data.csv. A column whose
+# values do not fit is widened automatically while the cache is built. CCAvg
+# stays float64: rounding it to float32 shifts split thresholds enough to change
+# the trained model.
+COLUMN_DTYPES = {
+    'ID': 'int32',
+    'Age': 'int8',
+    'Experience': 'int8',
+    'Income': 'int16',
+    'ZIP Code': 'int32',
+    'Family': 'int8',
+    'CCAvg': 'float64',
+    'Education': 'int8',
+    'Mortgage': 'int16',
+    'Personal Loan': 'int8',
+    'Securities Account': 'int8',
+    'CD Account': 'int8',
+    'Online': 'int8',
+    'CreditCard': 'int8',
+}
+
+
+def fingerprint(path, block_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_dir_for(csv_path):
+    csv_path = os.path.abspath(csv_path)
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(os.path.dirname(csv_path), CACHE_DIRNAME, stem)
+
+
+def _column_file(cache_dir, column):
+    # Column names may contain spaces; keep file names predictable
+    return os.path.join(cache_dir, column.replace(' ', '_') + '.npy')
+
+
+def _read_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _fits(values, dtype):
+    narrowed = values.astype(dtype)
+    if np.dtype(dtype).kind == 'f':
+        return np.array_equal(narrowed, values, equal_nan=True)
+    return np.array_equal(narrowed, values)
+
+
+def _widen(cache_dir, column, array, values, filled):
+    """Re-allocates a column's memmap with a dtype that holds both old and new values."""
+    dtype = np.promote_types(array.dtype, values.dtype)
+    path = _column_file(cache_dir, column)
+    wider = np.lib.format.open_memmap(path + '.tmp', mode='w+', dtype=dtype, shape=array.shape)
+    wider[:filled] = array[:filled]
+    wider.flush()
+    del array
+    os.replace(path + '.tmp', path)
+    return np.lib.format.open_memmap(path, mode='r+')
+
+
+# Function to convert the CSV into the columnar cache
+def build_cache(csv_path, chunk_rows=CHUNK_ROWS):
+    """Parses `csv_path` chunk by chunk into per-column .npy files; returns the manifest."""
+    import pandas as pd
+
+    cache_dir = cache_dir_for(csv_path)
+    if os.path.isdir(cache_dir):
+        shutil.rmtree(cache_dir)
+    os.makedirs(cache_dir)
+
+    with open(csv_path, 'rb') as f:
+        n_rows = max(sum(1 for _ in f) - 1, 0)
+
+    arrays = {}
+    offset = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+        if not arrays:
+            for column in chunk.columns:
+                dtype = COLUMN_DTYPES.get(column, chunk[column].dtype)
+                arrays[column] = np.lib.format.open_memmap(
+                    _column_file(cache_dir, column), mode='w+', dtype=dtype, shape=(n_rows,)
+                )
+        stop = offset + len(chunk)
+        for column in arrays:
+            values = chunk[column].to_numpy()
+            if not _fits(values, arrays[column].dtype):
+                arrays[column] = _widen(cache_dir, column, arrays[column], values, offset)
+            arrays[column][offset:stop] = values
+        offset = stop
+
+    if offset != n_rows:
+        # Quoted fields spanning several lines would break the line count used for sizing
+        raise ValueError(f"{csv_path}: parsed {offset} rows but counted {n_rows} lines")
+    for array in arrays.values():
+        array.flush()
+
+    manifest = {
+        'fingerprint': fingerprint(csv_path),
+        'schema': COLUMN_DTYPES,
+        'rows': offset,
+        'columns': {column: str(array.dtype) for column, array in arrays.items()},
+    }
+    with open(os.path.join(cache_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def ensure_cache(csv_path):
+    """Returns the manifest for an up-to-date cache, rebuilding it if the CSV changed."""
+    manifest = _read_manifest(cache_dir_for(csv_path))
+    if (manifest is None or manifest.get('schema') != COLUMN_DTYPES
+            or manifest['fingerprint'] != fingerprint(csv_path)):
+        manifest = build_cache(csv_path)
+    return manifest
+
+
+# Function to read selected columns, memory-mapped
+def load_columns(csv_path, columns=None):
+    """Maps each requested column to a read-only memory-mapped array."""
+    manifest = ensure_cache(csv_path)
+    cache_dir = cache_dir_for(csv_path)
+    columns = list(manifest['columns']) if columns is None else list(columns)
+    missing = [c for c in columns if c not in manifest['columns']]
+    if missing:
+        raise KeyError(f"columns not in {csv_path}: {missing}")
+    return {column: np.load(_column_file(cache_dir, column), mmap_mode='r') for column in columns}
+
+
+def load_frame(csv_path, columns=None):
+    """Same as load_columns, wrapped in a DataFrame (columns keep their compact dtypes)."""
+    import pandas as pd
+
+    return pd.DataFrame(load_columns(csv_path, columns), copy=False)
+
+
+def main(argv=None):
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Build the columnar dataset cache and compare it with pd.read_csv.")
+    parser.add_argument("csv", nargs="?", default="bank_personal_loan_data.csv")
+    parser.add_argument("--columns", nargs="*", help="columns to load (default: all)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    df = pd.read_csv(args.csv)
+    csv_seconds = time.perf_counter() - start
+    csv_bytes = int(df.memory_usage(deep=True).sum())
+
+    start = time.perf_counter()
+    manifest = build_cache(args.csv)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    columns = load_columns(args.csv, args.columns)
+    load_seconds = time.perf_counter() - start
+    cache_bytes = sum(array.nbytes for array in columns.values())
+
+    if args.columns:
+        csv_bytes = int(df[args.columns].memory_usage(deep=True).sum())
+    print(f"{manifest['rows']:,} rows, {len(columns)} columns")
+    print(f"pd.read_csv:        {csv_seconds * 1000:8.2f} ms, {csv_bytes / 1024:10.1f} KB in memory")
+    print(f"cache build (once): {build_seconds * 1000:8.2f} ms")
+    print(f"cached load (mmap): {load_seconds * 1000:8.2f} ms, {cache_bytes / 1024:10.1f} KB mapped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+# loanease/drift.py
+# Incremental drift monitoring of incoming applications against the training data.
+#
+# At training time every model feature (Age, Income, CCAvg, Education) is cut
+# into up to FINE_BINS quantile bins of the training data (of a fixed sample
+# of it, for large histories), and the reference counts per bin, counted a
+# chunk at a time, are saved next to the model (drift_reference.npz). Live
+# records - from the app, the scoring service or the batch scorer - only add 1
+# to one bin per feature, so an update costs the same however much history has
+# been seen, and memory is fixed: one count array per time window, in a ring of
+# N_WINDOWS windows. PSI (over PSI_BINS groups of equal reference mass) and KS
+# (between the binned CDFs) are computed from the counts on demand.
+#
+# Usage:
+#   python -m loanease.drift                      # build the reference and benchmark updates
+#   python -m loanease.drift --records 5000000 --shift 0.3
+import argparse
+import math
+import os
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from .metrics import register_gauges
+from .model_store import ARTIFACT_DIR, FEATURES
+
+REFERENCE_FILE = "drift_reference.npz"
+DATA_FILE = "bank_personal_loan_data.csv"
+# Bins per feature; KS is resolved at the bin edges, so finer bins give a tighter KS
+FINE_BINS = 64
+# PSI is computed over this many groups of roughly equal reference mass
+PSI_BINS = 10
+# Conventional PSI cut-offs: below 0.1 stable, 0.1-0.25 moderate shift, above 0.25 shifted
+PSI_MODERATE = 0.1
+PSI_SHIFTED = 0.25
+# Below this many live records PSI is mostly sampling noise (about PSI_BINS / n), so no status is given
+MIN_RECORDS = 200
+# The bin edges of a larger history come from a fixed sample of this many rows
+CUT_SAMPLE_ROWS = 200_000
+# Rows per pass when counting the reference from the dataset CSV
+CHUNK_ROWS = 250_000
+# Live counts are kept per time window, N_WINDOWS windows back
+WINDOW_SECONDS = 3600
+N_WINDOWS = 24
+
+# cuts[i]: inner bin edges of feature i (a value v falls in bin searchsorted(cuts, v, 'right'));
+# counts[i]: reference count per bin; psi_groups[i]: PSI group of each bin
+Reference = namedtuple('Reference', ['features', 'cuts', 'counts', 'psi_groups'])
+
+_monitors = {}
+_lock = threading.Lock()
+
+
+def _feature_cuts(values, fine_bins):
+    values = values[np.isfinite(values)]
+    unique = np.unique(values)
+    if len(unique) <= fine_bins:
+        # Few distinct values (Education, or integer ages): one bin per value
+        return unique[1:]
+    return np.unique(np.quantile(values, np.linspace(0, 1, fine_bins + 1)[1:-1]))
+
+
+def _psi_groups(counts, psi_bins):
+    # Consecutive bins grouped by the reference mass below them
+    mass_before = (np.cumsum(counts) - counts) / max(counts.sum(), 1)
+    groups = np.minimum((mass_before * psi_bins).astype(np.int64), psi_bins - 1)
+    return np.unique(groups, return_inverse=True)[1]
+
+
+def _bin_counts(cuts, column):
+    column = column[np.isfinite(column)]
+    return np.bincount(np.searchsorted(cuts, column, side='right'), minlength=len(cuts) + 1)
+
+
+# Function to build reference histograms from training rows
+def build_reference(X, features=FEATURES, fine_bins=FINE_BINS, psi_bins=PSI_BINS):
+    """`X` is an (n, len(features)) array of raw (unscaled) feature rows."""
+    X = np.asarray(X, dtype=np.float64)
+    cuts = [_feature_cuts(X[:, i], fine_bins) for i in range(len(features))]
+    counts = [_bin_counts(feature_cuts, X[:, i]) for i, feature_cuts in enumerate(cuts)]
+    return Reference(list(features), cuts, counts, [_psi_groups(c, psi_bins) for c in counts])
+
+
+# Function to build the reference from the dataset CSV without loading it whole
+def reference_from_csv(csv_path, features=FEATURES, fine_bins=FINE_BINS, psi_bins=PSI_BINS,
+                       chunk_rows=CHUNK_ROWS):
+    """Bin edges from (a sample of at most CUT_SAMPLE_ROWS) rows, counts from a chunked pass.
+
+    Reads the memory-mapped columns of the dataset cache; up to CUT_SAMPLE_ROWS
+    rows the result is the same as build_reference on the whole CSV.
+    """
+    from .dataset import load_columns
+
+    loaded = load_columns(csv_path, list(features))
+    columns = [loaded[f] for f in features]
+    n_rows = len(columns[0]) if columns else 0
+    sample = slice(None)
+    if n_rows > CUT_SAMPLE_ROWS:
+        sample = np.sort(np.random.default_rng(0).choice(n_rows, CUT_SAMPLE_ROWS, replace=False))
+    cuts = [_feature_cuts(np.asarray(column[sample], dtype=np.float64), fine_bins) for column in columns]
+    counts = [np.zeros(len(c) + 1, dtype=np.int64) for c in cuts]
+    for start in range(0, n_rows, chunk_rows):
+        for i, column in enumerate(columns):
+            counts[i] += _bin_counts(cuts[i], np.asarray(column[start:start + chunk_rows], dtype=np.float64))
+    return Reference(list(features), cuts, counts, [_psi_groups(c, psi_bins) for c in counts])
+
+
+def save_reference(reference, path=os.path.join(ARTIFACT_DIR, REFERENCE_FILE)):
+    # Ragged per-feature arrays are stored flat with offsets
+    arrays = {'features': np.asarray(reference.features)}
+    for name in ('cuts', 'counts', 'psi_groups'):
+        parts = getattr(reference, name)
+        arrays[name] = np.concatenate(parts)
+        arrays[f'{name}_offsets'] = np.cumsum([0] + [len(p) for p in parts])
+    np.savez(path, **arrays)
+
+
+def load_reference(path=os.path.join(ARTIFACT_DIR, REFERENCE_FILE)):
+    with np.load(path) as arrays:
+        parts = {}
+        for name in ('cuts', 'counts', 'psi_groups'):
+            flat, offsets = arrays[name], arrays[f'{name}_offsets']
+            parts[name] = [flat[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+        return Reference(arrays['features'].tolist(), parts['cuts'], parts['counts'], parts['psi_groups'])
+
+
+def _ks_pvalue(d, n_ref, n_live):
+    # Asymptotic two-sample Kolmogorov-Smirnov p-value
+    if n_ref == 0 or n_live == 0:
+        return 1.0
+    ne = n_ref * n_live / (n_ref + n_live)
+    lam = (math.sqrt(ne) + 0.12 + 0.11 / math.sqrt(ne)) * d
+    if lam < 1e-3:
+        return 1.0
+    total = sum((-1) ** (k - 1) * math.exp(-2 * k * k * lam * lam) for k in range(1, 101))
+    return min(max(2 * total, 0.0), 1.0)
+
+
+class DriftMonitor:
+    """Live bin counts per feature in a ring of time windows, compared against a Reference.
+
+    update() is thread-safe and costs O(features) per record; statistics never
+    look at individual records again.
+    """
+
+    def __init__(self, reference, window_seconds=WINDOW_SECONDS, n_windows=N_WINDOWS, clock=time.time):
+        self.reference = reference
+        self.window_seconds = window_seconds
+        self.clock = clock
+        sizes = [len(c) for c in reference.counts]
+        # All features' bins side by side in one flat count array
+        self._offsets = np.cumsum([0] + sizes)
+        self.totals = np.zeros(self._offsets[-1], dtype=np.int64)
+        self.windows = np.zeros((n_windows, self._offsets[-1]), dtype=np.int64)
+        self.window_ids = np.full(n_windows, -1, dtype=np.int64)
+        self.records = 0
+        self._lock = threading.Lock()
+
+    def _window_slot(self, now):
+        window_id = int(now // self.window_seconds)
+        slot = window_id % len(self.window_ids)
+        if self.window_ids[slot] != window_id:
+            # The slot last held a window N_WINDOWS ago; start it afresh
+            self.windows[slot] = 0
+            self.window_ids[slot] = window_id
+        return slot
+
+    def _bin_indices(self, rows):
+        indices = []
+        for i, cuts in enumerate(self.reference.cuts):
+            column = rows[:, i]
+            column = column[np.isfinite(column)]
+            indices.append(self._offsets[i] + np.searchsorted(cuts, column, side='right'))
+        return np.concatenate(indices)
+
+    # Function to count a batch of live records
+    def update(self, rows):
+        """`rows`: one record or an (n, n_features) array of raw feature rows."""
+        rows = np.atleast_2d(np.asarray(rows, dtype=np.float64))
+        if not len(rows):
+            return
+        indices = self._bin_indices(rows)
+        if len(rows) > 1:
+            counts = np.bincount(indices, minlength=len(self.totals))
+        with self._lock:
+            slot = self._window_slot(self.clock())
+            if len(rows) > 1:
+                self.totals += counts
+                self.windows[slot] += counts
+            else:
+                # A single record (an app submission) hits one distinct bin per feature
+                self.totals[indices] += 1
+                self.windows[slot, indices] += 1
+            self.records += len(rows)
+
+    def live_counts(self, last_windows=None):
+        """Flat live counts for all time (None) or the most recent `last_windows` windows."""
+        with self._lock:
+            if last_windows is None:
+                return self.totals.copy()
+            current = int(self.clock() // self.window_seconds)
+            recent = (self.window_ids > current - last_windows) & (self.window_ids <= current)
+            return self.windows[recent].sum(axis=0)
+
+    def feature_stats(self, i, live):
+        reference = self.reference.counts[i]
+        live = live[self._offsets[i]:self._offsets[i + 1]]
+        n_ref, n_live = int(reference.sum()), int(live.sum())
+        if n_live == 0:
+            return {'records': 0, 'psi': 0.0, 'ks': 0.0, 'ks_pvalue': 1.0, 'status': 'no data'}
+
+        groups = self.reference.psi_groups[i]
+        expected = np.bincount(groups, weights=reference) / n_ref
+        actual = np.bincount(groups, weights=live) / n_live
+        # Empty groups would make PSI infinite; floor the shares at a small epsilon
+        expected = np.maximum(expected, 1e-4)
+        actual = np.maximum(actual, 1e-4)
+        psi = float(np.sum((actual - expected) * np.log(actual / expected)))
+
+        ks = float(np.abs(np.cumsum(reference) / n_ref - np.cumsum(live) / n_live).max())
+        if n_live < MIN_RECORDS:
+            status = 'too few records'
+        elif psi >= PSI_SHIFTED:
+            status = 'shifted'
+        elif psi >= PSI_MODERATE:
+            status = 'moderate'
+        else:
+            status = 'stable'
+        return {'records': n_live, 'psi': psi, 'ks': ks, 'ks_pvalue': _ks_pvalue(ks, n_ref, n_live),
+                'status': status}
+
+    # Function to compute PSI and KS for every feature from the counts
+    def report(self, last_windows=None):
+        live = self.live_counts(last_windows)
+        return {feature: self.feature_stats(i, live) for i, feature in enumerate(self.reference.features)}
+
+    def gauges(self):
+        stats = {'records': self.records}
+        for feature, values in self.report().items():
+            stats[f'psi_{feature}'] = values['psi']
+            stats[f'ks_{feature}'] = values['ks']
+        return stats
+
+    def memory_bytes(self):
+        return self.totals.nbytes + self.windows.nbytes + self.window_ids.nbytes
+
+    def save(self, path):
+        """Writes the live counts (not the reference) so a later run can continue from them."""
+        with self._lock:
+            np.savez(path, totals=self.totals, windows=self.windows, window_ids=self.window_ids,
+                     records=self.records, window_seconds=self.window_seconds)
+
+    def load_state(self, path):
+        with np.load(path) as arrays:
+            if arrays['totals'].shape != self.totals.shape:
+                raise ValueError(f"{path} was saved against a different drift reference")
+            with self._lock:
+                self.totals = arrays['totals'].copy()
+                self.windows = arrays['windows'].copy()
+                self.window_ids = arrays['window_ids'].copy()
+                self.records = int(arrays['records'])
+                self.window_seconds = float(arrays['window_seconds'])
+
+
+# Function to get the shared monitor (reference loaded on first use)
+def get_monitor(directory=ARTIFACT_DIR):
+    """Process-wide monitor; builds and saves the reference from the dataset CSV if it is missing."""
+    monitor = _monitors.get(directory)
+    if monitor is None:
+        with _lock:
+            monitor = _monitors.get(directory)
+            if monitor is None:
+                path = os.path.join(directory, REFERENCE_FILE)
+                if not os.path.exists(path):
+                    save_reference(reference_from_csv(os.path.join(directory, DATA_FILE)), path)
+                monitor = DriftMonitor(load_reference(path))
+                _monitors[directory] = monitor
+                register_gauges("drift", monitor.gauges)
+    return monitor
+
+
+def record(rows):
+    """Counts live feature rows in the shared monitor."""
+    get_monitor().update(rows)
+
+
+def format_report(report):
+    lines = [f"{'feature':<10} {'records':>10} {'PSI':>8} {'KS':>7} {'KS p':>9}  status"]
+    for feature, stats in report.items():
+        lines.append(f"{feature:<10} {stats['records']:>10,} {stats['psi']:>8.4f} {stats['ks']:>7.4f} "
+                     f"{stats['ks_pvalue']:>9.2g}  {stats['status']}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the drift reference and benchmark live updates.")
+    parser.add_argument("--data", default=os.path.join(ARTIFACT_DIR, DATA_FILE))
+    parser.add_argument("--records", type=int, default=2_000_000, help="synthetic live records to stream")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--shift", type=float, default=0.2, help="relative income increase in the shifted stream")
+    args = parser.parse_args(argv)
+
+    from .dataset import load_frame
+
+    start = time.perf_counter()
+    reference = reference_from_csv(args.data)
+    save_reference(reference)
+    print(f"reference from {int(reference.counts[0].sum()):,} rows in {(time.perf_counter() - start) * 1000:.1f} ms, "
+          f"{[len(c) for c in reference.counts]} bins -> {REFERENCE_FILE}")
+
+    training = load_frame(args.data, FEATURES).to_numpy(dtype=np.float64)
+
+    rng = np.random.default_rng(0)
+    for label, shift in (("unshifted", 0.0), (f"income +{args.shift:.0%}", args.shift)):
+        monitor = DriftMonitor(reference)
+        start = time.perf_counter()
+        for offset in range(0, args.records, args.batch_size):
+            rows = training[rng.integers(0, len(training), min(args.batch_size, args.records - offset))]
+            if shift:
+                rows[:, FEATURES.index('Income')] *= 1 + shift
+            monitor.update(rows)
+        seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        report = monitor.report()
+        report_ms = (time.perf_counter() - start) * 1000
+        print(f"\n{label}: {args.records:,} records in batches of {args.batch_size:,}: {seconds:.2f} s "
+              f"({args.records / seconds:,.0f} records/s), "
+              f"{monitor.memory_bytes() / 1024:.0f} KB of counts, report in {report_ms:.2f} ms")
+        print(format_report(report))
+
+    monitor = DriftMonitor(reference)
+    singles = training[rng.integers(0, len(training), 20_000)]
+    start = time.perf_counter()
+    for row in singles:
+        monitor.update(row)
+    per_record = (time.perf_counter() - start) / len(singles)
+    print(f"\nsingle-record updates: {per_record * 1e6:.1f} µs each ({3600 / per_record / 1e6:,.1f}M records/hour)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# loanease/explain.py
+# Per-applicant explanations from the trained XGBClassifier using XGBoost's
+# built-in TreeSHAP (pred_contribs), with an LRU cache keyed on the slider values.
+import numpy as np
+
+from . import model_store
+from .caching import LRUCache
+from .metrics import register_gauges, timed
+
+# Slider steps on the Explainability page; inputs are snapped to these before
+# being used as cache keys so equivalent settings share an entry
+AGE_STEP = 1
+INCOME_STEP = 1000       # Monthly income (₹)
+CC_SPEND_STEP = 100      # Monthly credit card spend (₹)
+
+EDUCATION_LEVELS = {1: "Undergraduate", 2: "Graduate", 3: "Advanced/Professional"}
+
+# Cached explanations are a few hundred bytes each; 256 KB holds well over a thousand
+EXPLANATION_CACHE = LRUCache(max_entries=4096, max_bytes=256 * 1024)
+
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+
+def _snap(value, step):
+    return int(round(value / step) * step)
+
+
+# Function to map app inputs onto the model's training features
+def applicant_features(age, monthly_income, cc_spend, education):
+    """Builds the [Age, Income, CCAvg, Education] row the model was trained on.
+
+    The dataset records Income and CCAvg in thousands, so monthly ₹ amounts are
+    divided by 1,000; the app's 20k-200k income slider then spans the same range
+    as the training data.
+    """
+    return np.array([[age, monthly_income / 1000, cc_spend / 1000, education]], dtype=np.float64)
+
+
+# Function to compute TreeSHAP contributions for a batch of raw feature rows
+@timed("model_contributions")
+def model_contributions(X, model=None):
+    """Returns (contributions [n, 4] in log-odds, bias [n]) for unscaled feature rows."""
+    import xgboost as xgb
+
+    model = model or model_store.load_model()
+    dmatrix = xgb.DMatrix(model.transform(np.atleast_2d(X)))
+    contribs = model.booster.predict(dmatrix, pred_contribs=True)
+    return contribs[:, :-1], contribs[:, -1]
+
+
+def _compute_explanation(key):
+    age, monthly_income, cc_spend, education = key
+    contribs, bias = model_contributions(applicant_features(age, monthly_income, cc_spend, education))
+    return float(bias[0]), contribs[0].astype(np.float32)
+
+
+# Function to explain one applicant's approval probability
+@timed("explain_applicant")
+def explain_applicant(age, monthly_income, cc_spend, education):
+    """Returns (base_prob, final_prob, df_shap) for the Explainability page.
+
+    TreeSHAP contributions are additive in log-odds; for display they are
+    rescaled so they sum to the probability change from the baseline.
+    """
+    import pandas as pd
+
+    key = (
+        _snap(age, AGE_STEP),
+        _snap(monthly_income, INCOME_STEP),
+        _snap(cc_spend, CC_SPEND_STEP),
+        int(education),
+    )
+    bias, contribs = EXPLANATION_CACHE.get_or_compute(key, lambda: _compute_explanation(key))
+    age, monthly_income, cc_spend, education = key
+
+    base_prob = float(_sigmoid(bias))
+    final_prob = float(_sigmoid(bias + contribs.sum()))
+    total_logit = float(contribs.sum())
+    if abs(total_logit) > 1e-12:
+        pp_values = contribs * ((final_prob - base_prob) / total_logit)
+    else:
+        pp_values = np.zeros_like(contribs)
+
+    labels = [
+        f"Age ({age})",
+        f"Monthly Income (₹{monthly_income:,.0f})",
+        f"Credit Card Spend (₹{cc_spend:,.0f}/mo)",
+        f"Education ({EDUCATION_LEVELS.get(education, education)})",
+    ]
+    rows = []
+    for label, logit, pp in zip(labels, contribs, pp_values):
+        direction = "raised" if logit > 0 else "lowered"
+        rows.append({
+            'Feature': label,
+            'SHAP_Value': float(pp),
+            'SHAP_LogOdds': float(logit),
+            'Group': 'Positive' if logit > 0 else 'Negative',
+            'Description': f"{direction} the model's approval probability by {abs(pp) * 100:.1f} pp "
+                           f"({logit:+.2f} log-odds).",
+        })
+
+    return base_prob, final_prob, pd.DataFrame(rows)
+
+
+def explanation_cache_stats():
+    return EXPLANATION_CACHE.stats()
+
+
+register_gauges("explanation_cache", explanation_cache_stats)
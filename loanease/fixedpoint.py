@@ -0,0 +1,356 @@
+# loanease/fixedpoint.py
+# Exact money mode: EMI and amortization in int64 paise.
+#
+# The float engine in loanease.amortization is right to within a fraction of a
+# paisa per month, but a ledger posts whole paise, and the float schedule's
+# last month absorbs whatever is left over into its interest. Here every
+# amount is an integer number of paise and each instalment follows explicit
+# rounding rules, the same ones a core banking ledger applies:
+#   - the principal is rounded half-up to the paisa, the annual rate to
+#     RATE_DECIMALS places of a percent;
+#   - the EMI is the standard EMI rounded half-up to the paisa, the rounding
+#     decided in double-double precision (vectorized, see emi_paise);
+#   - each month's interest is balance * rate / 12, rounded half-up to the paisa
+#     (exact integer arithmetic, no float involved);
+#   - principal repaid = EMI - interest;
+#   - the last instalment (or an earlier one the EMI would overpay) repays
+#     exactly the outstanding balance, so its payment is balance + interest.
+# So sum(principal) == loan amount and sum(payment) == loan + total interest,
+# to the paisa, for every loan.
+#
+# Rounding makes each month depend on the exact previous balance, so there is
+# no closed form: the schedule is built one vectorized step per month across
+# the whole book (at most 360 steps for a 30-year loan).
+#
+# Usage:
+#   python -m loanease.fixedpoint --loans 100000 --decimal-loans 200
+import argparse
+import time
+from collections import namedtuple
+from decimal import ROUND_HALF_UP, Decimal, localcontext
+
+import numpy as np
+
+from .amortization import amortization_schedule
+from .metrics import timed
+
+PAISE_PER_RUPEE = 100
+# Annual rates are exact to this many decimal places of a percent (0.0001%)
+RATE_DECIMALS = 4
+RATE_SCALE = 10 ** RATE_DECIMALS
+# monthly interest = balance * rate_units / INTEREST_DENOMINATOR
+INTEREST_DENOMINATOR = 12 * 100 * RATE_SCALE
+
+# Result of paise_schedule: like AmortizationSchedule, but every amount is int64 paise
+# and `payment` (interest + principal) differs from the EMI in the last instalment
+PaiseSchedule = namedtuple(
+    'PaiseSchedule',
+    ['emi', 'num_months', 'months', 'interest', 'principal', 'payment', 'balance', 'active',
+     'total_interest', 'total_payable']
+)
+
+
+def _round_half_up(values):
+    # Half-up (not NumPy's half-to-even), mirrored for negatives
+    values = np.asarray(values, dtype=np.float64)
+    return (np.sign(values) * np.floor(np.abs(values) + 0.5)).astype(np.int64)
+
+
+# Function to convert rupee amounts to int64 paise (half-up)
+def to_paise(rupees):
+    return _round_half_up(np.asarray(rupees, dtype=np.float64) * PAISE_PER_RUPEE)
+
+
+# Function to convert paise back to rupees (for display only)
+def to_rupees(paise):
+    return np.asarray(paise, dtype=np.float64) / PAISE_PER_RUPEE
+
+
+# Function to convert annual rates in % to integer rate units
+def rate_units(annual_rate):
+    return _round_half_up(np.asarray(annual_rate, dtype=np.float64) * RATE_SCALE)
+
+
+def _max_balance(units):
+    # Largest balance whose 2 * balance * rate_units still fits in int64
+    top = int(np.max(units, initial=0))
+    return np.iinfo(np.int64).max // (2 * max(top, 1))
+
+
+# Double-double arithmetic: a value is an unevaluated sum hi + lo of two float64
+# arrays, good to about 2^-104 relative (Dekker / Knuth error-free transformations)
+_SPLITTER = 2.0 ** 27 + 1
+
+
+def _two_sum(a, b):
+    s = a + b
+    v = s - a
+    return s, (a - (s - v)) + (b - v)
+
+
+def _renormalize(hi, lo):
+    s = hi + lo
+    return s, lo - (s - hi)
+
+
+def _two_prod(a, b):
+    p = a * b
+    t = _SPLITTER * a
+    a_hi = t - (t - a)
+    t = _SPLITTER * b
+    b_hi = t - (t - b)
+    return p, ((a_hi * b_hi - p) + a_hi * (b - b_hi) + (a - a_hi) * b_hi) + (a - a_hi) * (b - b_hi)
+
+
+def _dd_mul(x, y):
+    p, e = _two_prod(x[0], y[0])
+    return _renormalize(p, e + (x[0] * y[1] + x[1] * y[0]))
+
+
+def _dd_sub(x, y):
+    s, e = _two_sum(x[0], -y[0])
+    return _renormalize(s, e + (x[1] - y[1]))
+
+
+def _dd_div(x, y):
+    q1 = x[0] / y[0]
+    r = _dd_sub(x, _dd_mul(y, (q1, np.zeros_like(q1))))
+    return _renormalize(q1, r[0] / y[0])
+
+
+def _annuity_factors(units, num_months):
+    # EMI of one paisa, r (1 + r)^n / ((1 + r)^n - 1) with r = units / D, as a double-double;
+    # (1 + r)^n by binary powering, all (rate, tenure) pairs at once
+    units = units.astype(np.float64)
+    r_hi = units / INTEREST_DENOMINATOR
+    p, e = _two_prod(r_hi, np.full_like(r_hi, INTEREST_DENOMINATOR))
+    rate = (r_hi, ((units - p) - e) / INTEREST_DENOMINATOR)
+    growth = _renormalize(*_two_sum(np.ones_like(r_hi), rate[0]))
+    growth = _renormalize(growth[0], growth[1] + rate[1])
+    power = (np.ones_like(r_hi), np.zeros_like(r_hi))
+    exponent = num_months.copy()
+    while exponent.any():
+        odd = (exponent & 1).astype(bool)
+        stepped = _dd_mul(power, growth)
+        power = (np.where(odd, stepped[0], power[0]), np.where(odd, stepped[1], power[1]))
+        growth = _dd_mul(growth, growth)
+        exponent >>= 1
+    return _dd_div(_dd_mul(rate, power), _dd_sub(power, (np.ones_like(r_hi), np.zeros_like(r_hi))))
+
+
+# Function to derive the standard EMI in whole paise, vectorized across loans
+def emi_paise(principal_paise, units, num_months):
+    """EMI in paise, half-up, for principals in paise and rates in rate units.
+
+    The annuity factor is evaluated once per distinct (rate, tenure) in
+    double-double precision (about 32 significant digits), and each loan's
+    rounded float estimate is corrected by the sign of P * factor - (EMI + 1/2).
+    That decides the half-up rounding exactly unless the true EMI lies within
+    about 1e-20 paise of a half paisa; 0% loans are divided in int64.
+    """
+    principal_paise, units, num_months = np.broadcast_arrays(
+        np.asarray(principal_paise, dtype=np.int64), np.asarray(units, dtype=np.int64),
+        np.asarray(num_months, dtype=np.int64),
+    )
+    shape = principal_paise.shape
+    p, units, n = principal_paise.ravel(), units.ravel(), num_months.ravel()
+    emi = np.zeros(len(p), dtype=np.int64)
+
+    zero_rate = (units == 0) & (n > 0)
+    # Half-up integer division, as for the monthly interest
+    emi[zero_rate] = (2 * p[zero_rate] + n[zero_rate]) // (2 * n[zero_rate])
+
+    priced = np.flatnonzero((units != 0) & (n > 0))
+    if len(priced):
+        # One factor per distinct (rate, tenure): a book has far fewer of those than loans
+        span = int(n[priced].max()) + 1
+        pairs, inverse = np.unique(units[priced] * span + n[priced], return_inverse=True)
+        factor_hi, factor_lo = _annuity_factors(pairs // span, pairs % span)
+        amount = p[priced].astype(np.float64)
+        exact_hi, exact_lo = _two_prod(amount, factor_hi[inverse])
+        exact_lo = exact_lo + amount * factor_lo[inverse]
+        estimate = np.floor(exact_hi + 0.5)
+        # P * factor - (estimate + 1/2): >= 0 means round up, < -1 means the estimate was one too high
+        gap = (exact_hi - (estimate + 0.5)) + exact_lo
+        emi[priced] = estimate.astype(np.int64) + (gap >= 0) - (gap < -1)
+    return emi.reshape(shape)
+
+
+# Function to build exact monthly ledgers for one or many loans
+@timed("paise_schedule")
+def paise_schedule(principal, annual_rate, tenure_years, emi=None):
+    """Month-by-month interest, principal, payment and balance in int64 paise.
+
+    Takes rupees and % like amortization_schedule (converted with to_paise and
+    rate_units); `emi`, if given, is in rupees and rounded to the paisa.
+    """
+    principal, annual_rate, tenure_years = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(principal, dtype=np.float64)),
+        np.atleast_1d(np.asarray(annual_rate, dtype=np.float64)),
+        np.atleast_1d(np.asarray(tenure_years)),
+    )
+    loan = to_paise(principal.ravel())
+    units = rate_units(annual_rate.ravel())
+    num_months = np.maximum((tenure_years.ravel() * 12).astype(np.int64), 0)
+    limit = _max_balance(units)
+    if np.any(loan > limit):
+        raise ValueError("loan amount too large for exact int64 interest at this rate")
+
+    if emi is None:
+        emi = emi_paise(loan, units, num_months)
+    else:
+        emi = np.broadcast_to(to_paise(emi), loan.shape).copy()
+    emi = np.where(num_months > 0, emi, 0)
+
+    n_loans = len(loan)
+    max_months = int(num_months.max()) if n_loans else 0
+    # Filled one month (row) at a time and handed back transposed to (n_loans, max_months)
+    interest = np.zeros((max_months, n_loans), dtype=np.int64)
+    principal_paid = np.zeros_like(interest)
+    balance = np.zeros_like(interest)
+
+    owed = loan.copy()
+    for m in range(max_months):
+        # An EMI below the interest grows the balance; stop before it wraps around int64
+        if np.any(owed > limit):
+            raise ValueError(f"balance outgrows exact int64 interest in month {m + 1}: "
+                             "the EMI does not cover the interest")
+        live = (m < num_months) & (owed > 0) & (emi > 0)
+        # Half-up integer division: floor((2 * owed * rate + D) / 2D)
+        month_interest = (2 * owed * units + INTEREST_DENOMINATOR) // (2 * INTEREST_DENOMINATOR)
+        repaid = emi - month_interest
+        # Last instalment, or an EMI that would overpay: settle the balance exactly
+        settle = (m == num_months - 1) | (repaid >= owed)
+        repaid = np.where(settle, owed, repaid)
+        month_interest = np.where(live, month_interest, 0)
+        repaid = np.where(live, repaid, 0)
+        owed = owed - repaid
+        interest[m] = month_interest
+        principal_paid[m] = repaid
+        balance[m] = owed
+
+    interest, principal_paid, balance = interest.T, principal_paid.T, balance.T
+    months = np.arange(1, max_months + 1)
+    active = (months[None, :] <= num_months[:, None]) & (emi > 0)[:, None]
+    total_interest = interest.sum(axis=1)
+    return PaiseSchedule(
+        emi=emi,
+        num_months=num_months,
+        months=months,
+        interest=interest,
+        principal=principal_paid,
+        payment=interest + principal_paid,
+        balance=balance,
+        active=active,
+        total_interest=total_interest,
+        total_payable=loan + total_interest,
+    )
+
+
+# Function to walk one loan's ledger in Decimal, as a reference for paise_schedule
+def decimal_schedule(principal_paise, units, num_months):
+    """Same rounding rules as paise_schedule, one loan at a time in Decimal.
+
+    Returns (emi, interest, principal, balance) with integer paise lists.
+    """
+    paisa = Decimal(1)
+    with localcontext() as ctx:
+        ctx.prec = 50
+        owed = Decimal(int(principal_paise))
+        units = Decimal(int(units))
+        r = units / INTEREST_DENOMINATOR
+        n = int(num_months)
+        if n <= 0:
+            return 0, [], [], []
+        if r == 0:
+            emi = (owed / n).quantize(paisa, ROUND_HALF_UP)
+        else:
+            growth = (1 + r) ** n
+            emi = (owed * r * growth / (growth - 1)).quantize(paisa, ROUND_HALF_UP)
+
+        interest, principal, balance = [], [], []
+        for m in range(n):
+            if owed <= 0:
+                interest.append(0)
+                principal.append(0)
+                balance.append(0)
+                continue
+            # Divide last, so a balance landing exactly on half a paisa stays exact
+            month_interest = (owed * units / INTEREST_DENOMINATOR).quantize(paisa, ROUND_HALF_UP)
+            repaid = emi - month_interest
+            if m == n - 1 or repaid >= owed:
+                repaid = owed
+            owed -= repaid
+            interest.append(int(month_interest))
+            principal.append(int(repaid))
+            balance.append(int(owed))
+    return int(emi), interest, principal, balance
+
+
+def _loan_book(n, seed):
+    rng = np.random.default_rng(seed)
+    return {
+        'principal': rng.integers(100000, 10000001, n) + rng.integers(0, 100, n) / 100,
+        'rate': rng.integers(100, 2501, n) / 100,
+        'tenure': rng.integers(1, 31, n),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare exact paise schedules with the float and Decimal paths.")
+    parser.add_argument("--loans", type=int, default=100_000)
+    parser.add_argument("--decimal-loans", type=int, default=200,
+                        help="loans to walk in Decimal (it is slow; timings are per loan)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    book = _loan_book(args.loans, args.seed)
+    print(f"{args.loans:,} loans, 1-30 years")
+
+    start = time.perf_counter()
+    exact = paise_schedule(book['principal'], book['rate'], book['tenure'])
+    exact_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    floats = amortization_schedule(book['principal'], book['rate'], book['tenure'])
+    float_seconds = time.perf_counter() - start
+
+    k = min(args.decimal_loans, args.loans)
+    loan = to_paise(book['principal'])
+    units = rate_units(book['rate'])
+    start = time.perf_counter()
+    reference = [decimal_schedule(loan[i], units[i], exact.num_months[i]) for i in range(k)]
+    decimal_seconds = time.perf_counter() - start
+
+    per_loan = lambda seconds, n: seconds / n * 1e6
+    print(f"{'path':<10} {'total s':>9} {'µs/loan':>9}")
+    print(f"{'float':<10} {float_seconds:>9.3f} {per_loan(float_seconds, args.loans):>9.1f}")
+    print(f"{'paise':<10} {exact_seconds:>9.3f} {per_loan(exact_seconds, args.loans):>9.1f}")
+    print(f"{'Decimal':<10} {decimal_seconds:>9.3f} {per_loan(decimal_seconds, k):>9.1f}   ({k} loans)")
+
+    # Exact mode against the Decimal ledger, instalment by instalment
+    mismatched = 0
+    for i, (emi, interest, principal, balance) in enumerate(reference):
+        n = exact.num_months[i]
+        if (emi != exact.emi[i] or interest != exact.interest[i, :n].tolist()
+                or principal != exact.principal[i, :n].tolist() or balance != exact.balance[i, :n].tolist()):
+            mismatched += 1
+    print(f"\npaise vs Decimal: {mismatched} of {k} ledgers differ")
+
+    # Reconciliation: principal repaid against the loan amount
+    paise_residual = np.abs(exact.principal.sum(axis=1) - loan).max()
+    float_residual = np.abs(floats.principal.sum(axis=1) - book['principal']).max() * PAISE_PER_RUPEE
+    print(f"max |sum(principal) - loan|: paise {paise_residual} paise, float {float_residual:.6f} paise")
+    payments_ok = (exact.payment.sum(axis=1) == exact.total_payable).all()
+    print(f"sum(payment) == loan + total interest for every loan: {payments_ok}")
+
+    # How far the float schedule, posted to whole paise, strays from the exact ledger
+    posted = to_paise(floats.interest)
+    interest_gap = np.abs(posted - exact.interest)[exact.active]
+    total_gap = np.abs(to_paise(floats.total_interest) - exact.total_interest)
+    print(f"float interest rounded to paise vs exact: {(interest_gap > 0).mean():.2%} of instalments differ "
+          f"(max {interest_gap.max()} paise); total interest off by up to {total_gap.max()} paise "
+          f"({(total_gap > 0).mean():.1%} of loans)")
+
+
+if __name__ == "__main__":
+    main()
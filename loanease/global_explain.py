@@ -0,0 +1,451 @@
+# loanease/global_explain.py
+# Dataset-wide TreeSHAP: contributions for every past customer, computed offline,
+# plus the aggregates behind the Explainability page's global view.
+#
+# The job runs XGBoost's TreeSHAP (pred_contribs, as in loanease.explain) over the
+# loan history in chunks of CHUNK_ROWS rows on a process pool. Chunks are read
+# lazily from the memory-mapped dataset columns, and only a few are in flight
+# at a time, so memory stays bounded by the chunk size. Each worker writes
+# its rows straight into the output columns, one float32 .npy file per feature
+# plus the model margin, in .shap_values/ next to the model artifacts; the
+# columns are memory-mapped when read back. Everything the view shows is then
+# aggregated in one more chunked pass and saved in summary.json:
+#   - global importance: mean |SHAP| and mean SHAP per feature;
+#   - dependence curves: mean (and spread of) SHAP per feature value bin, plus a
+#     fixed random sample of rows for the scatter;
+#   - segments: per Education level and Family size, customers, acceptance
+#     rate, mean predicted probability and mean SHAP per feature.
+# The artifact is keyed on the fingerprints of the CSV and the model files.
+# train_save_model.py and this module's CLI (re)build it; the app only loads it
+# (get_store) and never runs TreeSHAP in a request.
+#
+# Usage:
+#   python -m loanease.global_explain --workers 4
+#   python -m loanease.global_explain --history 1000000 --workers 1 2 4   # time the job on a larger history
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from . import model_store
+from .explain import model_contributions
+from .model_store import ARTIFACT_DIR, FEATURES
+
+SHAP_DIRNAME = ".shap_values"
+SUMMARY = "summary.json"
+DATA_FILE = "bank_personal_loan_data.csv"
+TARGET = 'Personal Loan'
+# Customer attributes the contributions are broken down by
+SEGMENTS = ('Education', 'Family')
+# Rows per TreeSHAP call; each is one task on the process pool
+CHUNK_ROWS = 50_000
+# Features with more distinct values than this get quantile bins in the dependence curves
+DEPENDENCE_BINS = 32
+# Rows kept for the dependence scatter plots
+SAMPLE_ROWS = 2000
+# Quantile bins of a larger history come from a fixed sample of this many rows
+QUANTILE_SAMPLE_ROWS = 200_000
+
+_stores = {}
+_lock = threading.Lock()
+_worker_model = None
+
+
+def _column_file(directory, name):
+    return os.path.join(directory, name + '.npy')
+
+
+def _shap_column(feature):
+    return 'shap_' + feature
+
+
+def _n_rows(X):
+    return len(X[FEATURES[0]]) if isinstance(X, dict) else len(X)
+
+
+def _column(X, j, rows):
+    # Feature j of `rows` (a slice or row indices), from a 2-D array or a dict of per-feature columns
+    return X[FEATURES[j]][rows] if isinstance(X, dict) else X[rows, j]
+
+
+def _feature_rows(X, rows):
+    # float64 (n, n_features) block of `rows`; only these rows of memory-mapped columns are read
+    return np.column_stack([np.asarray(_column(X, j, rows), dtype=np.float64) for j in range(len(FEATURES))])
+
+
+def _chunks(n_rows, chunk_rows):
+    return (slice(start, start + chunk_rows) for start in range(0, n_rows, chunk_rows))
+
+
+def _init_worker(model_dir, nthread):
+    # One model per worker process, with its share of the cores
+    global _worker_model
+    _worker_model = model_store.load_model(model_dir)
+    _worker_model.booster.set_param({'nthread': nthread})
+
+
+def _shap_chunk(X, directory, start, model_dir=ARTIFACT_DIR):
+    model = _worker_model or model_store.load_model(model_dir)
+    contribs, bias = model_contributions(X, model)
+    stop = start + len(X)
+    for j, feature in enumerate(FEATURES):
+        column = np.load(_column_file(directory, _shap_column(feature)), mmap_mode='r+')
+        column[start:stop] = contribs[:, j]
+        column.flush()
+    margin = np.load(_column_file(directory, 'margin'), mmap_mode='r+')
+    margin[start:stop] = contribs.sum(axis=1) + bias
+    margin.flush()
+    return float(bias[0]) if len(bias) else 0.0
+
+
+# Function to compute TreeSHAP for every row, chunk by chunk, into .npy columns
+def compute_shap_values(X, directory, model_dir=ARTIFACT_DIR, workers=1, chunk_rows=CHUNK_ROWS):
+    """Writes shap_<feature>.npy and margin.npy (float32, one value per row) to `directory`.
+
+    `X` is an (n, n_features) array or a dict of per-feature columns (memory-mapped
+    ones are read a chunk at a time). With `workers` > 1 the chunks run on a
+    process pool, each worker with an equal share of XGBoost's threads. Returns
+    the model's bias (log-odds).
+    """
+    n_rows = _n_rows(X)
+    for name in [_shap_column(f) for f in FEATURES] + ['margin']:
+        np.lib.format.open_memmap(_column_file(directory, name), mode='w+', dtype=np.float32, shape=(n_rows,)).flush()
+
+    chunks = ((rows.start, _feature_rows(X, rows)) for rows in _chunks(n_rows, chunk_rows))
+    biases = []
+    if workers and workers > 1 and n_rows > chunk_rows:
+        nthread = max(1, (os.cpu_count() or 1) // workers)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model_dir, nthread)) as pool:
+            # At most two chunks per worker are read and in flight at a time
+            pending = set()
+            for start, chunk in chunks:
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    biases += [future.result() for future in done]
+                pending.add(pool.submit(_shap_chunk, chunk, directory, start))
+            biases += [future.result() for future in pending]
+    else:
+        biases = [_shap_chunk(chunk, directory, start, model_dir) for start, chunk in chunks]
+    return biases[0] if biases else 0.0
+
+
+def _sample_rows(n_rows, size, seed=0):
+    # Every row when there are few enough, otherwise a fixed sorted random sample
+    if n_rows <= size:
+        return slice(None)
+    return np.sort(np.random.default_rng(seed).choice(n_rows, size, replace=False))
+
+
+def _bin_edges(X, j, n_rows, chunk_rows):
+    # Exact values for discrete features (Education, Age), quantile bins otherwise.
+    # Returns (edges, side) for np.searchsorted
+    distinct = None
+    for rows in _chunks(n_rows, chunk_rows):
+        values = np.unique(_column(X, j, rows))
+        distinct = values if distinct is None else np.union1d(distinct, values)
+        if len(distinct) > DEPENDENCE_BINS:
+            break
+    else:
+        return (distinct if distinct is not None else np.empty(0)), 'left'
+    sample = np.asarray(_column(X, j, _sample_rows(n_rows, QUANTILE_SAMPLE_ROWS)), dtype=np.float64)
+    return np.unique(np.quantile(sample, np.linspace(0, 1, DEPENDENCE_BINS + 1)[1:-1])), 'right'
+
+
+def _levels(values, n_rows, chunk_rows):
+    levels = None
+    for rows in _chunks(n_rows, chunk_rows):
+        chunk_levels = np.unique(values[rows])
+        levels = chunk_levels if levels is None else np.union1d(levels, chunk_levels)
+    return levels if levels is not None else np.empty(0)
+
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+
+# Function to aggregate the stored contributions for the global view
+def summarize(X, shap, margin, labels, segments, bias, chunk_rows=CHUNK_ROWS):
+    """Importance, dependence curves and per-segment means as a JSON-ready dict.
+
+    `X` and `shap` (log-odds) are (n, n_features) arrays or dicts of per-feature
+    columns, `segments` maps a name to one value per row. Everything is summed
+    chunk by chunk, so memory-mapped inputs are never read whole.
+    """
+    n_rows = _n_rows(X)
+    n_features = len(FEATURES)
+    bins = [_bin_edges(X, j, n_rows, chunk_rows) for j in range(n_features)]
+    # Per bin: count, sum of SHAP, sum of squared SHAP, sum of feature values
+    dependence = [np.zeros((4, len(edges) + (side == 'right'))) for edges, side in bins]
+    levels = {name: _levels(values, n_rows, chunk_rows) for name, values in segments.items()}
+    # Per level: count, labels, probability, then SHAP and |SHAP| per feature
+    by_level = {name: np.zeros((len(level), 3 + 2 * n_features)) for name, level in levels.items()}
+    shap_sum = np.zeros(n_features)
+    abs_sum = np.zeros(n_features)
+    probability_sum = label_sum = 0.0
+
+    for rows in _chunks(n_rows, chunk_rows):
+        x, contribs = _feature_rows(X, rows), _feature_rows(shap, rows)
+        abs_contribs = np.abs(contribs)
+        probability = _sigmoid(np.asarray(margin[rows], dtype=np.float64))
+        accepted = np.asarray(labels[rows], dtype=np.float64)
+        shap_sum += contribs.sum(axis=0)
+        abs_sum += abs_contribs.sum(axis=0)
+        probability_sum += probability.sum()
+        label_sum += accepted.sum()
+
+        for j, (edges, side) in enumerate(bins):
+            bin_of = np.searchsorted(edges, x[:, j], side=side)
+            size = dependence[j].shape[1]
+            for k, weights in enumerate((None, contribs[:, j], contribs[:, j] ** 2, x[:, j])):
+                dependence[j][k] += np.bincount(bin_of, weights=weights, minlength=size)
+
+        for name, values in segments.items():
+            group = np.searchsorted(levels[name], values[rows])
+            columns = [None, accepted, probability] + list(contribs.T) + list(abs_contribs.T)
+            for k, weights in enumerate(columns):
+                by_level[name][:, k] += np.bincount(group, weights=weights, minlength=len(levels[name]))
+
+    mean_abs = abs_sum / max(n_rows, 1)
+    summary = {
+        'rows': n_rows,
+        'features': list(FEATURES),
+        'base_probability': float(_sigmoid(bias)),
+        'mean_probability': float(probability_sum / max(n_rows, 1)),
+        'acceptance_rate': float(label_sum / max(n_rows, 1)),
+        'importance': {
+            feature: {'mean_abs': float(mean_abs[j]), 'mean': float(shap_sum[j] / max(n_rows, 1)),
+                      'share': float(mean_abs[j] / mean_abs.sum())}
+            for j, feature in enumerate(FEATURES)
+        },
+        'dependence': {},
+        'segments': {},
+    }
+
+    for j, feature in enumerate(FEATURES):
+        count, total, squares, values = dependence[j][:, dependence[j][0] > 0]
+        mean = total / count
+        summary['dependence'][feature] = {
+            'value': (values / count).tolist(),
+            'mean_shap': mean.tolist(),
+            'std_shap': np.sqrt(np.maximum(squares / count - mean ** 2, 0.0)).tolist(),
+            'count': count.astype(np.int64).tolist(),
+        }
+
+    for name, level in levels.items():
+        rows = []
+        for i, value in enumerate(level):
+            count, accepted, probability = by_level[name][i, :3]
+            means = by_level[name][i, 3:] / count
+            rows.append({
+                'value': value.item(),
+                'count': int(count),
+                'acceptance_rate': float(accepted / count),
+                'mean_probability': float(probability / count),
+                'mean_shap': dict(zip(FEATURES, means[:n_features].tolist())),
+                'mean_abs_shap': dict(zip(FEATURES, means[n_features:].tolist())),
+            })
+        summary['segments'][name] = rows
+    return summary
+
+
+def _model_fingerprint(model_dir):
+    from .dataset import fingerprint
+
+    return {name: fingerprint(os.path.join(model_dir, name))
+            for name in (model_store.MODEL_FILE, model_store.SCALER_FILE)}
+
+
+def _load_inputs(csv_path):
+    # Memory-mapped columns of the dataset cache; the job reads them a chunk at a time
+    from .dataset import load_columns
+
+    columns = load_columns(csv_path, list(dict.fromkeys(FEATURES + [TARGET, *SEGMENTS])))
+    return {f: columns[f] for f in FEATURES}, columns[TARGET], {name: columns[name] for name in SEGMENTS}
+
+
+# Function to run the whole job: TreeSHAP columns, sample and summary
+def build_artifact(X, labels, segments, directory, model_dir=ARTIFACT_DIR, workers=1,
+                   chunk_rows=CHUNK_ROWS, manifest=None):
+    """Writes the columns, the dependence sample and summary.json to `directory`; returns the summary."""
+    start = time.perf_counter()
+    if os.path.isdir(directory):
+        shutil.rmtree(directory)
+    os.makedirs(directory)
+
+    bias = compute_shap_values(X, directory, model_dir, workers, chunk_rows)
+    shap_seconds = time.perf_counter() - start
+    store = load_store(directory, require_summary=False)
+
+    n_rows = _n_rows(X)
+    rng = np.random.default_rng(0)
+    sample = np.sort(rng.choice(n_rows, min(SAMPLE_ROWS, n_rows), replace=False))
+    np.save(_column_file(directory, 'sample_rows'), sample.astype(np.int64))
+    np.save(_column_file(directory, 'sample_features'), _feature_rows(X, sample))
+
+    summary = summarize(X, store.shap, store.margin, labels, segments, bias, chunk_rows)
+    summary.update(manifest or {})
+    summary.update(
+        bias=bias,
+        workers=workers or 1,
+        chunk_rows=chunk_rows,
+        shap_seconds=shap_seconds,
+        seconds=time.perf_counter() - start,
+    )
+    with open(os.path.join(directory, SUMMARY), 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+class ShapStore:
+    """Memory-mapped per-row contributions plus the precomputed summary."""
+
+    def __init__(self, directory, summary, columns):
+        self.directory = directory
+        self.summary = summary
+        self.shap = {feature: columns[_shap_column(feature)] for feature in FEATURES}
+        self.margin = columns['margin']
+        self.sample_rows = columns.get('sample_rows')
+        self.sample_features = columns.get('sample_features')
+
+    def __len__(self):
+        return len(self.margin)
+
+    def shap_matrix(self, rows=None):
+        """[n, n_features] contributions (log-odds) for `rows` (default: all)."""
+        return np.column_stack([self.shap[f] if rows is None else self.shap[f][rows] for f in FEATURES])
+
+    def dependence_sample(self, feature):
+        """(feature values, contributions) of the sampled rows, for a scatter plot."""
+        j = FEATURES.index(feature)
+        return self.sample_features[:, j], np.asarray(self.shap[feature][self.sample_rows])
+
+
+def _read_summary(directory):
+    try:
+        with open(os.path.join(directory, SUMMARY)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_store(directory, require_summary=True):
+    """Opens a saved artifact with every column memory-mapped."""
+    summary = _read_summary(directory)
+    if summary is None and require_summary:
+        raise FileNotFoundError(f"no SHAP summary in {directory}")
+    names = [_shap_column(f) for f in FEATURES] + ['margin', 'sample_rows', 'sample_features']
+    columns = {name: np.load(_column_file(directory, name), mmap_mode='r')
+               for name in names if os.path.exists(_column_file(directory, name))}
+    return ShapStore(directory, summary, columns)
+
+
+def _expected_manifest(csv_path, model_dir):
+    from .dataset import fingerprint
+
+    return {'fingerprint': fingerprint(csv_path), 'model': _model_fingerprint(model_dir)}
+
+
+def _is_current(summary, expected):
+    return summary is not None and all(summary.get(key) == value for key, value in expected.items())
+
+
+# Function to build (or rebuild) the artifact for the dataset and the current model
+def ensure_artifact(csv_path, model_dir=ARTIFACT_DIR, workers=1, chunk_rows=CHUNK_ROWS):
+    """Returns the artifact directory, rebuilding it when the CSV or the model changed."""
+    directory = os.path.join(model_dir, SHAP_DIRNAME)
+    expected = _expected_manifest(csv_path, model_dir)
+    if not _is_current(_read_summary(directory), expected):
+        X, labels, segments = _load_inputs(csv_path)
+        build_artifact(X, labels, segments, directory, model_dir, workers, chunk_rows, expected)
+    return directory
+
+
+# Function to get the shared global explanations (load only; the offline job builds them)
+def get_store(directory=ARTIFACT_DIR):
+    """Opens the artifact next to the model, once per process.
+
+    Raises FileNotFoundError when it is missing or was built for another CSV
+    or model; run `python -m loanease.global_explain` to (re)build it.
+    """
+    store = _stores.get(directory)
+    if store is None:
+        with _lock:
+            store = _stores.get(directory)
+            if store is None:
+                artifact = os.path.join(directory, SHAP_DIRNAME)
+                expected = _expected_manifest(os.path.join(directory, DATA_FILE), directory)
+                if not _is_current(_read_summary(artifact), expected):
+                    raise FileNotFoundError(f"SHAP artifact in {artifact} is missing or out of date")
+                store = load_store(artifact)
+                _stores[directory] = store
+    return store
+
+
+def clear_cache():
+    with _lock:
+        _stores.clear()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute TreeSHAP for the whole loan history.")
+    parser.add_argument("--data", default=os.path.join(ARTIFACT_DIR, DATA_FILE))
+    parser.add_argument("--workers", type=int, nargs="+", default=[1],
+                        help="worker processes; several values time the job once per count")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--history", type=int, default=0,
+                        help="time the job on a synthetic history of this many rows (resampled from the CSV) "
+                             "instead of building the artifact")
+    args = parser.parse_args(argv)
+
+    if not args.history:
+        start = time.perf_counter()
+        directory = ensure_artifact(args.data, workers=args.workers[-1], chunk_rows=args.chunk_rows)
+        clear_cache()
+        store = load_store(directory)
+        summary = store.summary
+        print(f"{len(store):,} customers in {directory} ({time.perf_counter() - start:.2f} s, "
+              f"TreeSHAP {summary['shap_seconds']:.2f} s)")
+        start = time.perf_counter()
+        load_store(directory).dependence_sample(FEATURES[0])
+        print(f"summary + memory-mapped columns load: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+        # Contributions plus bias must reproduce the model's own margin
+        model = model_store.load_model()
+        X, _, _ = _load_inputs(args.data)
+        gap = 0.0
+        for rows in _chunks(len(store), args.chunk_rows):
+            expected = model.booster.inplace_predict(model.transform(_feature_rows(X, rows)), predict_type="margin")
+            gap = max(gap, float(np.abs(store.shap_matrix(rows).sum(axis=1) + summary['bias'] - expected).max()))
+        print(f"max |sum(SHAP) + bias - margin|: {gap:.2e}")
+        print("Global importance (mean |SHAP|, log-odds):")
+        for feature, stats in sorted(summary['importance'].items(), key=lambda item: -item[1]['mean_abs']):
+            print(f"  {feature:<10} {stats['mean_abs']:7.3f}  ({stats['share']:.0%})")
+        for name, rows in summary['segments'].items():
+            print(f"{name}: " + ", ".join(f"{row['value']}: {row['count']:,} customers, "
+                                         f"{row['acceptance_rate']:.1%} accepted" for row in rows))
+        return
+
+    X, labels, segments = _load_inputs(args.data)
+    rng = np.random.default_rng(0)
+    rows = rng.integers(0, len(labels), args.history)
+    history = _feature_rows(X, rows)
+    history[:, 1:3] *= rng.normal(1, 0.05, (args.history, 2))   # jitter Income and CCAvg
+    history_segments = {name: values[rows] for name, values in segments.items()}
+    print(f"synthetic history of {args.history:,} rows, {args.chunk_rows:,} rows per chunk")
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in args.workers:
+            summary = build_artifact(history, labels[rows], history_segments, os.path.join(tmp, SHAP_DIRNAME),
+                                     workers=workers, chunk_rows=args.chunk_rows)
+            print(f"  workers={workers}: TreeSHAP {summary['shap_seconds']:.2f} s "
+                  f"({args.history / summary['shap_seconds']:,.0f} rows/s), total {summary['seconds']:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# loanease/model_store.py
+# Process-wide loader for the trained XGBoost model and its StandardScaler.
+#
+# The booster is stored in XGBoost's native UBJSON format (xgb_model.ubj) and the
+# scaler as plain mean/scale arrays (scaler.npz), so loading does not depend on
+# the sklearn/xgboost versions that happened to pickle them. Artifacts are loaded
+# once per process and shared by every caller (Streamlit sessions, reruns, CLIs).
+#
+# Usage:
+#   python -m loanease.model_store   # export native artifacts from the .pkl files and report load latency
+import os
+import threading
+import time
+
+import numpy as np
+
+from .metrics import increment, timed
+
+# Feature order used by train_save_model.py
+FEATURES = ['Age', 'Income', 'CCAvg', 'Education']
+
+# Artifacts live at the repository root, next to train_save_model.py
+ARTIFACT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_FILE = "xgb_model.ubj"
+SCALER_FILE = "scaler.npz"
+LEGACY_MODEL_FILE = "xgb_model.pkl"
+LEGACY_SCALER_FILE = "scaler.pkl"
+
+_cache = {}
+_lock = threading.Lock()
+
+
+class LoanModel:
+    """Booster plus scaler statistics, exposing an sklearn-like predict_proba."""
+
+    def __init__(self, booster, mean, scale, feature_names=FEATURES):
+        self.booster = booster
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.feature_names = list(feature_names)
+
+    def transform(self, X):
+        # Same arithmetic as StandardScaler.transform
+        return (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+
+    @timed("model_predict")
+    def predict_approval(self, X):
+        """Probability of the positive class (Personal Loan accepted) for each row."""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        increment("model_rows", len(X))
+        return self.booster.inplace_predict(self.transform(X))
+
+    def predict_proba(self, X):
+        p = self.predict_approval(X)
+        return np.column_stack([1 - p, p])
+
+
+# Function to write the native artifacts for a fitted booster and scaler
+def save_native_artifacts(booster, scaler, directory=ARTIFACT_DIR):
+    """`booster` may be an XGBClassifier or a Booster; `scaler` a fitted StandardScaler."""
+    if hasattr(booster, "get_booster"):
+        booster = booster.get_booster()
+    booster.save_model(os.path.join(directory, MODEL_FILE))
+    np.savez(
+        os.path.join(directory, SCALER_FILE),
+        mean=scaler.mean_,
+        scale=scaler.scale_,
+        feature_names=np.asarray(FEATURES),
+    )
+
+
+# Function to convert the joblib pickles written by train_save_model.py
+def export_native_artifacts(directory=ARTIFACT_DIR):
+    import joblib
+
+    model = joblib.load(os.path.join(directory, LEGACY_MODEL_FILE))
+    scaler = joblib.load(os.path.join(directory, LEGACY_SCALER_FILE))
+    save_native_artifacts(model, scaler, directory)
+
+
+def _load_from_disk(directory):
+    import xgboost as xgb
+
+    model_path = os.path.join(directory, MODEL_FILE)
+    scaler_path = os.path.join(directory, SCALER_FILE)
+    if not (os.path.exists(model_path) and os.path.exists(scaler_path)):
+        # First run after training with an older version: convert the pickles once
+        export_native_artifacts(directory)
+
+    booster = xgb.Booster()
+    booster.load_model(model_path)
+    with np.load(scaler_path) as arrays:
+        return LoanModel(booster, arrays["mean"], arrays["scale"], arrays["feature_names"].tolist())
+
+
+# Function to get the shared model instance (loaded on first use)
+@timed("model_load")
+def load_model(directory=ARTIFACT_DIR):
+    model = _cache.get(directory)
+    if model is None:
+        with _lock:
+            model = _cache.get(directory)
+            if model is None:
+                model = _load_from_disk(directory)
+                _cache[directory] = model
+    return model
+
+
+def warm_up(directory=ARTIFACT_DIR):
+    """Loads the model and runs one prediction so the first real request is fast."""
+    model = load_model(directory)
+    model.predict_approval(model.mean[None, :])
+    return model
+
+
+def warm_up_in_background(directory=ARTIFACT_DIR):
+    """Starts warm_up on a daemon thread; load_model() callers wait for it via the lock."""
+    thread = threading.Thread(target=warm_up, args=(directory,), name="model-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+
+
+def main():
+    export_native_artifacts()
+    print(f"Wrote {MODEL_FILE} and {SCALER_FILE} to {ARTIFACT_DIR}")
+
+    clear_cache()
+    start = time.perf_counter()
+    warm_up()
+    cold_ms = (time.perf_counter() - start) * 1000
+
+    repeats = 10_000
+    start = time.perf_counter()
+    for _ in range(repeats):
+        load_model()
+    warm_us = (time.perf_counter() - start) / repeats * 1e6
+
+    print(f"Cold load + first prediction: {cold_ms:.1f} ms")
+    print(f"Warm access: {warm_us:.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
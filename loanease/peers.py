@@ -0,0 +1,407 @@
+# loanease/peers.py
+# "Similar applicants" lookup: a KD-tree over the scaled model features of the loan dataset.
+#
+# The tree is built once from the training rows (Age, Income, CCAvg, Education,
+# standardized with the model's scaler) and saved as plain .npy arrays in
+# .peer_index/, next to the dataset. At startup the arrays are memory-mapped, so
+# loading costs nothing however long the history is. Points are stored one row
+# per feature (distances are then a few whole-array operations) and in tree
+# order, so every leaf is a contiguous slice.
+#
+# A query first takes the smallest subtree around it holding a few times k
+# points as its candidates, which bounds the k-th neighbour distance. A single
+# query then walks the tree level by level, one vectorized step per level,
+# keeping only nodes whose bounding box is nearer than that bound (indexes of
+# up to BRUTE_FORCE_ROWS points are simply scanned whole). Batches of
+# queries (the offline pipeline) descend the tree together: each node passes on
+# only the queries whose k-th neighbour could still be inside it.
+#
+# Usage:
+#   python -m loanease.peers                          # build the index, check it and time queries
+#   python -m loanease.peers --history 1000000 --queries 100000
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from .metrics import increment, timed
+from .model_store import ARTIFACT_DIR, FEATURES
+
+INDEX_DIRNAME = ".peer_index"
+MANIFEST = "manifest.json"
+DATA_FILE = "bank_personal_loan_data.csv"
+TARGET = 'Personal Loan'
+# Points per leaf; the leaf scan is a vectorized distance computation, so leaves can be fairly large
+LEAF_SIZE = 32
+# Neighbours shown on the Eligibility page
+DEFAULT_K = 25
+# Up to this many queries are answered one by one, walking the tree level by level
+SMALL_BATCH = 8
+# The first candidates of a query are the smallest subtree around it holding this many times k points
+HOME_FACTOR = 4
+# Single queries on indexes up to this size scan every point (cheaper than walking the tree)
+BRUTE_FORCE_ROWS = 16_384
+
+_ARRAYS = ('points', 'labels', 'ids', 'split_dim', 'split_value', 'left', 'right', 'start', 'end', 'lo', 'hi')
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+class PeerIndex:
+    """KD-tree arrays plus the scaler statistics used to place queries in the same space."""
+
+    def __init__(self, arrays, mean, scale, features=FEATURES):
+        for name in _ARRAYS:
+            # Plain ndarray views of the memmaps: same pages, without np.memmap's per-index overhead
+            setattr(self, name, np.asarray(arrays[name]))
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.features = list(features)
+        self.leaves = np.flatnonzero(self.left < 0)
+        self._children = np.stack([self.left, self.right], axis=1)
+
+    def __len__(self):
+        return self.points.shape[1]
+
+    def transform(self, X):
+        return (np.atleast_2d(np.asarray(X, dtype=np.float64)) - self.mean) / self.scale
+
+    def _home_nodes(self, Q, k):
+        # Descend all queries level by level by the split planes, down to the
+        # smallest subtree that still holds k points (a contiguous slice of points)
+        node = np.zeros(len(Q), dtype=np.int64)
+        active = np.arange(len(Q))
+        while len(active):
+            current = node[active]
+            go_left = Q[active, self.split_dim[current]] < self.split_value[current]
+            child = np.where(go_left, self.left[current], self.right[current])
+            deeper = (self.left[current] >= 0) & (self.end[child] - self.start[child] >= k)
+            node[active[deeper]] = child[deeper]
+            active = active[deeper]
+        return node
+
+    def _scan(self, q, k):
+        # One query. Small indexes: a straight scan of the contiguous points is cheapest
+        if len(self) <= BRUTE_FORCE_ROWS:
+            dist = _sq_distances(self.points, q)
+            best = np.argpartition(dist, k - 1)[:k]
+            best = best[np.argsort(dist[best], kind='stable')]
+            return dist[best], best
+
+        # Otherwise the home subtree bounds the k-th neighbour distance, and the tree is
+        # walked level by level keeping only nodes whose box is within that bound
+        # (the same descent as _home_nodes, on plain scalars for one query)
+        node, min_size = 0, HOME_FACTOR * k
+        while self.left[node] >= 0:
+            child = self.left[node] if q[self.split_dim[node]] < self.split_value[node] else self.right[node]
+            if self.end[child] - self.start[child] < min_size:
+                break
+            node = child
+        start, end = self.start[node], self.end[node]
+        kth = np.partition(_sq_distances(self.points[:, start:end], q), k - 1)[k - 1]
+
+        leaves = []
+        frontier = np.zeros(1, dtype=np.int64)
+        while len(frontier):
+            gap = np.maximum(np.maximum(self.lo[frontier] - q, q - self.hi[frontier]), 0)
+            frontier = frontier[(gap * gap).sum(axis=1) <= kth]
+            is_leaf = self.left[frontier] < 0
+            leaves.append(frontier[is_leaf])
+            frontier = self._children[frontier[~is_leaf]].ravel()
+
+        leaves = np.concatenate(leaves)
+        rows = _ranges(self.start[leaves], self.end[leaves])
+        dist = _sq_distances(self.points[:, rows], q)
+        best = np.argpartition(dist, k - 1)[:k]
+        best = best[np.argsort(dist[best], kind='stable')]
+        return dist[best], rows[best]
+
+    def _merge(self, best_d, best_i, queries, Q, start, end):
+        # Fold the points [start, end) into the running k best of `queries`
+        k = best_d.shape[1]
+        dist = _sq_distances(self.points[:, start:end], Q[queries])
+        all_d = np.concatenate([best_d[queries], dist], axis=1)
+        all_i = np.concatenate([best_i[queries], np.broadcast_to(np.arange(start, end), dist.shape)], axis=1)
+        keep = np.argpartition(all_d, k - 1, axis=1)[:, :k]
+        best_d[queries] = np.take_along_axis(all_d, keep, axis=1)
+        best_i[queries] = np.take_along_axis(all_i, keep, axis=1)
+
+    def _batch(self, Q, k):
+        best_d = np.full((len(Q), k), np.inf)
+        best_i = np.full((len(Q), k), -1, dtype=np.int64)
+
+        # Home subtrees first, so every query starts the descent with a finite, tight radius
+        home = self._home_nodes(Q, HOME_FACTOR * k)
+        order = np.argsort(home, kind='stable')
+        groups = np.flatnonzero(np.diff(home[order], prepend=-1, append=-1))
+        for first, last in zip(groups[:-1], groups[1:]):
+            node = home[order[first]]
+            self._merge(best_d, best_i, order[first:last], Q, self.start[node], self.end[node])
+        home_start, home_end = self.start[home], self.end[home]
+
+        stack = [(0, np.arange(len(Q)))]
+        while stack:
+            node, queries = stack.pop()
+            gap = np.maximum(self.lo[node] - Q[queries], 0) + np.maximum(Q[queries] - self.hi[node], 0)
+            queries = queries[(gap ** 2).sum(axis=1) < best_d[queries].max(axis=1)]
+            if not len(queries):
+                continue
+            if self.left[node] < 0:
+                # Skip queries whose home subtree already covered this leaf
+                inside = (home_start[queries] <= self.start[node]) & (self.start[node] < home_end[queries])
+                queries = queries[~inside]
+                if len(queries):
+                    self._merge(best_d, best_i, queries, Q, self.start[node], self.end[node])
+            else:
+                stack.append((self.right[node], queries))
+                stack.append((self.left[node], queries))
+
+        order = np.argsort(best_d, axis=1, kind='stable')
+        return np.take_along_axis(best_d, order, axis=1), np.take_along_axis(best_i, order, axis=1)
+
+    def _search(self, X, k):
+        # (squared distances, tree positions) of each query's k nearest points; a query with a
+        # missing (non-finite) feature has no neighbours: NaN distances and position -1
+        Q = self.transform(X)
+        k = min(k, len(self))
+        dist = np.full((len(Q), k), np.nan)
+        idx = np.full((len(Q), k), -1, dtype=np.int64)
+        finite = np.flatnonzero(np.isfinite(Q).all(axis=1))
+        if len(finite) <= SMALL_BATCH:
+            for row in finite:
+                dist[row], idx[row] = self._scan(Q[row], k)
+        else:
+            dist[finite], idx[finite] = self._batch(Q[finite], k)
+        return dist, idx, finite
+
+    # Function to find the k nearest historical customers
+    @timed("peer_query")
+    def query(self, X, k=DEFAULT_K):
+        """(distances, row indices into the dataset), each (n_queries, k), nearest first.
+
+        `X` holds raw feature rows; distances are Euclidean in the scaled space.
+        Rows with a missing (NaN) feature get NaN distances and index -1.
+        """
+        dist, idx, _ = self._search(X, k)
+        increment("peer_queries", len(idx))
+        return np.sqrt(dist), np.where(idx >= 0, np.asarray(self.ids)[idx], -1)
+
+    def acceptance_rate(self, X, k=DEFAULT_K):
+        """Share of each query's k nearest customers who took the Personal Loan.
+
+        NaN for rows with a missing feature, rather than a rate from arbitrary neighbours.
+        """
+        _, idx, finite = self._search(X, k)
+        rate = np.full(len(idx), np.nan)
+        rate[finite] = np.asarray(self.labels)[idx[finite]].mean(axis=1)
+        return rate
+
+
+def _sq_distances(columns, queries):
+    """Squared distances from (d,) or (n, d) queries to the (d, m) points; (m,) or (n, m)."""
+    total = 0.0
+    for j, column in enumerate(columns):
+        diff = column - queries[..., j, None] if queries.ndim == 2 else column - queries[j]
+        total = total + diff * diff
+    return total
+
+
+def _ranges(starts, ends):
+    # Concatenation of arange(start, end) for every pair, without a Python loop
+    lengths = ends - starts
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+
+
+# Function to build the tree over scaled rows
+def build_index(X, labels, mean, scale, leaf_size=LEAF_SIZE, features=FEATURES):
+    """`X`: raw (n, d) feature rows; `labels`: 0/1 outcome per row."""
+    mean = np.asarray(mean, dtype=np.float64)
+    scale = np.asarray(scale, dtype=np.float64)
+    points = (np.asarray(X, dtype=np.float64) - mean) / scale
+    n = len(points)
+    order = np.arange(n)
+    nodes = {name: [] for name in ('split_dim', 'split_value', 'left', 'right', 'start', 'end', 'lo', 'hi')}
+
+    def add(start, end):
+        segment = points[order[start:end]]
+        for name, value in (('split_dim', -1), ('split_value', 0.0), ('left', -1), ('right', -1),
+                            ('start', start), ('end', end), ('lo', segment.min(axis=0)),
+                            ('hi', segment.max(axis=0))):
+            nodes[name].append(value)
+        return len(nodes['start']) - 1
+
+    pending = [add(0, n)] if n else []
+    while pending:
+        node = pending.pop()
+        start, end = nodes['start'][node], nodes['end'][node]
+        spread = nodes['hi'][node] - nodes['lo'][node]
+        dim = int(np.argmax(spread))
+        if end - start <= leaf_size or spread[dim] == 0:
+            continue
+        # Median split on the widest dimension; equal values may land on both sides
+        mid = (start + end) // 2
+        segment = order[start:end]
+        order[start:end] = segment[np.argpartition(points[segment, dim], mid - start)]
+        nodes['split_dim'][node] = dim
+        nodes['split_value'][node] = points[order[mid], dim]
+        nodes['left'][node] = add(start, mid)
+        nodes['right'][node] = add(mid, end)
+        pending += [nodes['right'][node], nodes['left'][node]]
+
+    arrays = {
+        'points': np.ascontiguousarray(points[order].T),
+        'labels': np.asarray(labels, dtype=np.int8)[order],
+        'ids': order.astype(np.int64),
+        'split_dim': np.asarray(nodes['split_dim'], dtype=np.int64),
+        'split_value': np.asarray(nodes['split_value'], dtype=np.float64),
+        'left': np.asarray(nodes['left'], dtype=np.int64),
+        'right': np.asarray(nodes['right'], dtype=np.int64),
+        'start': np.asarray(nodes['start'], dtype=np.int64),
+        'end': np.asarray(nodes['end'], dtype=np.int64),
+        'lo': np.asarray(nodes['lo'], dtype=np.float64).reshape(-1, points.shape[1]),
+        'hi': np.asarray(nodes['hi'], dtype=np.float64).reshape(-1, points.shape[1]),
+    }
+    return PeerIndex(arrays, mean, scale, features)
+
+
+def save_index(index, directory, manifest=None):
+    if os.path.isdir(directory):
+        shutil.rmtree(directory)
+    os.makedirs(directory)
+    for name in _ARRAYS:
+        np.save(os.path.join(directory, name + '.npy'), np.asarray(getattr(index, name)))
+    manifest = dict(manifest or {}, rows=len(index), features=index.features,
+                    mean=index.mean.tolist(), scale=index.scale.tolist())
+    with open(os.path.join(directory, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_index(directory, mmap=True):
+    """Opens a saved index; with `mmap` the arrays are memory-mapped rather than read."""
+    manifest = _read_manifest(directory)
+    if manifest is None:
+        raise FileNotFoundError(f"no peer index in {directory}")
+    arrays = {name: np.load(os.path.join(directory, name + '.npy'), mmap_mode='r' if mmap else None)
+              for name in _ARRAYS}
+    return PeerIndex(arrays, manifest['mean'], manifest['scale'], manifest['features'])
+
+
+# Function to build (or rebuild) the index for the dataset and the current scaler
+def ensure_index(csv_path, model, leaf_size=LEAF_SIZE):
+    """Returns the index directory, rebuilding it when the CSV, the scaler or the leaf size changed."""
+    from .dataset import fingerprint, load_frame
+
+    directory = os.path.join(os.path.dirname(os.path.abspath(csv_path)), INDEX_DIRNAME)
+    expected = {
+        'fingerprint': fingerprint(csv_path),
+        'leaf_size': leaf_size,
+        'mean': np.asarray(model.mean, dtype=np.float64).tolist(),
+        'scale': np.asarray(model.scale, dtype=np.float64).tolist(),
+    }
+    manifest = _read_manifest(directory)
+    if manifest is None or any(manifest.get(key) != value for key, value in expected.items()):
+        data = load_frame(csv_path, FEATURES + [TARGET])
+        index = build_index(data[FEATURES].to_numpy(dtype=np.float64), data[TARGET].to_numpy(),
+                            model.mean, model.scale, leaf_size)
+        save_index(index, directory, {'fingerprint': expected['fingerprint'], 'leaf_size': leaf_size})
+    return directory
+
+
+# Function to get the shared, memory-mapped index (built on first use)
+def get_index(directory=ARTIFACT_DIR):
+    index = _indexes.get(directory)
+    if index is None:
+        with _lock:
+            index = _indexes.get(directory)
+            if index is None:
+                from . import model_store
+
+                index_dir = ensure_index(os.path.join(directory, DATA_FILE), model_store.load_model(directory))
+                index = load_index(index_dir)
+                _indexes[directory] = index
+    return index
+
+
+def _brute_force(points, Q, k):
+    dist = ((Q[:, None, :] - points[None, :, :]) ** 2).sum(axis=2)
+    return np.sqrt(np.sort(dist, axis=1)[:, :k])
+
+
+def main(argv=None):
+    from . import model_store
+    from .dataset import load_frame
+
+    parser = argparse.ArgumentParser(description="Build the similar-applicant index and time its queries.")
+    parser.add_argument("--history", type=int, default=0,
+                        help="also test on a synthetic history of this many rows (resampled and jittered)")
+    parser.add_argument("--queries", type=int, default=100_000, help="rows in the batched query")
+    parser.add_argument("-k", type=int, default=DEFAULT_K)
+    args = parser.parse_args(argv)
+
+    model = model_store.load_model()
+    csv_path = os.path.join(ARTIFACT_DIR, DATA_FILE)
+    start = time.perf_counter()
+    index_dir = ensure_index(csv_path, model)
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    index = load_index(index_dir)
+    load_seconds = time.perf_counter() - start
+    print(f"index over {len(index):,} customers: ensure {build_seconds * 1000:.1f} ms, "
+          f"memory-mapped load {load_seconds * 1000:.2f} ms, {len(index.leaves):,} leaves")
+
+    data = load_frame(csv_path, FEATURES + [TARGET])
+    X = data[FEATURES].to_numpy(dtype=np.float64)
+    indexes = [("dataset", index, X, data[TARGET].to_numpy())]
+    if args.history:
+        rng = np.random.default_rng(0)
+        rows = rng.integers(0, len(X), args.history)
+        history = X[rows] * rng.normal(1, 0.05, (args.history, X.shape[1]))
+        start = time.perf_counter()
+        large = build_index(history, data[TARGET].to_numpy()[rows], model.mean, model.scale)
+        print(f"synthetic history of {args.history:,} rows built in {time.perf_counter() - start:.2f} s")
+        indexes.append((f"history[{args.history:,}]", large, history, None))
+
+    rng = np.random.default_rng(1)
+    for name, peer_index, points, _ in indexes:
+        queries = points[rng.integers(0, len(points), args.queries)] * rng.normal(1, 0.05, (args.queries, X.shape[1]))
+        scaled = peer_index.transform(points)
+
+        singles = queries[:2000]
+        start = time.perf_counter()
+        for row in singles:
+            peer_index.query(row, args.k)
+        single_us = (time.perf_counter() - start) / len(singles) * 1e6
+        start = time.perf_counter()
+        for row in singles[:200]:
+            _brute_force(scaled, peer_index.transform(row), args.k)
+        scan_us = (time.perf_counter() - start) / 200 * 1e6
+
+        start = time.perf_counter()
+        dist, _ = peer_index.query(queries, args.k)
+        batch_seconds = time.perf_counter() - start
+
+        check = queries[:500]
+        exact = np.vstack([_brute_force(scaled, peer_index.transform(row), args.k) for row in check])
+        single = np.vstack([peer_index.query(row, args.k)[0] for row in check])
+        matches = np.allclose(dist[:500], exact) and np.allclose(single, exact)
+        print(f"{name}: single query {single_us:.0f} µs (linear scan {scan_us:.0f} µs), "
+              f"batch of {args.queries:,} in {batch_seconds:.2f} s ({args.queries / batch_seconds:,.0f} queries/s), "
+              f"matches brute force: {matches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# loanease/scoring.py
+# Vectorized versions of the Eligibility Check and Financial Risk Calculator rules.
+#
+# The Streamlit pages call these with scalars for a single applicant; the batch
+# scorer calls them with whole columns of a chunk at once.
+import numpy as np
+
+from .amortization import calculate_emi
+from .metrics import increment, timed
+
+# Eligibility thresholds (same limits shown on the Eligibility page)
+MAX_DTI = 40.0
+MIN_CREDIT_SCORE = 650
+
+# Risk score band cut-offs (0 = Low Risk, 100 = High Risk)
+RISK_BANDS = np.array([25, 50, 75])
+RISK_BAND_LABELS = np.array(['LOW', 'MODERATE', 'ELEVATED', 'HIGH'])
+
+ELIGIBILITY_LABELS = np.array(['Not Eligible', 'Conditional Approval', 'Eligible'])
+
+
+def _to_bool(values):
+    # Accept 'Yes'/'No' radio values as well as booleans and 0/1 flags
+    values = np.asarray(values)
+    if values.dtype.kind in 'biuf':
+        return values.astype(bool)
+    return np.isin(np.char.lower(values.astype(str)), ['yes', 'y', 'true', '1'])
+
+
+# Function to run the eligibility rules (EMI, DTI <= 40%, credit score >= 650)
+@timed("eligibility_check")
+def eligibility_check(loan_amount, interest_rate, tenure, income, credit_score, other_emis=0):
+    """Returns EMI, DTI (%) and the eligibility flags; broadcasts over arrays."""
+    emi = np.asarray(calculate_emi(loan_amount, interest_rate, tenure), dtype=np.float64)
+    income = np.asarray(income, dtype=np.float64)
+    total_emi = emi + other_emis
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dti_ratio = np.where(income > 0, total_emi / income * 100, np.inf)
+
+    is_dti_ok = dti_ratio <= MAX_DTI
+    is_credit_ok = np.asarray(credit_score) >= MIN_CREDIT_SCORE
+    # 2 = Eligible, 1 = Conditional Approval (DTI fine, credit low), 0 = Not Eligible
+    status = np.where(is_dti_ok, np.where(is_credit_ok, 2, 1), 0)
+    increment("eligibility_applicants", status.size)
+
+    return {
+        'emi': emi,
+        'dti_ratio': dti_ratio,
+        'is_dti_ok': is_dti_ok,
+        'is_credit_ok': is_credit_ok,
+        'eligibility': ELIGIBILITY_LABELS[status],
+    }
+
+
+# Function to compute the Financial Risk Calculator score
+@timed("risk_score")
+def risk_score(annual_income, existing_debt, credit_score, fixed_expenses, collateral):
+    """Returns DTI, ETI (as fractions) and the clipped 0-100 risk score; broadcasts over arrays."""
+    # Convert annual to monthly for calculations
+    monthly_income = np.asarray(annual_income, dtype=np.float64) / 12
+    existing_debt = np.asarray(existing_debt, dtype=np.float64)
+    fixed_expenses = np.asarray(fixed_expenses, dtype=np.float64)
+    has_income = monthly_income > 0
+    safe_income = np.where(has_income, monthly_income, 1.0)
+
+    # 1. Debt-to-Income Ratio (DTI)
+    dti = np.where(has_income, existing_debt / safe_income, 100)
+    # 2. Expense-to-Income Ratio (ETI) - Ratio of all mandatory payments (debt + expenses)
+    eti = np.where(has_income, (existing_debt + fixed_expenses) / safe_income, 100)
+
+    base_risk = (dti * 50) + (eti * 20)
+    credit_modifier = ((np.asarray(credit_score, dtype=np.float64) - 600) / 300) * 30
+    collateral_reduction = np.where(_to_bool(collateral), 20, 0)
+
+    adjusted_risk = base_risk - credit_modifier - collateral_reduction
+    final_risk_score = np.clip(adjusted_risk, 0, 100)
+    increment("risk_applicants", final_risk_score.size)
+
+    return {
+        'dti': dti,
+        'eti': eti,
+        'risk_score': final_risk_score,
+        'risk_band': RISK_BAND_LABELS[np.searchsorted(RISK_BANDS, final_risk_score, side='right')],
+    }
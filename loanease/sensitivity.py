@@ -0,0 +1,50 @@
+# loanease/sensitivity.py
+# EMI and DTI over the full interest rate x tenure grid of the Eligibility page.
+#
+# EMI is linear in the principal, so the grid is computed once for a principal
+# of ₹1 (one broadcast calculate_emi call) and cached; any loan amount or income
+# is then a rescale of that unit surface rather than a fresh computation.
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from .amortization import calculate_emi
+from .metrics import timed
+
+# Slider domains on the Eligibility page: 1.0-20.0% in 0.1 steps, 1-30 years
+RATE_GRID = np.round(np.arange(10, 201) / 10, 1)
+TENURE_GRID = np.arange(1, 31)
+
+Surface = namedtuple('Surface', ['rates', 'tenures', 'emi', 'dti', 'seconds'])
+
+_unit_surfaces = {}
+_lock = threading.Lock()
+
+
+# Function to get the EMI of a ₹1 loan at every (rate, tenure) grid point
+def unit_emi_surface(rates=RATE_GRID, tenures=TENURE_GRID):
+    """Returns a (len(rates), len(tenures)) array; computed once per grid."""
+    rates = np.asarray(rates, dtype=np.float64)
+    tenures = np.asarray(tenures)
+    key = (rates.tobytes(), tenures.tobytes())
+    surface = _unit_surfaces.get(key)
+    if surface is None:
+        with _lock:
+            surface = _unit_surfaces.get(key)
+            if surface is None:
+                surface = calculate_emi(1.0, rates[:, None], tenures[None, :])
+                surface.setflags(write=False)
+                _unit_surfaces[key] = surface
+    return surface
+
+
+# Function to build the EMI and DTI surfaces for one applicant
+@timed("sensitivity_surface")
+def sensitivity_surface(loan_amount, income, other_emis=0, rates=RATE_GRID, tenures=TENURE_GRID):
+    """EMI (₹) and DTI (%) at every (rate, tenure) point, rescaled from the cached unit surface."""
+    start = time.perf_counter()
+    emi = loan_amount * unit_emi_surface(rates, tenures)
+    dti = (emi + other_emis) / income * 100 if income > 0 else np.full_like(emi, np.inf)
+    return Surface(np.asarray(rates), np.asarray(tenures), emi, dti, time.perf_counter() - start)
@@ -0,0 +1,230 @@
+# loanease/solvers.py
+# Inverse eligibility solvers: the limits at which an applicant still passes the DTI rule.
+#
+# Instead of moving a slider until DTI drops under MAX_DTI, these solve for the
+# boundary directly, for arrays of applicants at once:
+#   - max_affordable_loan: EMI is linear in the principal, so the largest loan is
+#     the EMI budget divided by the EMI of a ₹1 loan (closed form);
+#   - min_tenure: the EMI formula solved for n, n = -log(1 - P*r/EMI) / log(1 + r)
+#     (closed form);
+#   - max_interest_rate: no closed form in r, so a bracketed Newton iteration
+#     runs on all applicants together.
+# Every result is rounded towards the safe side and re-checked
+# with calculate_emi, so it always passes eligibility_check's DTI rule.
+#
+# Usage:
+#   python -m loanease.solvers --applicants 1000000
+import argparse
+import time
+
+import numpy as np
+
+from .amortization import calculate_emi
+from .metrics import timed
+from .scoring import MAX_DTI
+
+# Newton iterations for the rate solver; the bracket guarantees progress, this is a backstop
+MAX_ITERATIONS = 50
+# An applicant's rate has converged once a step moves it by less than this (relative)
+RATE_TOLERANCE = 1e-12
+
+
+# Function to get the largest EMI an applicant can carry under the DTI cap
+def emi_budget(income, other_emis=0, max_dti=MAX_DTI):
+    budget = np.asarray(income, dtype=np.float64) * max_dti / 100 - np.asarray(other_emis, dtype=np.float64)
+    return np.maximum(budget, 0.0)
+
+
+def _fits(loan_amount, annual_rate, tenure_years, budget):
+    # The same EMI the Eligibility page computes, compared against the budget
+    return np.asarray(calculate_emi(loan_amount, annual_rate, tenure_years)) <= budget
+
+
+# Function to solve for the largest principal under the DTI cap (closed form)
+@timed("max_affordable_loan")
+def max_affordable_loan(income, annual_rate, tenure_years, other_emis=0, max_dti=MAX_DTI, step=1):
+    """Largest loan (a multiple of `step` ₹) whose EMI keeps DTI within `max_dti`; broadcasts over arrays."""
+    budget = emi_budget(income, other_emis, max_dti)
+    unit_emi = np.asarray(calculate_emi(1.0, annual_rate, tenure_years), dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        principal = np.where(unit_emi > 0, budget / unit_emi, 0.0)
+    principal = np.floor(principal / step) * step
+    # Floating-point rounding can leave the boundary loan a hair over budget
+    principal = np.where(_fits(principal, annual_rate, tenure_years, budget), principal,
+                         np.maximum(principal - step, 0.0))
+    return principal
+
+
+# Function to solve for the shortest tenure under the DTI cap (closed form)
+@timed("min_tenure")
+def min_tenure(loan_amount, annual_rate, income, other_emis=0, max_dti=MAX_DTI):
+    """Fewest whole years of repayment that keep DTI within `max_dti`.
+
+    np.inf where no tenure works, i.e. the EMI budget does not even cover the
+    first month's interest.
+    """
+    P = np.asarray(loan_amount, dtype=np.float64)
+    r = np.asarray(annual_rate, dtype=np.float64) / (12 * 100)
+    budget = emi_budget(income, other_emis, max_dti)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Months needed to repay P with an instalment equal to the whole budget
+        amortizing = -np.log1p(-P * r / budget) / np.log1p(r)
+        months = np.where(r == 0, P / budget, amortizing)
+    feasible = (budget > P * r) & (budget > 0)
+    months = np.where(feasible & np.isfinite(months), months, np.inf)
+
+    years = np.maximum(np.ceil(months / 12), 1.0)
+    finite = np.isfinite(years)
+    safe_years = np.where(finite, years, 1.0)
+    # A boundary that lands exactly on a whole year can round either way; move up a year if it misses
+    years = np.where(finite & ~_fits(P, annual_rate, safe_years, budget), years + 1, years)
+    return years
+
+
+def _unit_emi_and_slope(r, n):
+    # EMI of a ₹1 loan, r / (1 - (1 + r)^-n), and its derivative in r; expm1/log1p keep small r accurate
+    log_growth = n * np.log1p(r)
+    denom = -np.expm1(-log_growth)
+    unit_emi = r / denom
+    slope = (denom - r * n * np.exp(-log_growth) / (1 + r)) / denom ** 2
+    return unit_emi, slope
+
+
+# Function to solve for the highest interest rate under the DTI cap (vectorized Newton)
+@timed("max_interest_rate")
+def max_interest_rate(loan_amount, tenure_years, income, other_emis=0, max_dti=MAX_DTI, precision=0.01):
+    """Highest annual rate (%, a multiple of `precision`) that keeps DTI within `max_dti`.
+
+    np.nan where even a 0% loan is over budget.
+    """
+    P, n, budget = np.broadcast_arrays(
+        np.asarray(loan_amount, dtype=np.float64),
+        np.asarray(tenure_years, dtype=np.float64) * 12,
+        emi_budget(income, other_emis, max_dti),
+    )
+    shape = P.shape
+    P, n, budget = P.ravel(), n.ravel(), budget.ravel()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        target = np.where(P > 0, budget / P, np.inf)   # EMI budget per ₹1 borrowed
+        feasible = (n > 0) & (target >= 1 / n)
+
+    solve = np.flatnonzero(feasible & np.isfinite(target))
+    # The unit EMI exceeds r at every rate, so the root lies in (0, target]
+    rates = target[solve].copy()
+    low = np.zeros_like(rates)
+    high = rates.copy()
+    # Only applicants still moving are iterated on
+    active = np.arange(len(rates))
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for _ in range(MAX_ITERATIONS):
+            if not len(active):
+                break
+            r = rates[active]
+            goal = target[solve[active]]
+            unit_emi, slope = _unit_emi_and_slope(r, n[solve[active]])
+            over = unit_emi > goal
+            high[active] = np.where(over, r, high[active])
+            low[active] = np.where(over, low[active], r)
+            proposal = r - (unit_emi - goal) / slope
+            # Bisect wherever Newton would leave the bracket
+            inside = (proposal > low[active]) & (proposal < high[active]) & np.isfinite(proposal)
+            proposal = np.where(inside, proposal, (low[active] + high[active]) / 2)
+            rates[active] = proposal
+            active = active[np.abs(proposal - r) > RATE_TOLERANCE * np.maximum(r, 1e-3)]
+
+    annual = np.full(P.shape, np.nan)
+    # The small offset keeps values like 220.00 / 0.01 = 21999.999... from flooring a step low
+    annual[solve] = np.round(np.floor(rates * 12 * 100 / precision + 1e-6) * precision, 10)
+    # Loans the budget covers at any rate (P = 0) have no ceiling
+    annual[feasible & ~np.isfinite(target)] = np.inf
+
+    check = np.isfinite(annual)
+    fits = _fits(P[check], annual[check], n[check] / 12, budget[check])
+    stepped = np.flatnonzero(check)[~fits]
+    annual[stepped] = np.round(np.maximum(annual[stepped] - precision, 0.0), 10)
+    return annual.reshape(shape)
+
+
+# Function to compute all three limits for a batch of applicants
+def preapproved_limits(loan_amount, interest_rate, tenure, income, other_emis=0, max_dti=MAX_DTI):
+    """The largest loan at the applicant's rate and tenure, the shortest tenure for their
+    loan at their rate, and the highest rate for their loan and tenure."""
+    return {
+        'emi_budget': emi_budget(income, other_emis, max_dti),
+        'max_loan_amount': max_affordable_loan(income, interest_rate, tenure, other_emis, max_dti),
+        'min_tenure': min_tenure(loan_amount, interest_rate, income, other_emis, max_dti),
+        'max_interest_rate': max_interest_rate(loan_amount, tenure, income, other_emis, max_dti),
+    }
+
+
+def _slider_search_tenure(loan_amount, annual_rate, income, budget, max_years=30):
+    # What a user does by hand: try every tenure on the slider until DTI fits
+    years = np.full(len(loan_amount), np.inf)
+    for tenure in range(max_years, 0, -1):
+        years = np.where(_fits(loan_amount, annual_rate, tenure, budget), tenure, years)
+    return years
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve pre-approved limits for a synthetic customer base.")
+    parser.add_argument("--applicants", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    n = args.applicants
+    loan_amount = rng.integers(20, 800, n) * 5000.0
+    interest_rate = rng.integers(10, 201, n) / 10
+    tenure = rng.integers(1, 31, n)
+    income = rng.integers(20, 201, n) * 1000.0
+    budget = emi_budget(income)
+
+    print(f"{n:,} applicants")
+    start = time.perf_counter()
+    limits = preapproved_limits(loan_amount, interest_rate, tenure, income)
+    seconds = time.perf_counter() - start
+    print(f"all limits: {seconds:.2f} s ({n / seconds:,.0f} applicants/s)")
+
+    for name, func, inputs in [
+        ('max_loan_amount', max_affordable_loan, (income, interest_rate, tenure)),
+        ('min_tenure', min_tenure, (loan_amount, interest_rate, income)),
+        ('max_interest_rate', max_interest_rate, (loan_amount, tenure, income)),
+    ]:
+        start = time.perf_counter()
+        func(*inputs)
+        print(f"  {name:<18} {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+    # Every limit must pass the DTI rule, and one step past it must fail
+    max_loan = limits['max_loan_amount']
+    loan_ok = _fits(max_loan, interest_rate, tenure, budget).all()
+    loan_tight = (~_fits(max_loan + 1, interest_rate, tenure, budget)).mean()
+
+    years = limits['min_tenure']
+    reachable = np.isfinite(years)
+    tenure_ok = _fits(loan_amount[reachable], interest_rate[reachable], years[reachable], budget[reachable]).all()
+    shorter = reachable & (years > 1)
+    tenure_tight = (~_fits(loan_amount[shorter], interest_rate[shorter], years[shorter] - 1, budget[shorter])).mean()
+
+    rate = limits['max_interest_rate']
+    has_rate = np.isfinite(rate)
+    rate_ok = _fits(loan_amount[has_rate], rate[has_rate], tenure[has_rate], budget[has_rate]).all()
+    rate_tight = (~_fits(loan_amount[has_rate], rate[has_rate] + 0.01, tenure[has_rate], budget[has_rate])).mean()
+
+    print(f"max loan:  all within DTI {loan_ok}, +₹1 over the cap {loan_tight:.2%}")
+    print(f"min tenure: all within DTI {tenure_ok}, one year less over the cap {tenure_tight:.2%} "
+          f"({(~reachable).mean():.1%} unreachable)")
+    print(f"max rate:  all within DTI {rate_ok}, +0.01% over the cap {rate_tight:.2%} "
+          f"({(~has_rate).mean():.1%} over budget even at 0%)")
+
+    sample = slice(0, min(n, 100_000))
+    start = time.perf_counter()
+    searched = _slider_search_tenure(loan_amount[sample], interest_rate[sample], income[sample], budget[sample])
+    search_seconds = time.perf_counter() - start
+    solved = np.where(years[sample] <= 30, years[sample], np.inf)
+    print(f"slider search over 1-30 years ({len(searched):,} applicants): {search_seconds * 1000:.1f} ms, "
+          f"agrees with min_tenure on {(searched == solved).mean():.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+# loanease/speculate.py
+# Opt-in speculative precompute of the slider settings a user is likely to try next.
+#
+# After a form submit, users usually nudge one slider by one step and submit
+# again. With speculation on (LOANEASE_SPECULATE=1, set by the operator) each
+# submit queues the page's memoized computations for every one-step
+# neighbour of the submitted values, and a small pool of background threads
+# runs them into caching.SPECULATIVE_CACHE. When the nudged submit arrives,
+# memoize finds its result there instead of computing it.
+#
+# Speculation is kept cheap to get wrong:
+#   - the work queue is bounded; work that does not fit is dropped, not queued;
+#   - a session's queued work is cancelled when it submits again or navigates
+#     away (go_to), so workers skip it instead of running it; per-session
+#     bookkeeping is dropped once a session has nothing queued, so it stays
+#     bounded by the queue however many sessions come and go;
+#   - results live in SPECULATIVE_CACHE, which has its own memory cap
+#     (LOANEASE_SPECULATE_MB) and TTL and never evicts anything from RESULT_CACHE;
+#   - workers only start a task while no rerun is rendering (begin_render /
+#     end_render), so speculation runs in the gaps between reruns instead of
+#     competing with them for the GIL.
+# stats() reports how often speculation hits and the CPU time it costs.
+#
+# Usage (in app.py):
+#   speculate.speculate(session_id, values, {'tenure': (1, 30, 1), ...},
+#                       [(build_emi_results, lambda v: (v['loan_amount'], v['interest_rate'], v['tenure']))])
+#   speculate.cancel(session_id)
+import os
+import queue
+import threading
+import time
+from collections import Counter
+
+from .caching import SPECULATIVE_CACHE
+from .metrics import register_gauges
+
+# Background threads running speculative work
+WORKERS = 2
+# Queued tasks across all sessions; more than this and new work is dropped
+MAX_QUEUE = 64
+# A rerun that has not called end_render after this long (it raised) no longer holds workers back
+RENDER_TIMEOUT = 5.0
+
+_enabled = os.environ.get("LOANEASE_SPECULATE", "") not in ("", "0")
+# Memory cap of the speculative results, in MB (LOANEASE_SPECULATE_MB overrides the 64 MB default)
+if os.environ.get("LOANEASE_SPECULATE_MB"):
+    SPECULATIVE_CACHE.max_bytes = int(float(os.environ["LOANEASE_SPECULATE_MB"]) * 2**20)
+_speculator = None
+_speculator_lock = threading.Lock()
+_renders = {}   # token (a session's id) -> start time of its rerun in progress
+_renders_changed = threading.Condition()
+_clock = time.monotonic
+
+
+def is_enabled():
+    return _enabled
+
+
+def enable(flag=True):
+    global _enabled
+    _enabled = bool(flag)
+
+
+def begin_render(owner=None):
+    """Marks a rerun of `owner`'s session as started; returns the token for end_render.
+
+    A rerun cut short (st.stop, an exception, a click that restarts the script)
+    never reaches end_render; keyed by session, its entry is replaced by the
+    session's next rerun instead of holding workers back until RENDER_TIMEOUT.
+    """
+    token = object() if owner is None else owner
+    with _renders_changed:
+        _renders[token] = _clock()
+    return token
+
+
+def end_render(token):
+    with _renders_changed:
+        _renders.pop(token, None)
+        _renders_changed.notify_all()
+
+
+def _wait_until_idle():
+    with _renders_changed:
+        while True:
+            now = _clock()
+            busy = [start for start in _renders.values() if now - start < RENDER_TIMEOUT]
+            if not busy:
+                return
+            _renders_changed.wait(timeout=RENDER_TIMEOUT - (now - max(busy)))
+
+
+def _step_decimals(step):
+    text = repr(float(step))
+    return len(text.split(".")[1].rstrip("0")) if "." in text else 0
+
+
+# Function to list the one-step neighbours of a set of slider values
+def neighbours(values, sliders):
+    """Copies of `values` with one slider moved up or down by one step.
+
+    `sliders` maps names in `values` to (min, max, step). Float steps are
+    rounded to the step's decimals so the values match what the slider returns.
+    """
+    for name, (low, high, step) in sliders.items():
+        for direction in (1, -1):
+            value = values[name] + direction * step
+            if isinstance(step, float):
+                value = round(value, _step_decimals(step))
+            if low <= value <= high:
+                yield dict(values, **{name: value})
+
+
+class Speculator:
+    """Bounded queue of memoized calls run ahead of time on background threads."""
+
+    def __init__(self, workers=WORKERS, max_queue=MAX_QUEUE, cache=SPECULATIVE_CACHE):
+        self.cache = cache
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._generation = {}   # owner -> bumped on cancel; only owners with queued work
+        self._queued = Counter()   # owner -> tasks still in the queue
+        self._pending = {}   # cache key -> (owner, generation) of the task queued for it
+        self._lock = threading.Lock()
+        self.counts = dict.fromkeys(['submitted', 'skipped', 'dropped', 'cancelled', 'completed', 'failed'], 0)
+        self.cpu_seconds = 0.0
+        self.wall_seconds = 0.0
+        self._threads = [threading.Thread(target=self._work, name=f"speculate-{i}", daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, owner, func, *args):
+        """Queues `func(*args)` (a memoize wrapper); False if skipped or dropped."""
+        key = func.cache_key(*args)
+        with self._lock:
+            if self._is_live(self._pending.get(key)) or key in self.cache or key in func.cache:
+                self.counts['skipped'] += 1
+                return False
+            task = (owner, self._generation.get(owner, 0))
+            try:
+                self._queue.put_nowait(task + (func, args, key))
+            except queue.Full:
+                self.counts['dropped'] += 1
+                return False
+            self._pending[key] = task
+            self._queued[owner] += 1
+            self.counts['submitted'] += 1
+        return True
+
+    def _is_live(self, task):
+        return task is not None and task[1] == self._generation.get(task[0], 0)
+
+    def _done(self, key, task):
+        # A cancelled task's key may have been queued again since; leave that entry alone
+        if self._pending.get(key) == task:
+            del self._pending[key]
+        owner = task[0]
+        self._queued[owner] -= 1
+        if self._queued[owner] <= 0:
+            # Nothing of this owner's left to cancel: forget it (generations restart at 0)
+            del self._queued[owner]
+            self._generation.pop(owner, None)
+
+    def cancel(self, owner):
+        """Drops every task `owner` has queued (a task already running finishes)."""
+        with self._lock:
+            if owner in self._queued:
+                self._generation[owner] = self._generation.get(owner, 0) + 1
+
+    def _work(self):
+        while True:
+            self._run_next()
+
+    def _run_next(self):
+        # Takes one task off the queue (waiting for one) and runs it unless it was cancelled
+        owner, generation, func, args, key = self._queue.get()
+        task = (owner, generation)
+        with self._lock:
+            stale = not self._is_live(task)
+            if stale:
+                self._done(key, task)
+                self.counts['cancelled'] += 1
+        if stale:
+            return
+        _wait_until_idle()
+        cpu_start, wall_start = time.thread_time(), time.perf_counter()
+        try:
+            value = func.uncached(*args)
+            self.cache.put(key, value)
+            outcome = 'completed'
+        except Exception:  # speculation must never surface errors; the real submit will
+            outcome = 'failed'
+        with self._lock:
+            self._done(key, task)
+            self.counts[outcome] += 1
+            self.cpu_seconds += time.thread_time() - cpu_start
+            self.wall_seconds += time.perf_counter() - wall_start
+
+    def stats(self):
+        cache = self.cache.stats()
+        with self._lock:
+            counts = dict(self.counts)
+            cpu_seconds, wall_seconds = self.cpu_seconds, self.wall_seconds
+        hits = cache['hits']
+        return dict(
+            counts,
+            queued=self._queue.qsize(),
+            hits=hits,
+            # Share of finished speculative results a later submit actually used
+            hit_rate=hits / counts['completed'] if counts['completed'] else 0.0,
+            cpu_seconds=cpu_seconds,
+            wall_seconds=wall_seconds,
+            cpu_ms_per_hit=cpu_seconds * 1000 / hits if hits else 0.0,
+            cache_entries=cache['entries'],
+            cache_bytes=cache['bytes'],
+            cache_evictions=cache['evictions'],
+        )
+
+
+# Function to get the process-wide speculator (workers start on first use)
+def get_speculator():
+    global _speculator
+    if _speculator is None:
+        with _speculator_lock:
+            if _speculator is None:
+                _speculator = Speculator()
+                register_gauges("speculation", _speculator.stats)
+    return _speculator
+
+
+# Function to queue a page's computations for every one-step neighbour of its inputs
+def speculate(owner, values, sliders, tasks):
+    """`tasks` is a list of (memoized func, values -> args); returns the number queued.
+
+    Whatever `owner` had queued before is cancelled: it was speculation around
+    the previous submit.
+    """
+    speculator = get_speculator()
+    speculator.cancel(owner)
+    queued = 0
+    for candidate in neighbours(values, sliders):
+        for func, make_args in tasks:
+            queued += speculator.submit(owner, func, *make_args(candidate))
+    return queued
+
+
+def cancel(owner):
+    if _speculator is not None:
+        _speculator.cancel(owner)
+
+
+def stats():
+    return get_speculator().stats() if _speculator is not None else {}
+
+
+def clear():
+    """Empties the speculative cache (queued work is left to run)."""
+    SPECULATIVE_CACHE.clear()
+
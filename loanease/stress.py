@@ -0,0 +1,219 @@
+# loanease/stress.py
+# Monte Carlo stress test for the Financial Risk Calculator score.
+#
+# Scenarios (interest-rate moves, income drops, expense inflation) are drawn as
+# NumPy arrays and applied to a whole portfolio at once: each chunk of borrowers
+# is evaluated against every scenario as a (borrowers x scenarios) matrix using
+# the same risk_score formula as the app. Chunks can be spread over a process pool.
+#
+# Usage:
+#   python -m loanease.stress --borrowers 200000 --scenarios 1000 --workers 4
+#   python -m loanease.stress --input portfolio.parquet --scenarios 2000
+import argparse
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .amortization import calculate_emi
+from .metrics import timed
+from .scoring import RISK_BANDS, risk_score
+
+HIGH_RISK_THRESHOLD = float(RISK_BANDS[-1])
+
+# Existing debt is repriced as if it were an amortizing loan with these terms,
+# unless the portfolio supplies its own debt_rate / debt_tenure columns
+DEFAULT_DEBT_RATE = 10.0
+DEFAULT_DEBT_TENURE = 15
+
+# Cells (borrowers x scenarios) evaluated per chunk; bounds peak memory
+DEFAULT_CHUNK_CELLS = 2_000_000
+
+# Risk scores are 0-100; a fixed 0.01-wide histogram gives streaming percentiles
+_HIST_EDGES = np.linspace(0, 100, 10_001)
+
+# Shock distribution parameters
+ShockModel = namedtuple('ShockModel', [
+    'rate_shift_mean', 'rate_shift_sd',          # annual rate move, percentage points
+    'income_drop_prob', 'income_drop_mean',      # chance and average size of an income drop
+    'expense_inflation_mean', 'expense_inflation_sd',
+])
+DEFAULT_SHOCKS = ShockModel(
+    rate_shift_mean=0.5, rate_shift_sd=1.5,
+    income_drop_prob=0.15, income_drop_mean=0.20,
+    expense_inflation_mean=0.06, expense_inflation_sd=0.04,
+)
+
+Scenarios = namedtuple('Scenarios', ['rate_shift', 'income_factor', 'expense_factor'])
+
+StressResult = namedtuple('StressResult', [
+    'percentiles',              # {p: risk score} over all borrower-scenarios
+    'borrower_high_risk_prob',  # per borrower, share of scenarios with score >= 75
+    'high_risk_share',          # per scenario, share of borrowers with score >= 75
+    'baseline_high_risk_share', # share of borrowers >= 75 without shocks
+    'cells',
+    'seconds',
+])
+
+
+# Function to draw stress scenarios
+def draw_scenarios(n_scenarios, shocks=DEFAULT_SHOCKS, seed=None):
+    rng = np.random.default_rng(seed)
+    rate_shift = rng.normal(shocks.rate_shift_mean, shocks.rate_shift_sd, n_scenarios)
+    # Income falls in a minority of scenarios, by an exponentially distributed fraction (capped at 90%)
+    drops = np.minimum(rng.exponential(shocks.income_drop_mean, n_scenarios), 0.9)
+    income_factor = np.where(rng.random(n_scenarios) < shocks.income_drop_prob, 1 - drops, 1.0)
+    expense_factor = np.maximum(
+        1 + rng.normal(shocks.expense_inflation_mean, shocks.expense_inflation_sd, n_scenarios), 0
+    )
+    return Scenarios(rate_shift, income_factor, expense_factor)
+
+
+def _stress_chunk(portfolio, scenarios):
+    """Scores one chunk of borrowers against every scenario; returns partial aggregates."""
+    annual_income = portfolio['annual_income'][:, None]
+    existing_debt = portfolio['existing_debt'][:, None]
+    debt_rate = portfolio['debt_rate'][:, None]
+    debt_tenure = portfolio['debt_tenure'][:, None]
+
+    # Reprice existing EMIs for each rate move (floored at 0% annual rate)
+    base_emi = calculate_emi(1.0, debt_rate, debt_tenure)
+    shocked_emi = calculate_emi(1.0, np.maximum(debt_rate + scenarios.rate_shift[None, :], 0), debt_tenure)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        emi_factor = np.where(base_emi > 0, shocked_emi / base_emi, 1.0)
+
+    scores = risk_score(
+        annual_income * scenarios.income_factor[None, :],
+        existing_debt * emi_factor,
+        portfolio['credit_score'][:, None],
+        portfolio['fixed_expenses'][:, None] * scenarios.expense_factor[None, :],
+        portfolio['collateral'][:, None],
+    )['risk_score']
+
+    high = scores >= HIGH_RISK_THRESHOLD
+    return (
+        # Same bins as np.histogram(scores, _HIST_EDGES), without its per-call sorting
+        np.bincount(np.minimum((scores * 100).astype(np.int64), len(_HIST_EDGES) - 2).ravel(),
+                    minlength=len(_HIST_EDGES) - 1),
+        high.mean(axis=1),
+        high.sum(axis=0),
+    )
+
+
+def _normalize_portfolio(portfolio):
+    n = len(np.asarray(portfolio['annual_income']))
+    out = {
+        'annual_income': np.asarray(portfolio['annual_income'], dtype=np.float64),
+        'existing_debt': np.asarray(portfolio['existing_debt'], dtype=np.float64),
+        'credit_score': np.asarray(portfolio['credit_score'], dtype=np.float64),
+        'fixed_expenses': np.asarray(portfolio['fixed_expenses'], dtype=np.float64),
+        'collateral': np.asarray(portfolio['collateral']),
+    }
+    for key, default in (('debt_rate', DEFAULT_DEBT_RATE), ('debt_tenure', DEFAULT_DEBT_TENURE)):
+        value = portfolio.get(key) if hasattr(portfolio, 'get') else None
+        out[key] = np.broadcast_to(np.asarray(default if value is None else value, dtype=np.float64), (n,))
+    if out['collateral'].dtype.kind not in 'biuf':
+        out['collateral'] = np.isin(np.char.lower(out['collateral'].astype(str)), ['yes', 'y', 'true', '1'])
+    return out
+
+
+def _slice(portfolio, start, stop):
+    return {key: value[start:stop] for key, value in portfolio.items()}
+
+
+def _percentiles_from_hist(counts, qs):
+    cdf = np.cumsum(counts) / counts.sum()
+    idx = np.searchsorted(cdf, np.asarray(qs) / 100, side='left')
+    return {q: float(_HIST_EDGES[min(i + 1, len(_HIST_EDGES) - 1)]) for q, i in zip(qs, idx)}
+
+
+# Function to run the Monte Carlo stress test over a portfolio
+@timed("stress_test")
+def stress_test(portfolio, scenarios, chunk_cells=DEFAULT_CHUNK_CELLS, workers=None,
+                percentiles=(5, 50, 95, 99)):
+    """Evaluates every borrower under every scenario and aggregates the risk scores.
+
+    `portfolio` maps the Financial Risk Calculator inputs (annual_income,
+    existing_debt, credit_score, fixed_expenses, collateral; optionally
+    debt_rate and debt_tenure) to arrays. With `workers` > 1 the chunks are
+    scored on a process pool.
+    """
+    start = time.perf_counter()
+    portfolio = _normalize_portfolio(portfolio)
+    n_borrowers = len(portfolio['annual_income'])
+    n_scenarios = len(scenarios.rate_shift)
+    rows_per_chunk = max(1, chunk_cells // max(n_scenarios, 1))
+    bounds = [(i, min(i + rows_per_chunk, n_borrowers)) for i in range(0, n_borrowers, rows_per_chunk)]
+    chunks = [_slice(portfolio, a, b) for a, b in bounds]
+
+    if workers and workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partials = list(pool.map(_stress_chunk, chunks, [scenarios] * len(chunks)))
+    else:
+        partials = [_stress_chunk(chunk, scenarios) for chunk in chunks]
+
+    counts = np.sum([p[0] for p in partials], axis=0)
+    borrower_prob = np.concatenate([p[1] for p in partials]) if partials else np.empty(0)
+    high_counts = np.sum([p[2] for p in partials], axis=0)
+
+    baseline = risk_score(portfolio['annual_income'], portfolio['existing_debt'], portfolio['credit_score'],
+                          portfolio['fixed_expenses'], portfolio['collateral'])['risk_score']
+
+    return StressResult(
+        percentiles=_percentiles_from_hist(counts, percentiles),
+        borrower_high_risk_prob=borrower_prob,
+        high_risk_share=high_counts / max(n_borrowers, 1),
+        baseline_high_risk_share=float(np.mean(baseline >= HIGH_RISK_THRESHOLD)) if n_borrowers else 0.0,
+        cells=n_borrowers * n_scenarios,
+        seconds=time.perf_counter() - start,
+    )
+
+
+def synthetic_portfolio(n, seed=0):
+    """Random borrowers spanning the Financial Risk Calculator's slider ranges."""
+    rng = np.random.default_rng(seed)
+    return {
+        'annual_income': rng.integers(24, 2400, n) * 10000.0,
+        'existing_debt': rng.integers(0, 40, n) * 5000.0,
+        'credit_score': rng.integers(300, 901, n).astype(np.float64),
+        'fixed_expenses': rng.integers(0, 100, n) * 1000.0,
+        'collateral': rng.random(n) < 0.4,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo stress test of portfolio risk scores.")
+    parser.add_argument("--input", help="CSV/Parquet with annual_income, existing_debt, credit_score, "
+                                        "fixed_expenses, collateral (default: synthetic portfolio)")
+    parser.add_argument("--borrowers", type=int, default=100_000, help="size of the synthetic portfolio")
+    parser.add_argument("--scenarios", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=1, help="processes (default: 1)")
+    parser.add_argument("--chunk-cells", type=int, default=DEFAULT_CHUNK_CELLS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.input:
+        import pandas as pd
+
+        df = pd.read_parquet(args.input) if args.input.endswith(('.parquet', '.pq')) else pd.read_csv(args.input)
+        portfolio = {col: df[col].to_numpy() for col in df.columns}
+    else:
+        portfolio = synthetic_portfolio(args.borrowers, args.seed)
+
+    scenarios = draw_scenarios(args.scenarios, seed=args.seed)
+    result = stress_test(portfolio, scenarios, args.chunk_cells, args.workers)
+
+    print(f"{len(result.borrower_high_risk_prob):,} borrowers x {args.scenarios:,} scenarios "
+          f"= {result.cells:,} cells in {result.seconds:.2f}s "
+          f"({result.seconds / result.cells * 1e6:.3f} s per million borrower-scenarios)")
+    print("Risk score percentiles: " + ", ".join(f"p{q}={v:.1f}" for q, v in result.percentiles.items()))
+    print(f"High-risk (>= {HIGH_RISK_THRESHOLD:.0f}) share: baseline {result.baseline_high_risk_share:.1%}, "
+          f"stressed mean {result.high_risk_share.mean():.1%}, "
+          f"p95 scenario {np.percentile(result.high_risk_share, 95):.1%}")
+    print(f"Borrowers with >= 50% chance of crossing {HIGH_RISK_THRESHOLD:.0f}: "
+          f"{np.mean(result.borrower_high_risk_prob >= 0.5):.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+# loanease/tables.py
+# Paginated amortization tables with vectorized currency formatting and chunked export.
+#
+# A ScheduleTable stands for the monthly rows of one loan or a whole book of
+# loans without materializing them: any row range is computed on demand from
+# the closed-form balance (see loanease.amortization). Pages are formatted as
+# ₹ strings with NumPy array operations, and CSV/Excel exports are written one
+# chunk of rows at a time, so only a chunk is ever held as strings in memory.
+# A LedgerTable pages through an exact paise ledger (loanease.fixedpoint) instead,
+# so its rows add up to the ledger's totals to the paisa.
+#
+# Usage:
+#   python -m loanease.tables --loans 5000 --out book_schedule.csv     # export timing and memory
+import argparse
+import time
+
+import numpy as np
+
+from .amortization import calculate_emi
+from .fixedpoint import to_rupees
+
+TABLE_COLUMNS = ['Loan', 'Month', 'Year', 'EMI', 'Principal Component', 'Interest Component', 'Remaining Balance']
+CURRENCY_COLUMNS = ['EMI', 'Principal Component', 'Interest Component', 'Remaining Balance']
+DEFAULT_PAGE_SIZE = 60
+EXPORT_CHUNK_ROWS = 50_000
+
+
+_POW10 = 10 ** np.arange(19, dtype=np.int64)
+_COMMA, _MINUS, _ZERO = ord(','), ord('-'), ord('0')
+
+
+def _digit_counts(ints):
+    counts = np.ones(len(ints), dtype=np.int64)
+    positive = ints > 0
+    counts[positive] = np.floor(np.log10(ints[positive])).astype(np.int64) + 1
+    # log10 can land one off near powers of ten
+    counts = np.clip(counts, 1, 19)
+    counts -= (counts > 1) & (ints < _POW10[counts - 1])
+    counts += (counts < 19) & (ints >= _POW10[np.minimum(counts, 18)])
+    return counts
+
+
+# Function to format amounts as ₹ strings (vectorized)
+def format_inr(values, symbol="₹"):
+    """Same output as f"₹{x:,.0f}" for every element, without a Python-level loop.
+
+    Each output string is assembled as an array of character codes (symbol,
+    sign, digits and commas) and viewed as a NumPy unicode array. NaN and
+    infinities come out as the f-string has them ("₹nan", "₹-inf").
+    """
+    values = np.asarray(values, dtype=np.float64).ravel()
+    finite = np.isfinite(values)
+    rounded = np.rint(np.where(finite, values, 0.0))
+    ints = np.abs(rounded).astype(np.int64)
+    negative = np.signbit(rounded)
+    widths = _digit_counts(ints)
+    prefix = [ord(c) for c in symbol]
+
+    max_width = int(widths.max()) if len(widths) else 1
+    # At least 4 characters after the symbol, for "-inf"
+    out = np.zeros(len(values), dtype=f'U{len(prefix) + max(1 + max_width + (max_width - 1) // 3, 4)}')
+    # One pass per (digit count, sign) group: at most 38 for int64
+    group = widths * 2 + negative
+    for key in np.unique(group).tolist():
+        width, neg = key // 2, key % 2
+        mask = group == key
+        start = len(prefix) + neg
+        n_chars = start + width + (width - 1) // 3
+        codes = np.full((int(mask.sum()), n_chars), _COMMA, dtype=np.uint32)
+        codes[:, :len(prefix)] = prefix
+        if neg:
+            codes[:, len(prefix)] = _MINUS
+        i = np.arange(width)
+        # Digit i lands after the commas that precede it
+        positions = start + i + (i + (3 - width % 3) % 3) // 3
+        codes[:, positions] = ints[mask, None] // _POW10[width - 1 - i] % 10 + _ZERO
+        out[mask] = codes.view(f'U{n_chars}').ravel()
+    for i in np.flatnonzero(~finite).tolist():
+        out[i] = f"{symbol}{values[i]:,.0f}"
+    return out
+
+
+class ScheduleTable:
+    """Monthly amortization rows for a batch of loans, computed page by page.
+
+    Rows are ordered by loan, then month. Nothing is computed until a page or
+    export chunk is requested.
+    """
+
+    def __init__(self, principal, annual_rate, tenure_years):
+        principal, annual_rate, tenure_years = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(principal, dtype=np.float64)),
+            np.atleast_1d(np.asarray(annual_rate, dtype=np.float64)),
+            np.atleast_1d(np.asarray(tenure_years)),
+        )
+        self.principal = principal.ravel()
+        self.monthly_rate = annual_rate.ravel() / (12 * 100)
+        self.emi = np.asarray(calculate_emi(self.principal, annual_rate.ravel(), tenure_years.ravel()),
+                              dtype=np.float64)
+        months = np.maximum((tenure_years.ravel() * 12).astype(np.int64), 0)
+        self.num_months = np.where(self.emi > 0, months, 0)
+        self.row_offsets = np.concatenate([[0], np.cumsum(self.num_months)])
+
+    def __len__(self):
+        return int(self.row_offsets[-1])
+
+    def n_pages(self, page_size=DEFAULT_PAGE_SIZE):
+        return max(-(-len(self) // page_size), 1)
+
+    def _locate(self, start, stop):
+        # (loan index, 1-based month) of rows [start, stop)
+        start, stop = max(start, 0), min(stop, len(self))
+        row = np.arange(start, stop)
+        loan = np.searchsorted(self.row_offsets, row, side='right') - 1
+        return loan, row - self.row_offsets[loan] + 1
+
+    def rows(self, start, stop):
+        """Numeric columns for rows [start, stop) as a dict of arrays."""
+        loan, month = self._locate(start, stop)
+
+        P = self.principal[loan]
+        r = self.monthly_rate[loan]
+        E = self.emi[loan]
+        k = month - 1
+        with np.errstate(over='ignore', invalid='ignore'):
+            growth = (1 + r) ** k
+            safe_rate = np.where(r == 0, 1.0, r)
+            opening = np.where(r == 0, P - E * k, P * growth - E * (growth - 1) / safe_rate)
+        opening = np.maximum(opening, 0.0)
+
+        # Same rules as amortization_schedule, including the capped final instalment
+        interest = opening * r
+        principal_paid = E - interest
+        overpay = opening < principal_paid
+        principal_paid = np.where(overpay, opening, principal_paid)
+        interest = np.where(overpay, E - principal_paid, interest)
+
+        return {
+            'Loan': loan + 1,
+            'Month': month,
+            'Year': (month - 1) // 12 + 1,
+            'EMI': E,
+            'Principal Component': principal_paid,
+            'Interest Component': interest,
+            'Remaining Balance': opening - principal_paid,
+        }
+
+    def page(self, number, page_size=DEFAULT_PAGE_SIZE, formatted=True, columns=TABLE_COLUMNS):
+        """DataFrame for 0-based page `number`; currency columns as ₹ strings when `formatted`."""
+        import pandas as pd
+
+        data = self.rows(number * page_size, (number + 1) * page_size)
+        if formatted:
+            for column in CURRENCY_COLUMNS:
+                data[column] = format_inr(data[column])
+        return pd.DataFrame({column: data[column] for column in columns})
+
+    def iter_chunks(self, chunk_rows=EXPORT_CHUNK_ROWS):
+        for start in range(0, len(self), chunk_rows):
+            yield self.rows(start, start + chunk_rows)
+
+
+class LedgerTable(ScheduleTable):
+    """Monthly rows of an exact paise ledger (a fixedpoint.PaiseSchedule), paged like ScheduleTable.
+
+    Amounts are the ledger's posted paise shown in rupees. The EMI column holds
+    each instalment actually paid, so the last one, which settles the balance,
+    can differ from the EMI.
+    """
+
+    def __init__(self, ledger):
+        self.ledger = ledger
+        self.emi = to_rupees(ledger.emi)
+        self.num_months = np.where(ledger.emi > 0, ledger.num_months, 0)
+        self.row_offsets = np.concatenate([[0], np.cumsum(self.num_months)])
+
+    def rows(self, start, stop):
+        loan, month = self._locate(start, stop)
+        k = month - 1
+        return {
+            'Loan': loan + 1,
+            'Month': month,
+            'Year': (month - 1) // 12 + 1,
+            'EMI': to_rupees(self.ledger.payment[loan, k]),
+            'Principal Component': to_rupees(self.ledger.principal[loan, k]),
+            'Interest Component': to_rupees(self.ledger.interest[loan, k]),
+            'Remaining Balance': to_rupees(self.ledger.balance[loan, k]),
+        }
+
+
+# Function to stream a table to CSV, one chunk at a time
+def iter_csv(table, chunk_rows=EXPORT_CHUNK_ROWS, columns=TABLE_COLUMNS):
+    """Yields CSV text: the header, then one block per chunk of rows (amounts rounded to paise)."""
+    import pandas as pd
+
+    yield ",".join(columns) + "\n"
+    for data in table.iter_chunks(chunk_rows):
+        frame = pd.DataFrame({column: data[column] for column in columns})
+        yield frame.to_csv(index=False, header=False, float_format="%.2f", lineterminator="\n")
+
+
+def write_csv(table, path_or_file, chunk_rows=EXPORT_CHUNK_ROWS, columns=TABLE_COLUMNS):
+    if hasattr(path_or_file, 'write'):
+        for block in iter_csv(table, chunk_rows, columns):
+            path_or_file.write(block)
+        return
+    with open(path_or_file, 'w', newline='') as f:
+        write_csv(table, f, chunk_rows, columns)
+
+
+# Function to stream a table to an Excel workbook (openpyxl write-only mode)
+def write_excel(table, path_or_file, chunk_rows=EXPORT_CHUNK_ROWS, columns=TABLE_COLUMNS,
+                sheet_title="Amortization"):
+    """Rows are appended chunk by chunk; openpyxl's write-only mode keeps no cells in memory."""
+    try:
+        from openpyxl import Workbook
+    except ImportError as e:
+        raise ImportError("Excel export needs openpyxl (pip install openpyxl)") from e
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_title)
+    sheet.append(columns)
+    for data in table.iter_chunks(chunk_rows):
+        # Round currency to paise, and hand openpyxl plain Python numbers
+        block = [data[c].round(2).tolist() if c in CURRENCY_COLUMNS else data[c].tolist() for c in columns]
+        for row in zip(*block):
+            sheet.append(row)
+    workbook.save(path_or_file)
+
+
+def _time_and_peak(func):
+    """Wall time of an untraced run, and peak traced allocation of a second run (tracing is slow)."""
+    import tracemalloc
+
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main(argv=None):
+    import pandas as pd
+
+    from .amortization import amortization_schedule
+
+    parser = argparse.ArgumentParser(description="Export a loan book's monthly schedules in chunks.")
+    parser.add_argument("--loans", type=int, default=1000)
+    parser.add_argument("--out", default="book_schedule.csv", help=".csv or .xlsx")
+    parser.add_argument("--chunk-rows", type=int, default=EXPORT_CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    principal = rng.integers(20, 2000, args.loans) * 5000.0
+    rate = rng.integers(70, 140, args.loans) / 10
+    tenure = rng.integers(1, 31, args.loans)
+    table = ScheduleTable(principal, rate, tenure)
+
+    def naive():
+        # Old approach: build every row, then format each currency column with .apply
+        schedule = amortization_schedule(principal, rate, tenure)
+        active = schedule.active
+        df = pd.DataFrame({
+            'Principal Component': schedule.principal[active],
+            'Interest Component': schedule.interest[active],
+            'Remaining Balance': schedule.balance[active],
+        })
+        for column in df.columns:
+            df[column] = df[column].apply(lambda x: f"₹{x:,.0f}")
+
+    def export():
+        if args.out.endswith('.xlsx'):
+            write_excel(table, args.out, args.chunk_rows)
+        else:
+            write_csv(table, args.out, args.chunk_rows)
+
+    naive_seconds, naive_peak = _time_and_peak(naive)
+    export_seconds, export_peak = _time_and_peak(export)
+
+    values = table.rows(0, min(len(table), 100_000))['Remaining Balance']
+    start = time.perf_counter()
+    format_inr(values)
+    vector_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    [f"₹{x:,.0f}" for x in values]
+    loop_seconds = time.perf_counter() - start
+
+    print(f"{args.loans:,} loans, {len(table):,} monthly rows, {table.n_pages():,} pages of {DEFAULT_PAGE_SIZE}")
+    print(f"full table + .apply formatting: {naive_seconds:7.2f} s, peak {naive_peak / 2**20:8.1f} MB")
+    print(f"chunked export to {args.out}: {export_seconds:7.2f} s, peak {export_peak / 2**20:8.1f} MB")
+    print(f"format_inr on {len(values):,} values: {vector_seconds * 1000:.1f} ms "
+          f"(f-string loop {loop_seconds * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# model_search.py
+# Parallel cross-validated hyperparameter search for the loan model.
+#
+# Trials (grid or random draws over max_depth, n_estimators, learning_rate and
+# max_bin) run on a process pool. Each worker gets an equal share of the cores
+# through XGBoost's nthread, so workers x threads never exceeds the machine.
+# A trial is pruned once its running mean fold log-loss is clearly worse than
+# the best finished trial. Every finished trial is appended to a JSON-lines
+# report, which is also what --resume reads to skip trials already done.
+#
+# Usage (via train_save_model.py):
+#   python train_save_model.py --search random --n-trials 40 --folds 5 --workers 4
+#   python train_save_model.py --search random --n-trials 40 --resume
+import itertools
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+PARAM_GRID = {
+    'max_depth': [3, 4, 6, 8],
+    'n_estimators': [50, 100, 200, 400],
+    'learning_rate': [0.03, 0.1, 0.3],
+    'max_bin': [64, 128, 256],
+}
+
+# A trial stops once its running mean log-loss is this much worse than the best trial
+PRUNE_MARGIN = 0.10
+
+DEFAULT_REPORT = "search_report.jsonl"
+
+# Training data shared with each worker process once, via the pool initializer
+_worker_data = {}
+
+
+def grid_trials(grid=PARAM_GRID):
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def random_trials(n_trials, grid=PARAM_GRID, seed=0):
+    """Samples `n_trials` distinct configurations from the grid."""
+    trials = grid_trials(grid)
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(trials))[:n_trials]
+    return [trials[i] for i in order]
+
+
+def trial_key(params):
+    return json.dumps(params, sort_keys=True)
+
+
+def load_report(path):
+    """Finished trials from an earlier (possibly interrupted) run, keyed by trial_key."""
+    done = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    record = json.loads(line)
+                    done[trial_key(record['params'])] = record
+    return done
+
+
+def _init_worker(X, y, folds, seed):
+    from sklearn.model_selection import StratifiedKFold
+
+    _worker_data['X'] = X
+    _worker_data['y'] = y
+    _worker_data['splits'] = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed).split(X, y))
+
+
+def _run_trial(params, nthread, best_logloss):
+    import xgboost as xgb
+    from sklearn.metrics import log_loss, roc_auc_score
+
+    X, y, splits = _worker_data['X'], _worker_data['y'], _worker_data['splits']
+    start = time.perf_counter()
+    losses, aucs = [], []
+    pruned = False
+    for train_idx, valid_idx in splits:
+        model = xgb.XGBClassifier(eval_metric='logloss', tree_method='hist', nthread=nthread, **params)
+        model.fit(X[train_idx], y[train_idx])
+        prob = model.predict_proba(X[valid_idx])[:, 1]
+        losses.append(float(log_loss(y[valid_idx], prob, labels=[0, 1])))
+        aucs.append(float(roc_auc_score(y[valid_idx], prob)))
+        if best_logloss is not None and np.mean(losses) > best_logloss * (1 + PRUNE_MARGIN):
+            pruned = True
+            break
+
+    return {
+        'params': params,
+        'fold_logloss': losses,
+        'fold_auc': aucs,
+        'mean_logloss': float(np.mean(losses)),
+        'mean_auc': float(np.mean(aucs)),
+        'folds_run': len(losses),
+        'pruned': pruned,
+        'seconds': time.perf_counter() - start,
+        'nthread': nthread,
+    }
+
+
+def _best(records):
+    finished = [r for r in records if not r['pruned']]
+    return min(finished, key=lambda r: r['mean_logloss']) if finished else None
+
+
+def run_search(X, y, trials, folds=5, workers=None, report_path=DEFAULT_REPORT, resume=False, seed=42, log=print):
+    """Cross-validates every trial and returns the best record (lowest mean log-loss)."""
+    workers = workers or max(1, min(len(trials), os.cpu_count() or 1))
+    nthread = max(1, (os.cpu_count() or 1) // workers)
+
+    done = load_report(report_path) if resume else {}
+    if not resume and os.path.exists(report_path):
+        os.remove(report_path)
+    records = list(done.values())
+    pending = [p for p in trials if trial_key(p) not in done]
+    if done:
+        log(f"Resuming: {len(done)} trials already in {report_path}, {len(pending)} to run")
+
+    with open(report_path, 'a') as report, ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(X, y, folds, seed)
+    ) as pool:
+        queue = iter(pending)
+        running = set()
+
+        def submit_next():
+            params = next(queue, None)
+            if params is not None:
+                best = _best(records)
+                running.add(pool.submit(_run_trial, params, nthread, best['mean_logloss'] if best else None))
+
+        # Keep one trial per worker in flight so newly finished trials tighten the pruning bar
+        for _ in range(workers):
+            submit_next()
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                running.discard(future)
+                record = future.result()
+                records.append(record)
+                report.write(json.dumps(record) + "\n")
+                report.flush()
+                status = "pruned" if record['pruned'] else "done"
+                log(f"[{len(records)}/{len(trials)}] {status} {record['params']} "
+                    f"logloss={record['mean_logloss']:.4f} auc={record['mean_auc']:.4f} "
+                    f"({record['seconds']:.1f}s, {record['folds_run']} folds)")
+                submit_next()
+
+    return _best(records)
@@ -0,0 +1,242 @@
+# scoring_service.py
+# Local HTTP scoring service for the loan model with async micro-batching.
+#
+# Concurrent requests are queued and grouped into micro-batches (up to
+# --max-batch-size rows, waiting at most --max-wait-ms for a batch to fill);
+# each batch is scored with a single predict_proba call on the shared model
+# from model_store. Only the standard library is used for the HTTP layer.
+# Every scored row is also counted by the drift monitor (GET /drift).
+#
+# Usage:
+#   python scoring_service.py --port 8765 --max-batch-size 64 --max-wait-ms 2
+#
+#   curl -s localhost:8765/predict -d '{"Age": 35, "Income": 120, "CCAvg": 2.5, "Education": 2}'
+#   curl -s localhost:8765/predict -d '{"instances": [{"Age": 35, "Income": 120, "CCAvg": 2.5, "Education": 2}]}'
+#   curl -s localhost:8765/drift
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from loanease import drift, model_store
+from loanease.model_store import FEATURES
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 2.0
+# Largest request body accepted; a /predict batch of a few thousand instances fits comfortably
+MAX_BODY_BYTES = 1 << 20
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+                500: "Internal Server Error"}
+
+
+class MicroBatcher:
+    """Collects rows from concurrent callers and scores them in batches."""
+
+    def __init__(self, model, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS, monitor=None):
+        self.model = model
+        self.monitor = monitor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.rows = 0
+        self._queue = asyncio.Queue()
+        self._worker = None
+
+    def start(self):
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+    async def predict(self, rows):
+        """Scores an (n, 4) array of rows; resolves once its batch has run."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((rows, future))
+        return await future
+
+    async def _collect(self):
+        # Block for the first request, then fill the batch until it is full or the wait expires
+        items = [await self._queue.get()]
+        size = len(items[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            items.append(item)
+            size += len(item[0])
+        return items
+
+    def _score(self, batch):
+        probs = self.model.predict_proba(batch)[:, 1]
+        if self.monitor is not None:
+            self.monitor.update(batch)
+        return probs
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = await self._collect()
+            batch = np.concatenate([rows for rows, _ in items])
+            try:
+                # Score off the event loop so new requests keep queueing meanwhile
+                probs = await loop.run_in_executor(None, self._score, batch)
+            except Exception as exc:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+
+            self.batches += 1
+            self.rows += len(batch)
+            offset = 0
+            for rows, future in items:
+                if not future.done():
+                    future.set_result(probs[offset:offset + len(rows)])
+                offset += len(rows)
+
+
+# Function to turn a request body into an (n, 4) feature array
+def parse_instances(payload):
+    instances = payload["instances"] if isinstance(payload, dict) and "instances" in payload else [payload]
+    if not instances:
+        raise ValueError("no instances given")
+    try:
+        return np.array([[float(item[name]) for name in FEATURES] for item in instances], dtype=np.float64)
+    except (KeyError, TypeError, ValueError) as exc:
+        raise ValueError(f"each instance needs numeric {FEATURES}") from exc
+
+
+class ScoringServer:
+    """Minimal HTTP/1.1 server (keep-alive) exposing POST /predict, GET /health and GET /drift."""
+
+    def __init__(self, batcher):
+        self.batcher = batcher
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                parts = request_line.split(" ")
+                if len(parts) != 3:
+                    break
+                method, path, _ = parts
+                headers = {}
+                for line in header_lines:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                body = b""
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                    if length < 0:
+                        raise ValueError
+                except ValueError:
+                    # Without a usable length the body can't be delimited: answer and close
+                    self._write_response(writer, 400, {"error": "invalid Content-Length"}, False)
+                    await writer.drain()
+                    break
+                if length > MAX_BODY_BYTES:
+                    # Refuse before buffering it; the unread body leaves the connection unusable
+                    self._write_response(writer, 413, {"error": f"body larger than {MAX_BODY_BYTES} bytes"}, False)
+                    await writer.drain()
+                    break
+                if length:
+                    body = await reader.readexactly(length)
+
+                status, payload = await self.dispatch(method, path, body)
+                keep_alive = headers.get("connection", "keep-alive").lower() != "close"
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            # The client went away mid-body or mid-response; there is no one left to answer
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, path, body):
+        if path == "/health":
+            return 200, {"status": "ok", "batches": self.batcher.batches, "rows": self.batcher.rows}
+        if path == "/drift":
+            if self.batcher.monitor is None:
+                return 404, {"error": "drift monitoring is off"}
+            return 200, self.batcher.monitor.report()
+        if path != "/predict":
+            return 404, {"error": "not found"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        try:
+            rows = parse_instances(json.loads(body or b"null"))
+        except ValueError as exc:
+            return 400, {"error": str(exc)}
+
+        try:
+            probs = await self.batcher.predict(rows)
+        except Exception as exc:
+            return 500, {"error": str(exc)}
+        if len(probs) == 1:
+            return 200, {"probability": float(probs[0])}
+        return 200, {"probabilities": probs.tolist()}
+
+    @staticmethod
+    def _write_response(writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body
+        )
+
+
+async def serve(host, port, max_batch_size, max_wait_ms):
+    model = model_store.warm_up()
+    batcher = MicroBatcher(model, max_batch_size, max_wait_ms, drift.get_monitor())
+    batcher.start()
+    server = ScoringServer(batcher)
+    tcp_server = await asyncio.start_server(server.handle_connection, host, port)
+    print(f"Scoring service on http://{host}:{port} "
+          f"(max batch {max_batch_size}, max wait {max_wait_ms} ms)")
+    try:
+        async with tcp_server:
+            await tcp_server.serve_forever()
+    finally:
+        await batcher.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve loan model predictions over HTTP with micro-batching.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS)
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_batch_size, args.max_wait_ms))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
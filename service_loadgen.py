@@ -0,0 +1,90 @@
+# service_loadgen.py
+# Load generator for scoring_service.py.
+#
+# Opens --concurrency keep-alive connections and fires --requests single-applicant
+# /predict calls across them, then reports throughput and p50/p99 latency.
+# Compare a run against a server started with --max-batch-size 1 to see the
+# effect of micro-batching.
+#
+# Usage:
+#   python service_loadgen.py --port 8765 --concurrency 64 --requests 20000
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+
+def _random_body(rng):
+    return json.dumps({
+        "Age": int(rng.integers(23, 68)),
+        "Income": int(rng.integers(8, 225)),
+        "CCAvg": round(float(rng.uniform(0, 10)), 1),
+        "Education": int(rng.integers(1, 4)),
+    }).encode()
+
+
+async def _client(host, port, n_requests, bodies, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for i in range(n_requests):
+            body = bodies[i % len(bodies)]
+            start = time.perf_counter()
+            writer.write(
+                b"POST /predict HTTP/1.1\r\nHost: " + host.encode()
+                + b"\r\nContent-Type: application/json\r\nContent-Length: "
+                + str(len(body)).encode() + b"\r\n\r\n" + body
+            )
+            await writer.drain()
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, concurrency, total_requests, seed=0):
+    """Returns a dict with throughput and latency percentiles (ms)."""
+    rng = np.random.default_rng(seed)
+    bodies = [_random_body(rng) for _ in range(1024)]
+    per_client = [total_requests // concurrency + (1 if i < total_requests % concurrency else 0)
+                  for i in range(concurrency)]
+    latencies = []
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, n, bodies, latencies) for n in per_client if n))
+    elapsed = time.perf_counter() - start
+
+    lat_ms = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(lat_ms, 50)),
+        "p99_ms": float(np.percentile(lat_ms, 99)),
+        "max_ms": float(lat_ms.max()),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate concurrent load against scoring_service.py.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=10_000)
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run_load(args.host, args.port, args.concurrency, args.requests))
+    print(f"{result['requests']:,} requests over {result['concurrency']} connections "
+          f"in {result['seconds']:.2f}s: {result['throughput_rps']:,.0f} req/s, "
+          f"p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# tests/test_amortization.py
+# The closed-form engine against the month-by-month loop it replaced.
+import numpy as np
+import pytest
+
+from loanease.amortization import amortization_schedule, calculate_emi, create_amortization_summary
+
+
+def loop_emi(principal, annual_rate, tenure_years):
+    r = annual_rate / (12 * 100)
+    n = tenure_years * 12
+    if r == 0:
+        emi = principal / n if n > 0 else 0
+    else:
+        emi = (principal * r * (1 + r) ** n) / ((1 + r) ** n - 1)
+    return emi if emi > 0 else 0
+
+
+def loop_schedule(principal, annual_rate, emi, tenure_years):
+    # The original create_amortization_summary loop, keeping every month
+    monthly_rate = annual_rate / (12 * 100)
+    balance = principal
+    rows = []
+    for month in range(1, tenure_years * 12 + 1):
+        interest_paid = balance * monthly_rate
+        principal_paid = emi - interest_paid
+        if balance < principal_paid:
+            principal_paid = balance
+            interest_paid = emi - principal_paid
+        balance -= principal_paid
+        rows.append((interest_paid, principal_paid, balance))
+    return np.array(rows)
+
+
+LOANS = [(2500000, 10.5, 15), (100000, 1.0, 1), (10000000, 25.0, 30), (500000, 0.0, 5), (750000, 7.3, 20)]
+
+
+@pytest.mark.parametrize("principal, rate, years", LOANS)
+def test_emi_matches_loop(principal, rate, years):
+    assert calculate_emi(principal, rate, years) == pytest.approx(loop_emi(principal, rate, years), rel=1e-12)
+
+
+def test_emi_broadcasts():
+    principal, rate, years = map(np.array, zip(*LOANS))
+    expected = [loop_emi(*loan) for loan in LOANS]
+    np.testing.assert_allclose(calculate_emi(principal, rate, years), expected, rtol=1e-12)
+
+
+def test_schedule_matches_loop():
+    principal, rate, years = map(np.array, zip(*LOANS))
+    schedule = amortization_schedule(principal, rate, years)
+    for i, (p, r, y) in enumerate(LOANS):
+        reference = loop_schedule(p, r, loop_emi(p, r, y), y)
+        n = y * 12
+        assert schedule.num_months[i] == n
+        assert schedule.active[i].sum() == n
+        np.testing.assert_allclose(schedule.interest[i, :n], reference[:, 0], rtol=1e-9, atol=1e-6)
+        np.testing.assert_allclose(schedule.principal[i, :n], reference[:, 1], rtol=1e-9, atol=1e-6)
+        np.testing.assert_allclose(schedule.balance[i, :n], reference[:, 2], rtol=1e-9, atol=1e-5)
+        assert schedule.total_interest[i] == pytest.approx(reference[:, 0].sum(), rel=1e-9, abs=1e-6)
+        # Months past a loan's own tenure are zero-filled
+        assert not schedule.interest[i, n:].any()
+
+
+def test_summary_is_quarterly_plus_final_month():
+    emi = calculate_emi(2500000, 10.5, 15)
+    df, total_interest, total_payable = create_amortization_summary(2500000, 10.5, emi, 15)
+    assert df['Month'].tolist() == list(range(3, 181, 3))
+    assert total_payable == pytest.approx(2500000 + total_interest)
+    assert create_amortization_summary(2500000, 10.5, 0, 15) == (None, 0, 0)
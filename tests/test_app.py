@@ -0,0 +1,41 @@
+# tests/test_app.py
+# The Streamlit app driven through AppTest.
+import os
+
+import pytest
+
+AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def _emi_page():
+    at = AppTest.from_file(APP, default_timeout=60).run()
+    at.session_state['page'] = 'emi'
+    return at.run()
+
+
+def _submit(at):
+    next(b for b in at.button if b.proto.is_form_submitter).click()
+    return at.run()
+
+
+def _metric_labels(at):
+    return [m.label for m in at.metric]
+
+
+def test_changing_the_rate_alone_does_not_apply_a_rate_reset():
+    at = _emi_page()
+    next(s for s in at.slider if s.label.startswith("Annual Interest")).set_value(12.0)
+    _submit(at)
+    assert not at.exception
+    assert "Interest Saved" not in _metric_labels(at)
+
+
+def test_rate_reset_applies_once_ticked():
+    at = _emi_page()
+    next(s for s in at.slider if s.label.startswith("Annual Interest")).set_value(12.0)
+    next(c for c in at.checkbox if c.label == "Apply a Rate Reset").check()
+    _submit(at)
+    assert not at.exception
+    assert "Interest Saved" in _metric_labels(at)
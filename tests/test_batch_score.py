@@ -0,0 +1,69 @@
+# tests/test_batch_score.py
+# Chunked scoring writes one Parquet schema, however pandas infers each chunk.
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from batch_score import score_chunk, score_file
+
+
+def _applications(n=1000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'loan_amount': rng.integers(20, 800, n) * 5000.0,
+        'interest_rate': rng.integers(10, 201, n) / 10,
+        'tenure': rng.integers(1, 31, n),
+        'income': rng.integers(20, 201, n) * 1000.0,
+        'credit_score': rng.integers(300, 901, n),
+    })
+
+
+def test_csv_chunks_with_late_text_and_gaps(tmp_path):
+    df = _applications()
+    # Empty in the first chunk, text later; an integer id with gaps in one chunk only
+    df['note'] = [None] * 600 + ['vip'] * 400
+    df['branch'] = pd.array(np.arange(1000), dtype='Int64')
+    df.loc[750:760, 'branch'] = pd.NA
+    df.to_csv(tmp_path / "in.csv", index=False)
+
+    rows, _ = score_file(str(tmp_path / "in.csv"), str(tmp_path / "out.parquet"), chunk_size=250, log=None)
+    assert rows == 1000
+    parquet_file = pq.ParquetFile(tmp_path / "out.parquet")
+    assert parquet_file.metadata.num_row_groups == 4
+    out = parquet_file.read()
+    assert out.schema.field('note').type == pa.string()
+    assert out.schema.field('eligibility').type == pa.string()
+    assert out.schema.field('emi').type == pa.float64()
+    assert out.column('note').to_pylist() == [None] * 600 + ['vip'] * 400
+
+    expected = score_chunk(pd.read_csv(tmp_path / "in.csv"))
+    np.testing.assert_allclose(out.column('emi').to_numpy(), expected['emi'])
+    assert out.column('eligibility').to_pylist() == expected['eligibility'].tolist()
+
+
+def test_csv_integers_followed_by_fractions(tmp_path):
+    # The third income is fractional, after a chunk that pandas reads as int64
+    (tmp_path / "in.csv").write_text("loan_amount,interest_rate,tenure,income,credit_score\n"
+                                     "500000,10,5,80000,750\n500000,10,5,80000,750\n"
+                                     "500000,10,5,80000.5,750\n500000,10,5,80000,750\n")
+
+    rows, _ = score_file(str(tmp_path / "in.csv"), str(tmp_path / "out.parquet"), chunk_size=2, log=None)
+    assert rows == 4
+    out = pq.read_table(tmp_path / "out.parquet")
+    assert out.schema.field('income').type == pa.float64()
+    assert out.schema.field('credit_score').type == pa.float64()
+    assert out.column('income').to_pylist() == [80000, 80000, 80000.5, 80000]
+
+
+def test_parquet_input_keeps_its_types(tmp_path):
+    df = _applications()
+    table = pa.Table.from_pandas(df, preserve_index=False).append_column(
+        'branch', pa.array([None if 500 <= i < 520 else i for i in range(1000)], type=pa.int64()))
+    pq.write_table(table, tmp_path / "in.parquet", row_group_size=250)
+
+    score_file(str(tmp_path / "in.parquet"), str(tmp_path / "out.parquet"), chunk_size=250, log=None)
+    out = pq.read_table(tmp_path / "out.parquet")
+    for field in table.schema:
+        assert out.schema.field(field.name).type == field.type, field.name
+    assert out.column('branch').to_pylist() == table.column('branch').to_pylist()
@@ -0,0 +1,108 @@
+# tests/test_caching.py
+# LRUCache eviction and expiry, and the memoize wrapper every page goes through.
+import numpy as np
+import pytest
+
+from loanease import caching
+from loanease.caching import SPECULATIVE_CACHE, LRUCache, estimate_size, memoize, page_cache_stats
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_least_recently_used_entry_goes_first():
+    cache = LRUCache(max_entries=3)
+    for key in 'abc':
+        cache.put(key, key.upper())
+    assert cache.get('a') == 'A'   # now the most recent
+    cache.put('d', 'D')
+    assert 'b' not in cache and list(cache._data) == ['c', 'a', 'd']
+    assert cache.evictions == 1
+    cache.put('c', 'C2')   # replacing refreshes too
+    cache.put('e', 'E')
+    assert 'a' not in cache and cache.get('c') == 'C2'
+
+
+def test_byte_cap_evicts_until_under_it():
+    cache = LRUCache(max_entries=100, max_bytes=1000, sizeof=len)
+    cache.put('a', 'x' * 400)
+    cache.put('b', 'x' * 400)
+    assert cache.current_bytes == 800
+    cache.put('c', 'x' * 400)
+    assert 'a' not in cache and cache.current_bytes == 800
+    cache.put('d', 'x' * 2000)   # larger than the cap on its own: nothing can stay
+    assert len(cache) == 0 and cache.current_bytes == 0
+    cache.put('e', 'x' * 10)
+    cache.clear()
+    assert cache.current_bytes == 0
+
+
+def test_entries_expire_after_the_ttl():
+    clock = FakeClock()
+    cache = LRUCache(ttl=60, clock=clock, sizeof=len)
+    cache.put('a', 'aaa')
+    cache.put('b', 'bbb')
+    clock.now = 59.9
+    assert cache.get('a') == 'aaa'
+    clock.now = 60
+    assert cache.get('a', 'missing') == 'missing'
+    assert cache.pop('b', 'missing') == 'missing'
+    assert cache.expirations == 2 and cache.current_bytes == 0 and len(cache) == 0
+    cache.put('c', 'ccc')   # a fresh entry counts from when it was put
+    clock.now = 119
+    assert cache.pop('c') == 'ccc'
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (2, 2) and stats['hit_rate'] == 0.5
+
+
+def test_estimate_size_counts_array_bytes():
+    array = np.zeros(1000)
+    assert estimate_size(array) == 8000
+    assert estimate_size((array, array)) > 16000
+    assert estimate_size({'a': array}) > 8000
+
+
+@pytest.fixture
+def counted():
+    calls = []
+
+    @memoize("test_caching", cache=LRUCache())
+    def add(a, b=0, c=0):
+        calls.append((a, b, c))
+        return a + b + c
+
+    add.calls = calls
+    return add
+
+
+def test_memoize_keys_on_arguments_as_passed(counted):
+    assert counted(1, 2) == 3 and counted(1, 2) == 3
+    assert counted.calls == [(1, 2, 0)]
+    # Keyword order does not matter, but a positional and a keyword argument are different keys
+    counted(1, b=2, c=3)
+    counted(1, c=3, b=2)
+    counted(1, b=2)
+    assert counted.calls == [(1, 2, 0), (1, 2, 3), (1, 2, 0)]
+    assert counted.cache_key(1, b=2, c=3) == counted.cache_key(1, c=3, b=2) != counted.cache_key(1, 2, 3)
+    assert counted.uncached(4, 5) == 9 and len(counted.calls) == 4
+
+
+def test_speculative_result_moves_into_the_result_cache(counted, monkeypatch):
+    monkeypatch.setattr(caching, "_page_counters", caching.defaultdict(
+        lambda: {'hits': 0, 'misses': 0, 'speculative_hits': 0}))
+    key = counted.cache_key(2, 3)
+    try:
+        SPECULATIVE_CACHE.put(key, 5)
+        assert counted(2, 3) == 5 and counted.calls == []
+        assert key not in SPECULATIVE_CACHE and counted.cache.get(key) == 5
+        counted(2, 3)
+        counted(9)
+    finally:
+        SPECULATIVE_CACHE.clear()
+    stats = page_cache_stats()['test_caching']
+    assert (stats['hits'], stats['misses'], stats['speculative_hits']) == (2, 1, 1)
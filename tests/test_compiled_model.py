@@ -0,0 +1,71 @@
+# tests/test_compiled_model.py
+# The compiled NumPy forest against XGBoost on the stored model.
+import os
+
+import numpy as np
+import pytest
+
+from loanease import compiled_model, model_store
+from loanease.dataset import load_frame
+
+DATA = os.path.join(model_store.ARTIFACT_DIR, "bank_personal_loan_data.csv")
+
+
+@pytest.fixture(scope="module")
+def model():
+    return model_store.load_model()
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return load_frame(DATA, model_store.FEATURES).to_numpy(dtype=np.float64)
+
+
+@pytest.fixture(scope="module")
+def forest(model):
+    return compiled_model.compile_booster(model.booster, model.mean, model.scale)
+
+
+def test_matches_xgboost_on_the_dataset(model, forest, rows):
+    np.testing.assert_allclose(compiled_model.predict_approval(forest, rows), model.predict_approval(rows),
+                               rtol=0, atol=compiled_model.TOLERANCE)
+
+
+def test_single_row_and_chunked_batches_agree(forest, rows):
+    batch = compiled_model.predict_margin(forest, rows[:compiled_model.CHUNK_ROWS * 3 + 7])
+    singles = [compiled_model.predict_margin(forest, row)[0] for row in rows[:20]]
+    np.testing.assert_allclose(batch[:20], singles, rtol=0, atol=1e-12)
+
+
+def test_missing_values_follow_default_branches(model, forest, rows):
+    X = rows[:500].copy()
+    rng = np.random.default_rng(0)
+    X[rng.random(X.shape) < 0.2] = np.nan
+    expected = model.booster.inplace_predict(model.transform(X), predict_type="margin")
+    np.testing.assert_allclose(compiled_model.predict_margin(forest, X), expected, rtol=0, atol=1e-5)
+
+
+def test_split_boundaries_match_xgboost(model, forest, rows):
+    # Raw values exactly on (and just below) every folded threshold, where float32 rounding decides the branch
+    splits = np.isfinite(forest.threshold)
+    features, thresholds = forest.feature[splits], forest.threshold[splits]
+    base = np.repeat(rows[:1], 2 * len(thresholds), axis=0)
+    values = np.concatenate([thresholds, np.nextafter(thresholds, -np.inf)])
+    base[np.arange(len(base)), np.concatenate([features, features])] = values
+    expected = model.booster.inplace_predict(model.transform(base), predict_type="margin")
+    np.testing.assert_allclose(compiled_model.predict_margin(forest, base), expected, rtol=0, atol=1e-5)
+
+
+def test_saved_forest_round_trips(forest, rows, tmp_path):
+    compiled_model.save_compiled(forest, tmp_path)
+    loaded = compiled_model.load_compiled(tmp_path)
+    assert loaded.depth == forest.depth and loaded.base_margin == forest.base_margin
+    np.testing.assert_array_equal(compiled_model.predict_margin(loaded, rows[:1000]),
+                                  compiled_model.predict_margin(forest, rows[:1000]))
+
+
+def test_committed_artifact_matches_the_model(model, rows):
+    # train_save_model.py rewrites it; a stale copy would fail here
+    loaded = compiled_model.load_compiled()
+    np.testing.assert_allclose(compiled_model.predict_approval(loaded, rows), model.predict_approval(rows),
+                               rtol=0, atol=compiled_model.TOLERANCE)
@@ -0,0 +1,131 @@
+# tests/test_drift.py
+# The incremental drift counts against recounting the records directly.
+import numpy as np
+import pandas as pd
+import pytest
+
+from loanease import drift
+from loanease.drift import DriftMonitor, build_reference, load_reference, reference_from_csv, save_reference
+
+FEATURES = ['Age', 'Income', 'CCAvg', 'Education']
+
+
+def _rows(rng, n, income_shift=0.0):
+    return np.column_stack([
+        rng.integers(23, 68, n),
+        rng.lognormal(4.0, 0.6, n) * (1 + income_shift),
+        rng.gamma(2.0, 1.0, n),
+        rng.integers(1, 4, n),
+    ]).astype(np.float64)
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return build_reference(_rows(np.random.default_rng(0), 5000), FEATURES)
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_batch_and_single_updates_match_a_direct_count(reference):
+    rows = _rows(np.random.default_rng(1), 3000)
+    rows[::97, 1] = np.nan   # missing values are not counted
+    batched, single = DriftMonitor(reference), DriftMonitor(reference)
+    for start in range(0, len(rows), 700):
+        batched.update(rows[start:start + 700])
+    for row in rows:
+        single.update(row)
+    np.testing.assert_array_equal(batched.live_counts(), single.live_counts())
+    assert batched.records == single.records == len(rows)
+
+    live = batched.live_counts()
+    for i, cuts in enumerate(reference.cuts):
+        column = rows[:, i][np.isfinite(rows[:, i])]
+        direct = np.bincount(np.searchsorted(cuts, column, side='right'), minlength=len(cuts) + 1)
+        np.testing.assert_array_equal(live[batched._offsets[i]:batched._offsets[i + 1]], direct)
+
+
+def test_windows_roll_over(reference):
+    clock = FakeClock()
+    monitor = DriftMonitor(reference, window_seconds=10, n_windows=3, clock=clock)
+    rows = _rows(np.random.default_rng(2), 40)
+    for t, batch in zip((0, 10, 20, 30), np.split(rows, 4)):
+        clock.now = t + 5
+        monitor.update(batch)
+    per_feature = len(reference.cuts)
+    assert monitor.live_counts().sum() == 40 * per_feature
+    # Window 0 was overwritten by window 3; only the last three remain
+    assert monitor.live_counts(last_windows=3).sum() == 30 * per_feature
+    assert monitor.live_counts(last_windows=1).sum() == 10 * per_feature
+    clock.now = 100
+    assert monitor.live_counts(last_windows=3).sum() == 0
+
+
+def test_shift_is_flagged_and_same_distribution_is_not(reference):
+    rng = np.random.default_rng(3)
+    stable, shifted = DriftMonitor(reference), DriftMonitor(reference)
+    stable.update(_rows(rng, 5000))
+    shifted.update(_rows(rng, 5000, income_shift=0.5))
+    assert stable.report()['Income']['status'] == 'stable'
+    assert shifted.report()['Income']['status'] == 'shifted'
+    assert shifted.report()['Age']['status'] == 'stable'
+    assert stable.report(last_windows=1)['Age']['records'] == 5000
+
+
+def test_ks_on_a_discrete_feature_matches_scipy(reference):
+    stats = pytest.importorskip("scipy.stats")
+    reference_rows = _rows(np.random.default_rng(0), 5000)
+    live_rows = _rows(np.random.default_rng(4), 800)
+    live_rows[:200, 3] = 1   # more undergraduates than in training
+    monitor = DriftMonitor(reference)
+    monitor.update(live_rows)
+    report = monitor.report()
+    for feature in ('Age', 'Education'):   # one bin per value, so the binned KS is exact
+        i = FEATURES.index(feature)
+        expected = stats.ks_2samp(reference_rows[:, i], live_rows[:, i]).statistic
+        assert report[feature]['ks'] == pytest.approx(expected, abs=1e-12)
+
+
+def test_reference_and_state_round_trip(reference, tmp_path):
+    save_reference(reference, tmp_path / "reference.npz")
+    loaded = load_reference(tmp_path / "reference.npz")
+    assert loaded.features == FEATURES
+    for name in ('cuts', 'counts', 'psi_groups'):
+        for a, b in zip(getattr(loaded, name), getattr(reference, name)):
+            np.testing.assert_array_equal(a, b)
+
+    monitor = DriftMonitor(reference)
+    monitor.update(_rows(np.random.default_rng(5), 500))
+    monitor.save(tmp_path / "state.npz")
+    restored = DriftMonitor(loaded)
+    restored.load_state(tmp_path / "state.npz")
+    assert restored.records == 500
+    np.testing.assert_array_equal(restored.live_counts(), monitor.live_counts())
+    assert restored.report() == monitor.report()
+
+    other = DriftMonitor(build_reference(_rows(np.random.default_rng(6), 50), FEATURES))
+    with pytest.raises(ValueError):
+        other.load_state(tmp_path / "state.npz")
+
+
+def test_reference_from_csv_matches_the_in_memory_build(tmp_path, monkeypatch):
+    pd.DataFrame(_rows(np.random.default_rng(7), 3000), columns=FEATURES).to_csv(tmp_path / "history.csv",
+                                                                                    index=False)
+    # As written to text, which need not round-trip every float exactly
+    rows = pd.read_csv(tmp_path / "history.csv").to_numpy(dtype=np.float64)
+    expected = build_reference(rows, FEATURES)
+    streamed = reference_from_csv(str(tmp_path / "history.csv"), FEATURES, chunk_rows=700)
+    for name in ('cuts', 'counts', 'psi_groups'):
+        for a, b in zip(getattr(streamed, name), getattr(expected, name)):
+            np.testing.assert_array_equal(a, b)
+
+    # Past the sample size the edges come from a sample, but every row is still counted
+    monkeypatch.setattr(drift, "CUT_SAMPLE_ROWS", 500)
+    sampled = reference_from_csv(str(tmp_path / "history.csv"), FEATURES, chunk_rows=700)
+    for i, cuts in enumerate(sampled.cuts):
+        np.testing.assert_array_equal(sampled.counts[i], drift._bin_counts(cuts, rows[:, i]))
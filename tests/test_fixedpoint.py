@@ -0,0 +1,122 @@
+# tests/test_fixedpoint.py
+# The int64 paise ledger against the same rounding rules walked in Decimal.
+from decimal import ROUND_HALF_UP, Decimal, localcontext
+
+import numpy as np
+import pytest
+
+from loanease.amortization import calculate_emi, create_amortization_summary
+from loanease.fixedpoint import (INTEREST_DENOMINATOR, _loan_book, decimal_schedule, emi_paise, paise_schedule,
+                                 rate_units, to_paise, to_rupees)
+from loanease.tables import LedgerTable
+
+
+def decimal_emi(principal_paise, units, num_months):
+    with localcontext() as ctx:
+        ctx.prec = 80
+        p, r = Decimal(int(principal_paise)), Decimal(int(units)) / INTEREST_DENOMINATOR
+        if r == 0:
+            return int((p / num_months).quantize(Decimal(1), ROUND_HALF_UP))
+        growth = (1 + r) ** num_months
+        return int((p * r * growth / (growth - 1)).quantize(Decimal(1), ROUND_HALF_UP))
+
+
+@pytest.fixture(scope="module")
+def book():
+    book = _loan_book(60, seed=11)
+    # Edge cases: 0%, a single year, rates and principals with awkward decimals
+    book['principal'] = np.append(book['principal'], [100000, 2500000.5, 999999.99, 5000000])
+    book['rate'] = np.append(book['rate'], [0.0, 10.5, 7.3333, 24.99])
+    book['tenure'] = np.append(book['tenure'], [5, 1, 17, 30])
+    return book
+
+
+def test_ledger_matches_decimal(book):
+    ledger = paise_schedule(book['principal'], book['rate'], book['tenure'])
+    loan, units = to_paise(book['principal']), rate_units(book['rate'])
+    for i in range(len(loan)):
+        n = int(book['tenure'][i]) * 12
+        emi, interest, principal, balance = decimal_schedule(loan[i], units[i], n)
+        assert ledger.emi[i] == emi, i
+        assert ledger.interest[i, :n].tolist() == interest, i
+        assert ledger.principal[i, :n].tolist() == principal, i
+        assert ledger.balance[i, :n].tolist() == balance, i
+
+
+def test_ledger_reconciles_to_the_paisa(book):
+    ledger = paise_schedule(book['principal'], book['rate'], book['tenure'])
+    loan = to_paise(book['principal'])
+    np.testing.assert_array_equal(ledger.principal.sum(axis=1), loan)
+    np.testing.assert_array_equal(ledger.payment.sum(axis=1), ledger.total_payable)
+    np.testing.assert_array_equal(ledger.balance[np.arange(len(loan)), ledger.num_months - 1], 0)
+    assert ledger.interest.dtype == np.int64
+
+
+def test_integer_emi_matches_decimal():
+    rng = np.random.default_rng(5)
+    loan = rng.integers(1_000_000, 1_000_000_000, 2000)
+    units = rng.integers(0, 300_000, 2000)
+    months = rng.integers(1, 361, 2000)
+    emi = emi_paise(loan, units, months)
+    assert emi.tolist() == [decimal_emi(p, u, n) for p, u, n in zip(loan, units, months)]
+
+
+def big_integer_emi(principal_paise, units, num_months):
+    # EMI = P * a / b exactly, a = units * (D + units)^n, b = D * ((D + units)^n - D^n), divided half-up
+    if units == 0:
+        return (2 * principal_paise + num_months) // (2 * num_months)
+    growth = (INTEREST_DENOMINATOR + units) ** num_months
+    numerator = principal_paise * units * growth
+    denominator = INTEREST_DENOMINATOR * (growth - INTEREST_DENOMINATOR ** num_months)
+    return (2 * numerator + denominator) // (2 * denominator)
+
+
+def test_vectorized_emi_matches_big_integers():
+    rng = np.random.default_rng(8)
+    n = 50_000
+    loan = rng.integers(1, 10 ** 12, n)
+    units = rng.integers(0, 300_000, n)
+    units[:500] = rng.integers(1, 5, 500)   # rates of a few ten-thousandths of a percent
+    months = rng.integers(1, 361, n)
+    expected = [big_integer_emi(p, u, m) for p, u, m in zip(loan.tolist(), units.tolist(), months.tolist())]
+    assert emi_paise(loan, units, months).tolist() == expected
+    assert emi_paise(12345, 0, 0) == 0 and emi_paise(12345, 0, 12) == 1029
+
+
+def test_an_emi_below_the_interest_is_rejected_before_int64_wraps():
+    with pytest.raises(ValueError, match="does not cover the interest"):
+        paise_schedule(1e11, 25.0, 30, emi=1.0)
+    # Small enough to stay exact: the balance grows and the last instalment settles it
+    ledger = paise_schedule(100000, 10.0, 2, emi=100.0)
+    assert ledger.balance[0, -2] > to_paise(100000)
+    assert ledger.principal.sum() == to_paise(100000)
+
+
+def test_integer_emi_is_the_float_emi_to_the_paisa(book):
+    emi = emi_paise(to_paise(book['principal']), rate_units(book['rate']), book['tenure'] * 12)
+    expected = np.asarray(calculate_emi(book['principal'], book['rate'], book['tenure']))
+    np.testing.assert_allclose(to_rupees(emi), expected, atol=0.01)
+
+
+def test_ledger_table_rows_add_up(book):
+    ledger = paise_schedule(book['principal'][:5], book['rate'][:5], book['tenure'][:5])
+    table = LedgerTable(ledger)
+    assert len(table) == int(ledger.num_months.sum())
+    rows = {column: np.concatenate([chunk[column] for chunk in table.iter_chunks(500)])
+            for column in ('Loan', 'EMI', 'Principal Component', 'Interest Component')}
+    for i in range(5):
+        mine = rows['Loan'] == i + 1
+        assert round(rows['Principal Component'][mine].sum(), 2) == to_rupees(to_paise(book['principal'][i]))
+        assert round(rows['EMI'][mine].sum(), 2) == to_rupees(ledger.total_payable[i])
+        np.testing.assert_allclose(rows['EMI'][mine], rows['Principal Component'][mine]
+                                   + rows['Interest Component'][mine])
+
+
+def test_exact_summary_reuses_the_ledger():
+    ledger = paise_schedule(2500000, 10.5, 15)
+    emi = float(to_rupees(ledger.emi[0]))
+    summary, total_interest, total_payable = create_amortization_summary(2500000, 10.5, emi, 15, exact=True,
+                                                                         ledger=ledger)
+    assert total_interest == pytest.approx(to_rupees(ledger.total_interest[0]))
+    assert total_payable == pytest.approx(to_rupees(ledger.total_payable[0]))
+    assert summary['Month'].iloc[-1] == 180
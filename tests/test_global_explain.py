@@ -0,0 +1,73 @@
+# tests/test_global_explain.py
+# The chunked SHAP job against one pass over the whole (small) dataset.
+import os
+
+import numpy as np
+import pytest
+
+from loanease import global_explain, model_store
+from loanease.global_explain import FEATURES, build_artifact, load_store, summarize
+
+
+@pytest.fixture(scope="module")
+def inputs():
+    X, labels, segments = global_explain._load_inputs(os.path.join(model_store.ARTIFACT_DIR, global_explain.DATA_FILE))
+    # Memory-mapped columns, as the job gets them
+    assert all(isinstance(column, np.memmap) for column in X.values())
+    return X, labels, segments
+
+
+@pytest.fixture(scope="module")
+def artifact(inputs, tmp_path_factory):
+    X, labels, segments = inputs
+    directory = str(tmp_path_factory.mktemp("shap") / global_explain.SHAP_DIRNAME)
+    summary = build_artifact(X, labels, segments, directory, chunk_rows=700)
+    return load_store(directory), summary
+
+
+def _assert_close(a, b, path=""):
+    if isinstance(a, dict):
+        assert a.keys() == b.keys(), path
+        for key in a:
+            _assert_close(a[key], b[key], f"{path}/{key}")
+    elif isinstance(a, list):
+        assert len(a) == len(b), path
+        for i, (x, y) in enumerate(zip(a, b)):
+            _assert_close(x, y, f"{path}[{i}]")
+    elif isinstance(a, float):
+        assert a == pytest.approx(b, rel=1e-9, abs=1e-12), path
+    else:
+        assert a == b, path
+
+
+def test_contributions_add_up_to_the_margin(inputs, artifact):
+    X, _, _ = inputs
+    store, summary = artifact
+    model = model_store.load_model()
+    rows = global_explain._feature_rows(X, slice(None))
+    margin = model.booster.inplace_predict(model.transform(rows), predict_type="margin")
+    np.testing.assert_allclose(store.shap_matrix().sum(axis=1) + summary['bias'], margin, atol=1e-4)
+    np.testing.assert_allclose(store.margin, margin, atol=1e-4)
+
+
+def test_chunked_summary_matches_one_pass(inputs, artifact):
+    X, labels, segments = inputs
+    store, summary = artifact
+    whole = {name: np.asarray(values) for name, values in segments.items()}
+    one_pass = summarize(global_explain._feature_rows(X, slice(None)), store.shap_matrix(), np.asarray(store.margin),
+                         np.asarray(labels), whole, summary['bias'], chunk_rows=len(labels))
+    chunked = {key: summary[key] for key in one_pass}
+    _assert_close(chunked, one_pass)
+    assert summary['rows'] == len(labels)
+    assert sum(row['count'] for row in summary['segments']['Education']) == len(labels)
+    for feature in FEATURES:
+        assert sum(summary['dependence'][feature]['count']) == len(labels)
+    assert summary['acceptance_rate'] == pytest.approx(np.mean(labels))
+
+
+def test_dependence_sample(inputs, artifact):
+    X, _, _ = inputs
+    store, _ = artifact
+    values, contribs = store.dependence_sample('Income')
+    assert len(values) == len(contribs) == global_explain.SAMPLE_ROWS
+    np.testing.assert_array_equal(values, np.asarray(X['Income'])[store.sample_rows])
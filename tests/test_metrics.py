@@ -0,0 +1,60 @@
+# tests/test_metrics.py
+# Counters on the calculators, error counts from `timed`, and enable() starting the file exporter.
+import numpy as np
+import pytest
+
+from loanease import metrics
+from loanease.amortization import calculate_emi
+from loanease.scoring import eligibility_check
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.delenv("LOANEASE_METRICS_FILE", raising=False)
+    monkeypatch.setattr(metrics, "_enabled", False)
+    monkeypatch.setattr(metrics, "_histograms", {})
+    monkeypatch.setattr(metrics, "_counters", {})
+    metrics.enable()
+    return metrics
+
+
+def test_calculators_count_the_loans_they_price(enabled):
+    calculate_emi(np.full(7, 500_000.0), 9.0, 5)
+    eligibility_check(500_000.0, 9.0, 5, 60_000.0, 700)
+
+    counters = enabled.snapshot()['counters']
+    assert counters['emi_loans'] == 8
+    assert counters['eligibility_applicants'] == 1
+    assert "loanease_emi_loans_total 8" in enabled.prometheus_text()
+
+
+def test_disabled_metrics_record_nothing(enabled):
+    enabled.enable(False)
+    calculate_emi(500_000.0, 9.0, 5)
+    assert enabled.snapshot()['counters'] == {}
+
+
+def test_timed_counts_calls_that_raise(enabled):
+    @enabled.timed("flaky")
+    def flaky():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        flaky()
+
+    snapshot = enabled.snapshot()
+    assert snapshot['counters'] == {'flaky_errors': 1}
+    assert snapshot['timers']['flaky']['count'] == 1
+
+
+def test_enable_starts_the_file_exporter(monkeypatch, tmp_path):
+    started = []
+    monkeypatch.setattr(metrics, "start_exporter", lambda path, interval: started.append((path, interval)))
+    monkeypatch.setattr(metrics, "_enabled", False)
+    monkeypatch.setenv("LOANEASE_METRICS_FILE", str(tmp_path / "loanease.prom"))
+    monkeypatch.setenv("LOANEASE_METRICS_INTERVAL", "2")
+
+    metrics.enable(False)
+    assert started == []
+    metrics.enable()
+    assert started == [(str(tmp_path / "loanease.prom"), 2.0)]
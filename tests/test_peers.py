@@ -0,0 +1,98 @@
+# tests/test_peers.py
+# The KD-tree queries against a brute-force scan of every point.
+import numpy as np
+import pytest
+
+from loanease import peers
+from loanease.peers import _brute_force, build_index, load_index, save_index
+
+MEAN = np.array([45.0, 70.0, 1.9, 1.9])
+SCALE = np.array([11.5, 46.0, 1.7, 0.84])
+
+
+def _history(rng, n):
+    # Integer ages and education levels give plenty of ties, as in the real data
+    return np.column_stack([
+        rng.integers(23, 68, n),
+        rng.integers(8, 225, n),
+        np.round(rng.gamma(2.0, 1.0, n), 1),
+        rng.integers(1, 4, n),
+    ]).astype(np.float64)
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = _history(rng, 6000)
+    labels = rng.integers(0, 2, len(X))
+    queries = _history(rng, 300) * rng.normal(1, 0.05, (300, 4))
+    return X, labels, queries
+
+
+@pytest.mark.parametrize("brute_force_rows", [peers.BRUTE_FORCE_ROWS, 0])
+@pytest.mark.parametrize("k", [1, 25])
+def test_single_queries_match_brute_force(data, monkeypatch, brute_force_rows, k):
+    # 0 forces the tree walk on this small index
+    monkeypatch.setattr(peers, "BRUTE_FORCE_ROWS", brute_force_rows)
+    X, labels, queries = data
+    index = build_index(X, labels, MEAN, SCALE)
+    scaled = index.transform(X)
+    for row in queries[:100]:
+        dist, ids = index.query(row, k)
+        np.testing.assert_allclose(dist[0], _brute_force(scaled, index.transform(row), k)[0])
+        # The ids point at rows that really are that far away
+        np.testing.assert_allclose(np.sqrt(((scaled[ids[0]] - index.transform(row)) ** 2).sum(axis=1)), dist[0])
+
+
+@pytest.mark.parametrize("leaf_size", [4, peers.LEAF_SIZE])
+def test_batched_queries_match_brute_force(data, leaf_size):
+    X, labels, queries = data
+    index = build_index(X, labels, MEAN, SCALE, leaf_size=leaf_size)
+    dist, ids = index.query(queries, 25)
+    np.testing.assert_allclose(dist, _brute_force(index.transform(X), index.transform(queries), 25))
+    assert ids.shape == (len(queries), 25)
+
+
+def test_acceptance_rate_is_the_neighbours_label_mean(data):
+    X, labels, queries = data
+    index = build_index(X, labels, MEAN, SCALE)
+    _, ids = index.query(queries, 25)
+    np.testing.assert_allclose(index.acceptance_rate(queries, 25), labels[ids].mean(axis=1))
+
+
+def test_k_larger_than_the_index():
+    rng = np.random.default_rng(1)
+    X = _history(rng, 10)
+    index = build_index(X, np.zeros(10), MEAN, SCALE)
+    dist, ids = index.query(X[0], 25)
+    assert sorted(ids[0].tolist()) == list(range(10))
+    assert dist[0, 0] == 0
+
+
+def test_save_and_load_round_trip(data, tmp_path):
+    X, labels, queries = data
+    index = build_index(X, labels, MEAN, SCALE)
+    save_index(index, tmp_path / "index", {'leaf_size': peers.LEAF_SIZE})
+    for mmap in (True, False):
+        loaded = load_index(tmp_path / "index", mmap=mmap)
+        assert len(loaded) == len(index) and loaded.features == index.features
+        for expected, actual in zip(index.query(queries, 10), loaded.query(queries, 10)):
+            np.testing.assert_array_equal(expected, actual)
+    with pytest.raises(FileNotFoundError):
+        load_index(tmp_path / "missing")
+
+
+@pytest.mark.parametrize("n_queries", [1, 3, 50])
+def test_rows_with_missing_features_get_no_neighbours(data, n_queries):
+    X, labels, queries = data
+    index = build_index(X, labels, MEAN, SCALE)
+    rows = queries[:n_queries].copy()
+    rows[::2, 1] = np.nan
+    rows[1::3, 2] = np.inf
+    missing = ~np.isfinite(rows).all(axis=1)
+    rate = index.acceptance_rate(rows, 25)
+    assert np.isnan(rate[missing]).all()
+    np.testing.assert_allclose(rate[~missing], index.acceptance_rate(rows[~missing], 25))
+    dist, ids = index.query(rows, 25)
+    assert np.isnan(dist[missing]).all() and (ids[missing] == -1).all()
+    assert (ids[~missing] >= 0).all()
@@ -0,0 +1,120 @@
+# tests/test_scoring_service.py
+# The HTTP layer of the scoring service over a real socket, with a stand-in model.
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from scoring_service import MAX_BODY_BYTES, MicroBatcher, ScoringServer
+
+
+class HalfModel:
+    def predict_proba(self, X):
+        return np.tile([0.5, 0.5], (len(X), 1))
+
+
+def _request(method, path, body=b"", headers=None):
+    headers = dict({"Content-Length": str(len(body))} if body else {}, **(headers or {}))
+    lines = [f"{method} {path} HTTP/1.1", "Host: test"] + [f"{k}: {v}" for k, v in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+
+async def _read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    headers = dict(line.lower().split(": ", 1) for line in header_lines if ": " in line)
+    body = await reader.readexactly(int(headers["content-length"]))
+    return int(status_line.split(" ")[1]), headers, json.loads(body)
+
+
+def _exchange(*requests):
+    """Sends `requests` down one connection; returns the responses and whether the server then closed it."""
+    async def run():
+        batcher = MicroBatcher(HalfModel(), max_wait_ms=0)
+        batcher.start()
+        server = await asyncio.start_server(ScoringServer(batcher).handle_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            responses = []
+            for request in requests:
+                writer.write(request)
+                await writer.drain()
+                responses.append(await _read_response(reader))
+            closed = await asyncio.wait_for(reader.read(1), 1.0) == b""
+            writer.close()
+            return responses, closed
+        finally:
+            server.close()
+            await batcher.stop()
+
+    return asyncio.run(run())
+
+
+def test_predict_and_keep_alive():
+    row = {"Age": 35, "Income": 120, "CCAvg": 2.5, "Education": 2}
+    (single, batch, health), closed = _exchange(
+        _request("POST", "/predict", json.dumps(row).encode()),
+        _request("POST", "/predict", json.dumps({"instances": [row, row]}).encode()),
+        _request("GET", "/health", headers={"Connection": "close"}),
+    )
+    assert single[0] == 200 and single[2] == {"probability": 0.5}
+    assert batch[0] == 200 and batch[2] == {"probabilities": [0.5, 0.5]}
+    assert health[0] == 200 and health[2]["rows"] == 3
+    assert closed
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1.5"])
+def test_bad_content_length_is_a_400_and_closes(length):
+    (response,), closed = _exchange(_request("POST", "/predict", headers={"Content-Length": length}))
+    status, headers, body = response
+    assert status == 400 and body == {"error": "invalid Content-Length"}
+    assert headers["connection"] == "close"
+    assert closed
+
+
+def test_oversized_body_is_a_413_before_it_is_read():
+    (response,), closed = _exchange(_request("POST", "/predict", headers={"Content-Length": MAX_BODY_BYTES + 1}))
+    assert response[0] == 413 and response[1]["connection"] == "close"
+    assert closed
+
+
+def test_client_leaving_mid_body_is_not_an_error():
+    async def run():
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        batcher = MicroBatcher(HalfModel(), max_wait_ms=0)
+        batcher.start()
+        handled = []
+
+        async def handle(reader, writer):
+            await ScoringServer(batcher).handle_connection(reader, writer)
+            handled.append(True)
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        _, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(_request("POST", "/predict", headers={"Content-Length": 100}) + b'{"Age": 3')
+        await writer.drain()
+        writer.close()
+        for _ in range(100):
+            if handled:
+                break
+            await asyncio.sleep(0.01)
+        server.close()
+        await batcher.stop()
+        return handled, errors
+
+    handled, errors = asyncio.run(run())
+    # handle_connection returned normally instead of raising IncompleteReadError
+    assert handled == [True] and errors == []
+
+
+def test_bad_payloads():
+    (missing, wrong_method, unknown), _ = _exchange(
+        _request("POST", "/predict", b'{"Age": 35}'),
+        _request("GET", "/predict"),
+        _request("GET", "/nowhere", headers={"Connection": "close"}),
+    )
+    assert missing[0] == 400 and wrong_method[0] == 405 and unknown[0] == 404
@@ -0,0 +1,101 @@
+# tests/test_segments.py
+# The segment engine against a month-by-month walk through the same events.
+import math
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from loanease.amortization import calculate_emi
+from loanease.segments import (MAX_MONTHS, PREPAYMENT, RATE_RESET, STEP_UP, balance_path, event_schedule,
+                               make_events, synthetic_book)
+
+
+def _payoff_months(balance, rate, emi):
+    r = rate / 1200
+    if emi <= balance * r:
+        return math.inf
+    n = -math.log1p(-balance * r / emi) / math.log1p(r) if r > 0 else balance / emi
+    return math.ceil(n - 1e-6)
+
+
+def walk(principal, rate, years, events=(), policy='tenure'):
+    """(instalments, total interest, total prepaid) of one loan, one month at a time."""
+    by_month = defaultdict(list)
+    for month, kind, value in events:
+        by_month[month].append((kind, value))
+    emi = calculate_emi(principal, rate, years)
+    balance, month, end = float(principal), 0, years * 12
+    interest = prepaid = 0.0
+    while balance > 0 and month < MAX_MONTHS:
+        owed = balance * (1 + rate / 1200)
+        interest += owed - balance
+        # The last instalment only clears what is owed
+        balance = 0.0 if owed <= emi * (1 + 1e-6) else owed - emi
+        month += 1
+        if balance <= 0 or month not in by_month:
+            continue
+        todo = by_month[month]
+        applied = min(sum(v for k, v in todo if k == PREPAYMENT), balance)
+        balance -= applied
+        prepaid += applied
+        resets = [v for k, v in todo if k == RATE_RESET]
+        if resets:
+            rate = resets[-1]
+        if policy == 'emi' and (applied > 0 or resets):
+            emi = calculate_emi(balance, rate, max(end - month, 1) / 12)
+        step = math.prod(1 + v for k, v in todo if k == STEP_UP)
+        if step != 1:
+            emi *= step
+            end = month + _payoff_months(balance, rate, emi)
+    return (month if balance <= 0 else MAX_MONTHS), interest, prepaid
+
+
+@pytest.mark.parametrize("policy", ['tenure', 'emi'])
+def test_matches_monthly_walk_on_a_synthetic_book(policy):
+    principal, rate, tenure, events = synthetic_book(150, 6, seed=3)
+    result = event_schedule(principal, rate, tenure, events, policy=policy)
+    for i in range(len(principal)):
+        mine = events.loan == i
+        loan_events = sorted(zip(events.month[mine].tolist(), events.kind[mine].tolist(), events.value[mine].tolist()),
+                             key=lambda e: e[0])
+        months, interest, prepaid = walk(principal[i], rate[i], tenure[i], loan_events, policy)
+        assert result.num_months[i] == months, i
+        assert result.total_interest[i] == pytest.approx(interest, rel=1e-6), i
+        assert result.total_prepaid[i] == pytest.approx(prepaid, rel=1e-9, abs=1e-6), i
+
+
+def test_no_events_is_the_plain_schedule():
+    result = event_schedule([2500000, 100000], [10.5, 0.0], [15, 2])
+    assert result.num_months.tolist() == [180, 24]
+    assert result.interest_saved == pytest.approx([0, 0], abs=1e-6)
+    assert result.tenure_reduction.tolist() == [0, 0]
+
+
+def test_prepayment_shortens_the_loan_and_saves_interest():
+    events = make_events(prepayments=[(0, 60, 500000)])
+    result = event_schedule(2500000, 10.5, 15, events)
+    months, interest, _ = walk(2500000, 10.5, 15, [(60, PREPAYMENT, 500000)])
+    assert result.num_months[0] == months < 180
+    assert result.interest_saved[0] == pytest.approx(result.baseline_interest[0] - interest, rel=1e-9)
+
+
+def test_rate_rise_the_emi_cannot_cover_never_pays_off():
+    result = event_schedule(2500000, 8.0, 30, make_events(rate_resets=[(0, 12, 25.0)]))
+    assert not result.paid_off[0]
+    assert result.num_months[0] == MAX_MONTHS
+
+
+def test_balance_path_ends_at_zero_and_drops_at_prepayments():
+    events = make_events(prepayments=[(0, 24, 300000)])
+    result = event_schedule(1000000, 9.0, 10, events)
+    months, balance = balance_path(result)
+    assert months[0] == 0 and balance[0] == 1000000
+    assert months[-1] == result.num_months[0] and balance[-1] == 0
+    at_24 = np.flatnonzero(months == 24)
+    assert len(at_24) == 2 and balance[at_24[0]] - balance[at_24[1]] == pytest.approx(300000)
+
+
+def test_events_for_unknown_loans_are_rejected():
+    with pytest.raises(ValueError):
+        event_schedule([100000], 10.0, 5, make_events(prepayments=[(1, 12, 1000)]))
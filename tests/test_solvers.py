@@ -0,0 +1,63 @@
+# tests/test_solvers.py
+# The inverse solvers against the DTI rule itself: each limit fits, one step past it does not.
+import numpy as np
+import pytest
+
+from loanease.solvers import (_fits, _slider_search_tenure, emi_budget, max_affordable_loan, max_interest_rate,
+                              min_tenure, preapproved_limits)
+
+
+@pytest.fixture(scope="module")
+def applicants():
+    rng = np.random.default_rng(7)
+    n = 20_000
+    return dict(
+        loan_amount=rng.integers(20, 800, n) * 5000.0,
+        interest_rate=rng.integers(0, 201, n) / 10,
+        tenure=rng.integers(1, 31, n),
+        income=rng.integers(20, 201, n) * 1000.0,
+    )
+
+
+def test_max_loan_is_the_boundary(applicants):
+    a = applicants
+    budget = emi_budget(a['income'])
+    loan = max_affordable_loan(a['income'], a['interest_rate'], a['tenure'])
+    assert (loan >= 0).all() and (loan % 1 == 0).all()
+    assert _fits(loan, a['interest_rate'], a['tenure'], budget).all()
+    assert not _fits(loan + 1, a['interest_rate'], a['tenure'], budget).any()
+
+
+def test_min_tenure_matches_the_slider_search(applicants):
+    a = applicants
+    budget = emi_budget(a['income'])
+    years = min_tenure(a['loan_amount'], a['interest_rate'], a['income'])
+    searched = _slider_search_tenure(a['loan_amount'], a['interest_rate'], a['income'], budget)
+    np.testing.assert_array_equal(np.where(years <= 30, years, np.inf), searched)
+
+
+def test_min_tenure_is_inf_when_the_budget_misses_the_interest():
+    assert min_tenure(1_000_000, 12.0, 20_000) == np.inf
+
+
+def test_max_rate_is_the_boundary(applicants):
+    a = applicants
+    budget = emi_budget(a['income'])
+    rate = max_interest_rate(a['loan_amount'], a['tenure'], a['income'])
+    has_rate = np.isfinite(rate)
+    assert has_rate.any() and (~has_rate).any()
+    loan, tenure, budget, rate = a['loan_amount'][has_rate], a['tenure'][has_rate], budget[has_rate], rate[has_rate]
+    assert _fits(loan, rate, tenure, budget).all()
+    # The next rate as the slider would produce it, not rate + 0.01 with its float error
+    assert not _fits(loan, np.round(rate + 0.01, 10), tenure, budget).any()
+    # Over budget even at 0%: no rate at all
+    over = ~np.isfinite(max_interest_rate(a['loan_amount'], a['tenure'], a['income']))
+    assert (a['loan_amount'][over] / (a['tenure'][over] * 12) > emi_budget(a['income'][over])).all()
+
+
+def test_scalars_and_zero_loans():
+    assert max_interest_rate(0, 10, 50_000) == np.inf
+    assert max_affordable_loan(0, 10.0, 10) == 0
+    limits = preapproved_limits(2_500_000, 10.5, 15, 80_000)
+    assert limits['max_loan_amount'] >= 2_500_000
+    assert limits['min_tenure'] <= 15 and limits['max_interest_rate'] >= 10.5
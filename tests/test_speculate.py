@@ -0,0 +1,171 @@
+# tests/test_speculate.py
+# The speculator's bookkeeping, driven by hand: no worker threads, a fake clock for renders.
+import threading
+
+import pytest
+
+from loanease import speculate
+from loanease.caching import SPECULATIVE_CACHE, LRUCache, memoize
+from loanease.speculate import Speculator, neighbours
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(speculate, "_clock", clock)
+    monkeypatch.setattr(speculate, "_renders", {})
+    return clock
+
+
+@pytest.fixture
+def square():
+    calls = []
+
+    @memoize("test_speculate", cache=LRUCache())
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    square.calls = calls
+    return square
+
+
+def _bookkeeping(speculator):
+    return dict(speculator._generation), dict(speculator._queued), dict(speculator._pending)
+
+
+def test_neighbours_move_one_slider_one_step_within_bounds():
+    values = {'loan': 100000, 'rate': 1.0, 'years': 30}
+    sliders = {'loan': (100000, 200000, 5000), 'rate': (1.0, 25.0, 0.1), 'years': (1, 30, 1)}
+    assert list(neighbours(values, sliders)) == [
+        dict(values, loan=105000),
+        dict(values, rate=1.1),   # rounded to the step, not 1.1000000000000001
+        dict(values, years=29),
+    ]
+
+
+def test_submitted_work_runs_into_the_cache(square):
+    speculator = Speculator(workers=0, cache=LRUCache())
+    assert speculator.submit('a', square, 3)
+    speculator._run_next()
+    assert square.calls == [3]
+    assert speculator.cache.get(square.cache_key(3)) == 9
+    assert speculator.counts['completed'] == 1
+    assert _bookkeeping(speculator) == ({}, {}, {})
+
+
+def test_duplicate_and_cached_work_is_skipped(square):
+    speculator = Speculator(workers=0, cache=LRUCache())
+    assert speculator.submit('a', square, 3)
+    assert not speculator.submit('b', square, 3)   # already queued
+    square(4)
+    assert not speculator.submit('a', square, 4)   # already a real result
+    assert speculator.counts['skipped'] == 2 and speculator._queue.qsize() == 1
+
+
+def test_full_queue_drops_work(square):
+    speculator = Speculator(workers=0, max_queue=2, cache=LRUCache())
+    assert [speculator.submit('a', square, x) for x in range(4)] == [True, True, False, False]
+    assert speculator.counts['dropped'] == 2
+    # Dropped work leaves no bookkeeping behind
+    assert speculator._queued['a'] == 2 and len(speculator._pending) == 2
+    speculator._run_next()
+    speculator._run_next()
+    assert _bookkeeping(speculator) == ({}, {}, {})
+
+
+def test_cancelled_work_is_skipped_and_forgotten(square):
+    speculator = Speculator(workers=0, cache=LRUCache())
+    speculator.submit('a', square, 1)
+    speculator.submit('a', square, 2)
+    speculator.submit('b', square, 3)
+    speculator.cancel('a')
+    for _ in range(3):
+        speculator._run_next()
+    assert square.calls == [3]
+    assert speculator.counts['cancelled'] == 2 and speculator.counts['completed'] == 1
+    assert _bookkeeping(speculator) == ({}, {}, {})
+
+
+def test_work_queued_again_after_a_cancel_still_runs(square):
+    speculator = Speculator(workers=0, cache=LRUCache())
+    speculator.submit('a', square, 5)
+    speculator.cancel('a')
+    assert speculator.submit('a', square, 5)   # the cancelled task no longer counts as pending
+    speculator._run_next()   # the cancelled copy: skipped, and must not clear the new entry
+    assert speculator._pending == {square.cache_key(5): ('a', 1)}
+    speculator._run_next()
+    assert square.calls == [5]
+    assert _bookkeeping(speculator) == ({}, {}, {})
+
+
+def test_cancel_without_queued_work_keeps_nothing(square):
+    speculator = Speculator(workers=0, cache=LRUCache())
+    for owner in range(100):
+        speculator.cancel(owner)
+    assert _bookkeeping(speculator) == ({}, {}, {})
+
+
+def test_failures_are_counted_not_raised():
+    @memoize("test_speculate", cache=LRUCache())
+    def broken(x):
+        raise RuntimeError("no")
+
+    speculator = Speculator(workers=0, cache=LRUCache())
+    speculator.submit('a', broken, 1)
+    speculator._run_next()
+    assert speculator.counts['failed'] == 1 and len(speculator.cache) == 0
+
+
+def test_a_hit_moves_the_result_into_the_real_cache(square):
+    speculator = Speculator(workers=0)
+    hits = SPECULATIVE_CACHE.hits   # shared with every other test in the process
+    try:
+        speculator.submit('a', square, 7)
+        speculator._run_next()
+        assert square(7) == 49 and square.calls == [7]
+        assert square.cache_key(7) in square.cache and square.cache_key(7) not in SPECULATIVE_CACHE
+        assert speculator.stats()['hits'] == hits + 1
+    finally:
+        SPECULATIVE_CACHE.clear()
+
+
+def _waits(timeout=0.2):
+    # True if _wait_until_idle is still blocked after `timeout` seconds
+    done = threading.Event()
+    thread = threading.Thread(target=lambda: (speculate._wait_until_idle(), done.set()), daemon=True)
+    thread.start()
+    return not done.wait(timeout), done
+
+
+def test_workers_wait_while_a_session_renders(clock):
+    speculate.begin_render('s1')
+    blocked, done = _waits()
+    assert blocked
+    speculate.end_render('s1')
+    assert done.wait(2)
+
+
+def test_a_rerun_cut_short_is_replaced_by_the_next_one(clock):
+    speculate.begin_render('s1')   # interrupted: end_render never runs
+    clock.now += 1
+    token = speculate.begin_render('s1')
+    assert len(speculate._renders) == 1
+    speculate.end_render(token)
+    assert speculate._renders == {}
+    assert not _waits()[0]
+
+
+def test_an_abandoned_render_stops_blocking_after_the_timeout(clock):
+    speculate.begin_render('s1')
+    clock.now += speculate.RENDER_TIMEOUT + 1
+    blocked, _ = _waits()
+    assert not blocked
@@ -0,0 +1,74 @@
+# tests/test_stress.py
+# The chunked Monte Carlo stress test against the full borrower x scenario matrix.
+import numpy as np
+import pytest
+
+from loanease.amortization import calculate_emi
+from loanease.scoring import risk_score
+from loanease.stress import HIGH_RISK_THRESHOLD, draw_scenarios, stress_test, synthetic_portfolio
+
+N_BORROWERS = 600
+N_SCENARIOS = 250
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+
+@pytest.fixture(scope="module")
+def portfolio():
+    portfolio = synthetic_portfolio(N_BORROWERS, seed=3)
+    rng = np.random.default_rng(4)
+    portfolio['debt_rate'] = rng.uniform(0, 18, N_BORROWERS)
+    portfolio['debt_tenure'] = rng.integers(1, 30, N_BORROWERS).astype(np.float64)
+    return portfolio
+
+
+@pytest.fixture(scope="module")
+def scenarios():
+    return draw_scenarios(N_SCENARIOS, seed=5)
+
+
+def full_matrix(portfolio, scenarios):
+    """Every borrower under every scenario in one (borrowers x scenarios) array."""
+    rate = portfolio['debt_rate'][:, None]
+    tenure = portfolio['debt_tenure'][:, None]
+    base_emi = calculate_emi(1.0, rate, tenure)
+    shocked_emi = calculate_emi(1.0, np.maximum(rate + scenarios.rate_shift, 0), tenure)
+    return risk_score(
+        portfolio['annual_income'][:, None] * scenarios.income_factor,
+        portfolio['existing_debt'][:, None] * shocked_emi / base_emi,
+        portfolio['credit_score'][:, None],
+        portfolio['fixed_expenses'][:, None] * scenarios.expense_factor,
+        portfolio['collateral'][:, None],
+    )['risk_score']
+
+
+def test_matches_the_full_matrix(portfolio, scenarios):
+    result = stress_test(portfolio, scenarios, chunk_cells=20_000, percentiles=PERCENTILES)
+    scores = full_matrix(portfolio, scenarios)
+
+    # Histogram percentiles report the upper edge of the 0.01-wide bin holding the exact one
+    exact = np.percentile(scores, PERCENTILES, method='inverted_cdf')
+    reported = np.array([result.percentiles[q] for q in PERCENTILES])
+    assert np.all(reported >= exact - 1e-9)
+    assert np.all(reported - exact <= 0.01 + 1e-9)
+    np.testing.assert_allclose(reported, np.percentile(scores, PERCENTILES), atol=0.02)
+
+    high = scores >= HIGH_RISK_THRESHOLD
+    np.testing.assert_allclose(result.borrower_high_risk_prob, high.mean(axis=1))
+    np.testing.assert_allclose(result.high_risk_share, high.mean(axis=0))
+    assert result.cells == N_BORROWERS * N_SCENARIOS
+
+
+@pytest.mark.parametrize("chunk_cells, workers", [
+    (N_SCENARIOS, None),            # one borrower per chunk
+    (N_SCENARIOS * 7 + 1, None),    # chunks that do not divide the portfolio
+    (10**9, None),                  # a single chunk
+    (N_SCENARIOS * 50, 2),          # chunks on a process pool
+])
+def test_chunking_and_workers_do_not_change_results(portfolio, scenarios, chunk_cells, workers):
+    expected = stress_test(portfolio, scenarios, chunk_cells=20_000, percentiles=PERCENTILES)
+    result = stress_test(portfolio, scenarios, chunk_cells=chunk_cells, workers=workers, percentiles=PERCENTILES)
+
+    assert result.percentiles == expected.percentiles
+    np.testing.assert_array_equal(result.borrower_high_risk_prob, expected.borrower_high_risk_prob)
+    np.testing.assert_array_equal(result.high_risk_share, expected.high_risk_share)
+    assert result.baseline_high_risk_share == expected.baseline_high_risk_share
@@ -0,0 +1,28 @@
+# tests/test_tables.py
+# format_inr against the f-string it replaces.
+import numpy as np
+import pytest
+
+from loanease.tables import format_inr
+
+
+@pytest.mark.parametrize("values", [
+    [0, 0.4, 0.5, 1.5, 2.5, -0.4, -0.5, -1.5, 999, 1000, -1000, 1234567.891, 2 ** 53, -(2 ** 53)],
+    [np.nan, np.inf, -np.inf, 12345.6, -7.0],
+    [np.nan],
+    [-np.inf, 1e15],
+])
+def test_matches_the_f_string(values):
+    assert format_inr(values).tolist() == [f"₹{x:,.0f}" for x in values]
+
+
+def test_random_amounts_match_the_f_string():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.normal(0, 1e6, 5000), rng.uniform(-1e12, 1e12, 5000),
+                             np.round(rng.normal(0, 50, 500)) + 0.5])   # exact halves
+    assert format_inr(values).tolist() == [f"₹{x:,.0f}" for x in values]
+
+
+def test_empty_and_other_symbols():
+    assert format_inr([]).tolist() == []
+    assert format_inr([1234.5, np.nan], symbol="Rs ").tolist() == ["Rs 1,234", "Rs nan"]
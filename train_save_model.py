@@ -1,27 +1,234 @@
 # train_save_model.py
+#
+# Usage:
+#   python train_save_model.py                                  # load the CSV and train in memory
+#   python train_save_model.py --out-of-core --chunk-size 100000 # stream the CSV (datasets larger than RAM)
+#   python train_save_model.py --search random --n-trials 40     # cross-validated hyperparameter search
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
 import pandas as pd
 import xgboost as xgb
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 import joblib
 
-# Load your dataset
-data = pd.read_csv("bank_personal_loan_data.csv")  # your dataset
-X = data[['Age','Income','CCAvg','Education']]  # features
-y = data['Personal Loan']  # target
+from loanease.compiled_model import export_compiled
+from loanease.dataset import load_frame
+from loanease.drift import reference_from_csv, save_reference
+from loanease.global_explain import ensure_artifact
+from loanease.model_store import FEATURES, save_native_artifacts
+
+DATA_PATH = "bank_personal_loan_data.csv"  # your dataset
+TARGET = 'Personal Loan'
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+# Defaults of the in-memory XGBClassifier, reused for the out-of-core booster
+NUM_BOOST_ROUND = 100
+BOOSTER_PARAMS = {'objective': 'binary:logistic', 'eval_metric': 'logloss', 'tree_method': 'hist'}
+
+
+def load_training_data(data_path=DATA_PATH):
+    # Only the feature and target columns, memory-mapped from the columnar cache (see loanease/dataset.py)
+    data = load_frame(data_path, FEATURES + [TARGET])
+    return data[FEATURES].astype(np.float64), data[TARGET].to_numpy()
+
+
+def train_in_memory(data_path=DATA_PATH):
+    # Load your dataset
+    X, y = load_training_data(data_path)  # features, target
+
+    # Scale features
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+
+    # Train-test split
+    X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+
+    # Train XGBoost classifier
+    model = xgb.XGBClassifier(use_label_encoder=False, eval_metric='logloss')
+    model.fit(X_train, y_train)
+    return model, scaler
+
+
+# ====== HYPERPARAMETER SEARCH ======
+def train_with_search(data_path=DATA_PATH, strategy='random', n_trials=40, folds=5, workers=None,
+                      report_path=None, resume=False):
+    """Runs model_search on the training split and refits the best configuration on it."""
+    import model_search
+
+    X, y = load_training_data(data_path)
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X_scaled, y, test_size=TEST_SIZE, random_state=RANDOM_STATE
+    )
+
+    if strategy == 'grid':
+        trials = model_search.grid_trials()
+    else:
+        trials = model_search.random_trials(n_trials, seed=RANDOM_STATE)
+    best = model_search.run_search(
+        X_train, y_train, trials, folds=folds, workers=workers,
+        report_path=report_path or model_search.DEFAULT_REPORT, resume=resume, seed=RANDOM_STATE,
+    )
+    if best is None:
+        raise RuntimeError("every trial was pruned; nothing to refit")
+    print(f"Best: {best['params']} (CV log-loss {best['mean_logloss']:.4f}, AUC {best['mean_auc']:.4f})")
+
+    model = xgb.XGBClassifier(eval_metric='logloss', tree_method='hist', **best['params'])
+    model.fit(X_train, y_train)
+    print(f"Hold-out accuracy: {model.score(X_test, y_test):.4f}")
+    return model, scaler
+
+
+# ====== OUT-OF-CORE TRAINING ======
+def _iter_csv_chunks(data_path, chunk_size):
+    # Only the feature and target columns are parsed
+    return pd.read_csv(data_path, usecols=FEATURES + [TARGET], chunksize=chunk_size)
+
+
+def _holdout_mask(chunk_index, n_rows):
+    # Deterministic per-chunk 80/20 split, so every pass sees the same rows in the test set
+    rng = np.random.default_rng((RANDOM_STATE, chunk_index))
+    return rng.random(n_rows) < TEST_SIZE
+
+
+class ScaledChunkIter(xgb.DataIter):
+    """Feeds XGBoost one scaled training chunk at a time; XGBoost caches pages on disk."""
+
+    def __init__(self, data_path, chunk_size, scaler, cache_prefix):
+        self.data_path = data_path
+        self.chunk_size = chunk_size
+        self.scaler = scaler
+        self._chunks = None
+        self._index = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._chunks is None:
+            self._chunks = iter(_iter_csv_chunks(self.data_path, self.chunk_size))
+            self._index = 0
+        for chunk in self._chunks:
+            test = _holdout_mask(self._index, len(chunk))
+            self._index += 1
+            if test.all():
+                continue
+            train = chunk[~test]
+            input_data(
+                data=self.scaler.transform(train[FEATURES].to_numpy(dtype=np.float64)),
+                label=train[TARGET].to_numpy(),
+            )
+            return True
+        return False
+
+    def reset(self):
+        self._chunks = None
+
+
+def train_out_of_core(data_path=DATA_PATH, chunk_size=100_000, cache_dir=None):
+    """Trains on a CSV streamed in chunks; peak memory is bounded by `chunk_size`.
+
+    The scaler is fitted with StandardScaler.partial_fit over one streaming pass,
+    then XGBoost builds `hist` trees from an external-memory DMatrix fed by
+    ScaledChunkIter. Returns the same (XGBClassifier, StandardScaler) pair as
+    train_in_memory.
+    """
+    scaler = StandardScaler()
+    for chunk in _iter_csv_chunks(data_path, chunk_size):
+        scaler.partial_fit(chunk[FEATURES].to_numpy(dtype=np.float64))
+
+    with tempfile.TemporaryDirectory(dir=cache_dir) as tmp:
+        it = ScaledChunkIter(data_path, chunk_size, scaler, cache_prefix=os.path.join(tmp, "cache"))
+        if hasattr(xgb, "ExtMemQuantileDMatrix"):
+            dtrain = xgb.ExtMemQuantileDMatrix(it)
+        else:
+            dtrain = xgb.DMatrix(it)
+        booster = xgb.train(BOOSTER_PARAMS, dtrain, num_boost_round=NUM_BOOST_ROUND)
+
+        # Wrap the booster so the saved artifact matches the in-memory XGBClassifier
+        booster_path = os.path.join(tmp, "booster.ubj")
+        booster.save_model(booster_path)
+        model = xgb.XGBClassifier()
+        model.load_model(booster_path)
+        # Release the external-memory pages before their directory is removed
+        del dtrain, it, booster
+
+    # Streaming evaluation on the held-out rows
+    correct = total = 0
+    for i, chunk in enumerate(_iter_csv_chunks(data_path, chunk_size)):
+        test = chunk[_holdout_mask(i, len(chunk))]
+        if len(test):
+            pred = model.predict(scaler.transform(test[FEATURES].to_numpy(dtype=np.float64)))
+            correct += int((pred == test[TARGET].to_numpy()).sum())
+            total += len(test)
+    if total:
+        print(f"Hold-out accuracy: {correct / total:.4f} ({total:,} rows)")
+
+    return model, scaler
+
+
+def peak_rss_mb():
+    # The resource module is Unix-only; on Windows there is no peak RSS to report
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def save_artifacts(model, scaler):
+    # Save model
+    joblib.dump(model, "xgb_model.pkl")
+    joblib.dump(scaler, "scaler.pkl")  # optional if you want to scale inputs in app
+    # Native, version-independent copies loaded by the app (see loanease/model_store.py)
+    save_native_artifacts(model, scaler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the loan model and save its artifacts.")
+    parser.add_argument("--data", default=DATA_PATH, help=f"training CSV (default: {DATA_PATH})")
+    parser.add_argument("--out-of-core", action="store_true",
+                        help="stream the CSV in chunks through XGBoost external memory")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="rows per chunk in --out-of-core mode")
+    parser.add_argument("--cache-dir", help="directory for XGBoost's external-memory cache pages")
+    parser.add_argument("--search", choices=['grid', 'random'], help="run a cross-validated hyperparameter search")
+    parser.add_argument("--n-trials", type=int, default=40, help="configurations to try with --search random")
+    parser.add_argument("--folds", type=int, default=5, help="cross-validation folds for --search")
+    parser.add_argument("--workers", type=int, help="search worker processes (default: one per core)")
+    parser.add_argument("--report", help="per-trial JSON-lines report for --search (default: search_report.jsonl)")
+    parser.add_argument("--resume", action="store_true", help="skip trials already recorded in the report")
+    args = parser.parse_args(argv)
+
+    if args.search and args.out_of_core:
+        parser.error("--search and --out-of-core cannot be combined")
 
-# Scale features
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
+    if args.search:
+        model, scaler = train_with_search(
+            args.data, args.search, args.n_trials, args.folds, args.workers, args.report, args.resume
+        )
+    elif args.out_of_core:
+        model, scaler = train_out_of_core(args.data, args.chunk_size, args.cache_dir)
+    else:
+        model, scaler = train_in_memory(args.data)
 
-# Train-test split
-X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, random_state=42)
+    save_artifacts(model, scaler)
+    # The booster compiled to NumPy arrays, scaler folded in (see loanease/compiled_model.py)
+    export_compiled()
+    # Reference histograms the drift monitor compares live inputs against (see loanease/drift.py)
+    save_reference(reference_from_csv(args.data))
+    # Dataset-wide SHAP values and the global summaries of the Explainability page (see loanease/global_explain.py)
+    ensure_artifact(args.data, workers=args.workers or 1)
+    peak_rss = peak_rss_mb()
+    if peak_rss is not None:
+        print(f"Peak RSS: {peak_rss:,.0f} MB")
+    print("Model saved successfully!")
 
-# Train XGBoost classifier
-model = xgb.XGBClassifier(use_label_encoder=False, eval_metric='logloss')
-model.fit(X_train, y_train)
 
-# Save model
-joblib.dump(model, "xgb_model.pkl")
-joblib.dump(scaler, "scaler.pkl")  # optional if you want to scale inputs in app
-print("Model saved successfully!")
+if __name__ == "__main__":
+    main()